@@ -1,9 +1,11 @@
+import asyncio
 import base64
-import io
 import json
 import logging
 import os
+import re
 import tempfile
+from pathlib import Path
 from typing import Dict, Set, Tuple, Optional
 
 from fastapi import HTTPException
@@ -14,7 +16,9 @@ from googleapiclient.http import MediaIoBaseDownload
 from app.core.config import settings
 from app.core.extract_text import extract_text
 from app.core.supabase_client import supabase
+from app.core.openai_async_client import get_async_http_client
 from app.services.file_processing_service import FileProcessingService
+from .vs_ingest_worker import resolve_vector_store_id
 from openai import OpenAI
 import os
 import httpx
@@ -40,6 +44,58 @@ def _get_drive_service():
         raise HTTPException(status_code=500, detail=f"Failed to create Google Drive service: {e}")
 
 
+_NORM_RE = re.compile(r"[^a-zA-Z0-9]+")
+
+
+def _normalize_name(name: str) -> str:
+    # The `+` already collapses runs, so a single substitution pass is enough
+    base = os.path.splitext(name or "")[0]
+    return _NORM_RE.sub("-", base.strip()).strip("-").lower()
+
+
+def _is_unique_violation(e: Exception) -> bool:
+    """True for a PostgREST error caused by a unique index (Postgres SQLSTATE 23505)."""
+    return getattr(e, "code", None) == "23505" or "duplicate key" in str(e).lower()
+
+
+def _write_join_rows(workspace_id: str, payloads: list[dict]) -> None:
+    """Insert file_workspaces join rows for newly synced files in one bulk round-trip.
+
+    If a live row already holds one of the normalized names, the partial unique index rejects
+    the whole batch (PostgREST cannot target a partial index with on_conflict), so fall back
+    to insert-first / update-on-conflict per row.
+    """
+    if not payloads:
+        return
+    try:
+        supabase.table("file_workspaces").insert(payloads, returning="minimal").execute()
+        logger.info(f"[responses.gdrive] file_workspaces inserted: ws={workspace_id} rows={len(payloads)}")
+        return
+    except Exception as e:
+        if not _is_unique_violation(e):
+            logger.warning(f"Bulk file_workspaces insert failed, retrying per row: {e}")
+    for payload in payloads:
+        norm = payload["normalized_name"]
+        try:
+            try:
+                supabase.table("file_workspaces").insert(payload, returning="minimal").execute()
+                logger.info(f"[responses.gdrive] file_workspaces inserted: ws={workspace_id} norm={norm}")
+            except Exception as e:
+                if not _is_unique_violation(e):
+                    raise
+                (
+                    supabase.table("file_workspaces")
+                    .update(payload, returning="minimal")
+                    .eq("workspace_id", workspace_id)
+                    .eq("normalized_name", norm)
+                    .eq("deleted", False)
+                    .execute()
+                )
+                logger.info(f"[responses.gdrive] file_workspaces updated: ws={workspace_id} norm={norm}")
+        except Exception as e:
+            logger.warning(f"Failed to upsert file_workspaces join for {norm}: {e}")
+
+
 def _fetch_workspace_files(workspace_id: str) -> Dict[str, Dict[str, str]]:
     """Return mapping of filename -> { id, file_path } for a given workspace.
     Queries file_workspaces (deleted=false) joined to files to ensure we only consider
@@ -116,6 +172,9 @@ def _list_drive_files(service) -> Tuple[Set[str], list]:
     return names, drive_files
 
 
+_PAGE_MARKER_RE = re.compile(r"---PAGE \d+---")
+
+
 def _pdf_needs_ocr(temp_path: str) -> bool:
     """Heuristic: run extract_text and consider OCR if very little text.
     Matches the ingestion logic threshold (>= ~100 chars after removing page markers).
@@ -125,15 +184,54 @@ def _pdf_needs_ocr(temp_path: str) -> bool:
         if not text:
             return True
         # Remove page delimiters if any and trim
-        import re
-
-        stripped = re.sub(r"---PAGE \d+---", "", text).strip()
+        stripped = _PAGE_MARKER_RE.sub("", text).strip()
         return len(stripped) < 100
     except Exception as e:
         logger.warning(f"extract_text failed on {temp_path}: {e}")
         return True
 
 
+# Drive media is fetched in 1 MiB chunks straight to disk
+_DOWNLOAD_CHUNK = 1 << 20
+
+
+def _download_drive_file(file_id: str, file_name: str) -> str:
+    """Stream one Drive file to a tmp path (keeping its suffix) and return the path; the caller
+    removes it. Builds its own Drive service: the httplib2-backed client is not thread-safe,
+    and downloads run in worker threads."""
+    request = _get_drive_service().files().get_media(fileId=file_id)
+    suffix = os.path.splitext(file_name or "")[1]
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        tmp_path = tmp.name
+        try:
+            downloader = MediaIoBaseDownload(tmp, request, chunksize=_DOWNLOAD_CHUNK)
+            done = False
+            while not done:
+                status, done = downloader.next_chunk()
+                if status:
+                    logger.info(f"Downloading {file_name}: {int(status.progress() * 100)}%")
+        except Exception:
+            tmp.close()
+            os.remove(tmp_path)
+            raise
+    return tmp_path
+
+
+def _ocr_if_needed(file_name: str, file_rec_id: str, tmp_path: str) -> bool:
+    """Run the OCR pipeline for a synced PDF with too little text. Returns True if OCR ran."""
+    if not _pdf_needs_ocr(tmp_path):
+        logger.info(f"{file_name} has sufficient text; skipping OCR.")
+        return False
+    logger.info(f"{file_name} appears to need OCR; starting OCR pipeline.")
+    # Mark OCR intent similar to ingestion path
+    try:
+        supabase.table("files").update({"ocr_needed": True}).eq("id", file_rec_id).execute()
+    except Exception:
+        pass
+    FileProcessingService.process_file_for_ocr(file_rec_id)
+    return True
+
+
 async def run_responses_gdrive_sync():
     """
     Responses-oriented GDrive sync:
@@ -172,13 +270,6 @@ async def run_responses_gdrive_sync():
         processed = 0
         ocr_started = 0
 
-        def _normalize_name(name: str) -> str:
-            base = os.path.splitext(name or "")[0]
-            import re
-            s = re.sub(r"[^a-zA-Z0-9]+", "-", base.strip())
-            s = re.sub(r"-+", "-", s)
-            return s.strip("-").lower()
-
     # workspace_id already resolved above
         # Ingest user to attribute ownership for joins; prefer workspace owner if available
         ingest_user_id: Optional[str] = None
@@ -200,95 +291,65 @@ async def run_responses_gdrive_sync():
         if not ingest_user_id:
             ingest_user_id = "773e2630-2cca-44c3-957c-0cf5ccce7411"
 
-        for gfile in new_files:
+        join_payloads: list[dict] = []
+        sem = asyncio.Semaphore(max(1, settings.GDRIVE_SYNC_CONCURRENCY))
+
+        async def _process_one(gfile: dict) -> None:
+            nonlocal processed, ocr_started
             file_id = gfile["id"]
             file_name = gfile["name"]
             content_type = gfile.get("mimeType", "application/octet-stream")
-            logger.info(f"[responses.gdrive] New file: {file_name} ({file_id}) type={content_type}")
+            async with sem:
+                logger.info(f"[responses.gdrive] New file: {file_name} ({file_id}) type={content_type}")
 
-            # Download into memory and a temp file for optional extraction
-            request = service.files().get_media(fileId=file_id)
-            buf = io.BytesIO()
-            downloader = MediaIoBaseDownload(buf, request)
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-                if status:
-                    logger.info(f"Downloading {file_name}: {int(status.progress() * 100)}%")
-            raw_bytes = buf.getvalue()
-
-            # Upload to Supabase first (source-of-truth)
-            result = await FileProcessingService.upload_and_register_file(
-                user_id=ingest_user_id,
-                file_content=raw_bytes,
-                file_name=file_name,
-                content_type=content_type,
-                sharing="public",
-            )
-            processed += 1
-            file_rec_id = result["file_id"]
-            file_path = result["file_path"]
+                # Stream to a tmp file (blocking Drive client; off the event loop). The OCR check
+                # reads that file directly instead of re-writing the bytes to a second tmp file.
+                tmp_path = await asyncio.to_thread(_download_drive_file, file_id, file_name)
+                try:
+                    # Upload to Supabase first (source-of-truth)
+                    result = await FileProcessingService.upload_and_register_file(
+                        user_id=ingest_user_id,
+                        file_content=await asyncio.to_thread(Path(tmp_path).read_bytes),
+                        file_name=file_name,
+                        content_type=content_type,
+                        sharing="public",
+                    )
+                    processed += 1
+                    file_rec_id = result["file_id"]
 
-            # Upsert per-workspace join row so VS ingest worker can act
-            try:
-                if workspace_id:
-                    norm = _normalize_name(file_name)
-                    payload = {
+                    # Per-workspace join row so VS ingest worker can act; written in bulk after the loop
+                    join_payloads.append({
                         "user_id": ingest_user_id,
                         "workspace_id": workspace_id,
                         "file_id": file_rec_id,
-                        "normalized_name": norm,
+                        "normalized_name": _normalize_name(file_name),
                         "ingested": False,
                         "deleted": False,
                         "deleted_at": None,
                         "openai_file_id": None,
                         "vs_file_id": None,
-                    }
-                    # Update-if-exists else insert
-                    try:
-                        sel = (
-                            supabase.table("file_workspaces")
-                            .select("file_id")
-                            .eq("workspace_id", workspace_id)
-                            .eq("normalized_name", norm)
-                            .maybe_single()
-                            .execute()
-                        )
-                        row = getattr(sel, "data", None)
-                    except Exception:
-                        row = None
-                    if row:
-                        supabase.table("file_workspaces").update(payload).eq("workspace_id", workspace_id).eq("normalized_name", norm).execute()
-                        logger.info(f"[responses.gdrive] file_workspaces updated: ws={workspace_id} name={file_name} norm={norm}")
-                    else:
-                        supabase.table("file_workspaces").insert(payload).execute()
-                        logger.info(f"[responses.gdrive] file_workspaces inserted: ws={workspace_id} name={file_name} norm={norm}")
-            except Exception as e:
-                logger.warning(f"Failed to upsert file_workspaces join for {file_name}: {e}")
+                    })
 
-            # If PDF, decide whether to OCR
-            if file_name.lower().endswith(".pdf"):
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                    tmp.write(raw_bytes)
-                    tmp_path = tmp.name
-                try:
-                    if _pdf_needs_ocr(tmp_path):
-                        logger.info(f"{file_name} appears to need OCR; starting OCR pipeline.")
-                        # Mark OCR intent similar to ingestion path
-                        try:
-                            supabase.table("files").update({"ocr_needed": True}).eq("id", file_rec_id).execute()
-                        except Exception:
-                            pass
-                        FileProcessingService.process_file_for_ocr(file_rec_id)
-                        ocr_started += 1
-                    else:
-                        logger.info(f"{file_name} has sufficient text; skipping OCR.")
+                    # If PDF, decide whether to OCR (extraction + OCR are blocking; run in a thread)
+                    if file_name.lower().endswith(".pdf"):
+                        if await asyncio.to_thread(_ocr_if_needed, file_name, file_rec_id, tmp_path):
+                            ocr_started += 1
                 finally:
                     try:
                         os.remove(tmp_path)
                     except Exception:
                         pass
 
+        try:
+            # Files are independent: download/OCR several at once, bounded by GDRIVE_SYNC_CONCURRENCY
+            outcomes = await asyncio.gather(*[_process_one(g) for g in new_files], return_exceptions=True)
+        finally:
+            # Files uploaded before any failure still get their join rows
+            await asyncio.to_thread(_write_join_rows, workspace_id, join_payloads)
+        for out in outcomes:
+            if isinstance(out, BaseException):
+                raise out
+
         # Deletions: mirror original behavior (remove from storage + DB), plus delete from Vector Store if configured
         deleted = 0
         vs_deleted = 0
@@ -296,22 +357,12 @@ async def run_responses_gdrive_sync():
         if files_to_delete_names:
             # Vector store prep (optional)
             vector_store_id: Optional[str] = None
-            if settings.GDRIVE_VECTOR_STORE_ID:
-                vector_store_id = settings.GDRIVE_VECTOR_STORE_ID
-            elif settings.GDRIVE_WORKSPACE_ID:
+            if settings.GDRIVE_VECTOR_STORE_ID or settings.GDRIVE_WORKSPACE_ID:
+                # Shares the ingest worker's TTL-cached lookup instead of querying Supabase every sync
                 try:
-                    res = (
-                        supabase.table("workspace_vector_stores")
-                        .select("vector_store_id")
-                        .eq("workspace_id", settings.GDRIVE_WORKSPACE_ID)
-                        .maybe_single()
-                        .execute()
-                    )
-                    row = getattr(res, "data", None)
-                    if row and row.get("vector_store_id"):
-                        vector_store_id = row["vector_store_id"]
-                except Exception as e:
-                    logger.warning(f"Failed to resolve vector_store_id from Supabase: {e}")
+                    vector_store_id = resolve_vector_store_id()
+                except HTTPException:
+                    logger.warning("Failed to resolve vector_store_id for the Drive workspace; skipping Vector Store deletes")
 
             # HTTP-first helpers for Vector Store ops (Authorization only)
             def _openai_headers() -> dict:
@@ -320,30 +371,37 @@ async def run_responses_gdrive_sync():
             async def _http_request(method: str, url: str, *, json: dict | None = None, timeout: float = 10.0, retries: int = 3) -> httpx.Response:
                 last_exc: Exception | None = None
                 backoff = 0.5
-                async with httpx.AsyncClient(timeout=timeout) as client_http:
-                    for _ in range(retries):
-                        try:
-                            resp = await client_http.request(method, url, headers=_openai_headers(), json=json)
-                            if resp.status_code in (429, 500, 502, 503, 504):
-                                last_exc = Exception(f"{resp.status_code} {resp.text}")
-                                await _asyncio_sleep(backoff)
-                                backoff = min(4.0, backoff * 2)
-                                continue
-                            return resp
-                        except Exception as e:
-                            last_exc = e
+                client_http = get_async_http_client()
+                for _ in range(retries):
+                    try:
+                        resp = await client_http.request(method, url, headers=_openai_headers(), json=json, timeout=timeout)
+                        if resp.status_code in (429, 500, 502, 503, 504):
+                            last_exc = Exception(f"{resp.status_code} {resp.text}")
                             await _asyncio_sleep(backoff)
                             backoff = min(4.0, backoff * 2)
+                            continue
+                        return resp
+                    except Exception as e:
+                        last_exc = e
+                        await _asyncio_sleep(backoff)
+                        backoff = min(4.0, backoff * 2)
                 raise Exception(f"OpenAI HTTP request failed: {last_exc}")
 
             async def _list_vs_files_http(vs_id: str) -> list[dict]:
                 base = os.environ.get("OPENAI_BASE_URL", "https://api.openai.com")
-                url = f"{base}/v1/vector_stores/{vs_id}/files?limit=100"
-                resp = await _http_request("GET", url)
-                if not resp.is_success:
-                    return []
-                body = resp.json() or {}
-                return body.get("data", [])
+                items: list[dict] = []
+                after: Optional[str] = None
+                while True:
+                    url = f"{base}/v1/vector_stores/{vs_id}/files?limit=100" + (f"&after={after}" if after else "")
+                    resp = await _http_request("GET", url)
+                    if not resp.is_success:
+                        return items
+                    body = resp.json() or {}
+                    page = body.get("data", [])
+                    items.extend(page)
+                    after = body.get("last_id") or (page[-1].get("id") if page else None)
+                    if not body.get("has_more") or not page or not after:
+                        return items
 
             async def _delete_vs_attachment_http(vs_id: str, id_or_file_id: str) -> bool:
                 base = os.environ.get("OPENAI_BASE_URL", "https://api.openai.com")
@@ -1,29 +1,68 @@
+import asyncio
+import functools
+import hashlib
+import mimetypes
 import io
 import os
 import tempfile
+import shutil
+from pathlib import Path
 import logging
-from typing import List, Optional, Tuple
+from typing import AsyncIterator, List, Optional, Tuple
 import re
-from datetime import date
+from datetime import date, datetime, timezone
 
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query, BackgroundTasks, Request, Response
+from fastapi.responses import JSONResponse, ORJSONResponse
 from pydantic import BaseModel
 
-from openai import OpenAI
+from openai import APIConnectionError, AsyncOpenAI, OpenAI
+import aiofiles
 import httpx
 import time
+import random
+import operator
+import threading
+import uuid
+from collections import Counter, OrderedDict
 
 from app.core.supabase_client import supabase
 from app.core.config import settings
+from app.core.openai_sync_client import get_openai_client
+from app.core.openai_async_client import get_async_http_client, get_async_openai_client
 
-from app.core.extract_text import extract_text
+from app.core.extract_text import extract_text, ocr_images, pdf_has_text_layer, render_pdf_pages
 from .gdrive_sync import run_responses_gdrive_sync
-from .vs_ingest_worker import upload_missing_files_to_vector_store
+from .vs_ingest_worker import invalidate_resolved_vector_store_id, upload_missing_files_to_vector_store
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/responses", tags=["responses-vector-store"])
 
+# Resolve the SDK shape once at import instead of probing per call: newer SDKs expose
+# `client.vector_stores`, older ones only `client.beta.vector_stores`.
+_USE_MODERN_VS = hasattr(OpenAI, "vector_stores")
+try:
+    from openai.resources.files import Files as _FilesResource
+    if _USE_MODERN_VS:
+        from openai.resources.vector_stores.files import Files as _VSFilesResource
+    else:
+        from openai.resources.beta.vector_stores.files import Files as _VSFilesResource  # type: ignore
+    _VS_DELETE_ATTR = "delete" if hasattr(_VSFilesResource, "delete") else "del"
+    _FILES_DELETE_ATTR = "delete" if hasattr(_FilesResource, "delete") else "del"
+except ImportError:  # pragma: no cover - resource modules moved; assume current naming
+    _VS_DELETE_ATTR = "delete"
+    _FILES_DELETE_ATTR = "delete"
+
+# Resolved callables: each call site is one attrgetter dispatch, no probing or fallbacks
+_VS_NS = "vector_stores" if _USE_MODERN_VS else "beta.vector_stores"
+_vs_files = operator.attrgetter(f"{_VS_NS}.files")
+_vs_file_batches = operator.attrgetter(f"{_VS_NS}.file_batches")
+_vs_file_detach = operator.attrgetter(f"{_VS_NS}.files.{_VS_DELETE_ATTR}")
+_file_delete = operator.attrgetter(f"files.{_FILES_DELETE_ATTR}")
+# SDK VectorStoreFile objects carry the underlying file id as `id` (there is no file_id field)
+_vs_item_id = operator.attrgetter("id")
+
 
 class UploadResult(BaseModel):
     id: str
@@ -31,7 +70,42 @@ class UploadResult(BaseModel):
     size: Optional[int] = None
 
 
+# workspace_id -> (expires_at, vector_store_id); the mapping effectively never changes
+_vs_id_cache: dict = {}
+_vs_id_cache_lock = threading.Lock()
+_VS_ID_CACHE_MAX = 1024
+
+
+def invalidate_vector_store_id(workspace_id: Optional[str] = None) -> None:
+    """Drop the cached vector_store_id for one workspace (or all when workspace_id is None)."""
+    with _vs_id_cache_lock:
+        if workspace_id is None:
+            _vs_id_cache.clear()
+        else:
+            _vs_id_cache.pop(workspace_id, None)
+    if workspace_id is None or workspace_id == settings.GDRIVE_WORKSPACE_ID:
+        # The ingest worker caches its own lookup for the Drive workspace
+        invalidate_resolved_vector_store_id()
+
+
 def _get_vector_store_id(workspace_id: str) -> str:
+    ttl = settings.VECTOR_STORE_ID_CACHE_TTL
+    if ttl > 0:
+        with _vs_id_cache_lock:
+            hit = _vs_id_cache.get(workspace_id)
+        if hit and hit[0] > time.monotonic():
+            return hit[1]
+    vector_store_id = _fetch_vector_store_id(workspace_id)
+    if ttl > 0:
+        with _vs_id_cache_lock:
+            if len(_vs_id_cache) >= _VS_ID_CACHE_MAX:
+                # Evict the entry closest to expiry rather than growing unbounded
+                _vs_id_cache.pop(min(_vs_id_cache, key=lambda k: _vs_id_cache[k][0]), None)
+            _vs_id_cache[workspace_id] = (time.monotonic() + ttl, vector_store_id)
+    return vector_store_id
+
+
+def _fetch_vector_store_id(workspace_id: str) -> str:
     try:
         res = (
             supabase.table("workspace_vector_stores")
@@ -62,25 +136,42 @@ def _openai_headers() -> dict:
     }
 
 
+# Upper bound (seconds) for one backoff sleep, including server-sent Retry-After
+_HTTP_BACKOFF_CAP = 60.0
+
+
+def _retry_after_seconds(resp: httpx.Response) -> Optional[float]:
+    """Seconds from a numeric Retry-After header, capped; None when absent or not numeric."""
+    try:
+        return min(_HTTP_BACKOFF_CAP, max(0.0, float(resp.headers.get("retry-after", ""))))
+    except ValueError:
+        return None
+
+
 async def _http_request(method: str, url: str, *, json: dict | None = None, timeout: float = 15.0, retries: int = 3) -> httpx.Response:
     last_exc: Exception | None = None
-    backoff = 0.5
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        for attempt in range(retries):
-            try:
-                resp = await client.request(method, url, headers=_openai_headers(), json=json)
-                # Treat 429/5xx as retryable
-                if resp.status_code in (429, 500, 502, 503, 504):
-                    last_exc = HTTPException(status_code=resp.status_code, detail=f"{resp.text}")
-                    await asyncio_sleep(backoff)
-                    backoff = min(4.0, backoff * 2)
-                    continue
+    client = get_async_http_client()
+    for attempt in range(retries):
+        delay: Optional[float] = None
+        try:
+            resp = await client.request(method, url, headers=_openai_headers(), json=json, timeout=timeout)
+        except httpx.TransportError as e:  # network/timeout
+            last_exc = e
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"OpenAI HTTP request failed: {e}")
+        else:
+            # Treat 408/429/5xx as retryable, honouring the server's Retry-After when given
+            if resp.status_code not in _RETRYABLE_STATUS:
                 return resp
-            except Exception as e:  # network/timeout
-                last_exc = e
-                await asyncio_sleep(backoff)
-                backoff = min(4.0, backoff * 2)
-        raise HTTPException(status_code=500, detail=f"OpenAI HTTP request failed: {last_exc}")
+            last_exc = HTTPException(status_code=resp.status_code, detail=f"{resp.text}")
+            delay = _retry_after_seconds(resp)
+        if attempt == retries - 1:
+            break
+        if delay is None:
+            # Full jitter so concurrent callers don't retry in lockstep
+            delay = random.uniform(0, min(_HTTP_BACKOFF_CAP, 0.5 * 2 ** attempt))
+        await asyncio.sleep(delay)
+    raise HTTPException(status_code=500, detail=f"OpenAI HTTP request failed: {last_exc}")
 
 
 async def asyncio_sleep(seconds: float):
@@ -89,25 +180,117 @@ async def asyncio_sleep(seconds: float):
     await _asyncio.sleep(seconds)
 
 
-async def _list_vs_files_http(vector_store_id: str) -> list[dict]:
+# Max concurrent per-file OpenAI REST calls in list enrichment and purges
+_HTTP_FANOUT = 16
+
+
+async def _gather_limited(fn, items: list, limit: int = _HTTP_FANOUT) -> list:
+    """Await fn(item) for every item with at most `limit` in flight.
+    Returns results in item order; failures are returned as exception instances.
+    """
+    sem = asyncio.Semaphore(limit)
+
+    async def _one(it):
+        async with sem:
+            return await fn(it)
+
+    return await asyncio.gather(*[_one(it) for it in items], return_exceptions=True)
+
+
+# Pollers (/list, /vector-store/progress) accept listings up to this many seconds old
+_VS_LIST_CACHE_TTL = 2.0
+# vector_store_id -> (fetched_at, data)
+_vs_files_cache: dict = {}
+# vector_store_id -> (generation, task): concurrent callers share one OpenAI GET
+_vs_files_inflight: dict = {}
+# vector_store_id -> generation, bumped on every attach/detach made by this process
+_vs_files_gen: dict = {}
+
+
+def _invalidate_vs_files(vector_store_id: str) -> None:
+    """Forget cached listings and stop later callers joining fetches that predate a mutation."""
+    _vs_files_gen[vector_store_id] = _vs_files_gen.get(vector_store_id, 0) + 1
+    _vs_files_cache.pop(vector_store_id, None)
+
+
+async def _list_vs_files_http(vector_store_id: str, max_age: float = 0.0) -> list[dict]:
+    """List a store's attachments. With max_age > 0, reuse a listing that recent.
+    Either way, join a fetch already in flight unless this process attached/detached since it started.
+    The returned list may be shared between callers; treat it as read-only.
+    """
+    if max_age > 0:
+        hit = _vs_files_cache.get(vector_store_id)
+        if hit and time.monotonic() - hit[0] < max_age:
+            return hit[1]
+
+    loop = asyncio.get_running_loop()
+    gen = _vs_files_gen.get(vector_store_id, 0)
+    entry = _vs_files_inflight.get(vector_store_id)
+    if entry is None or entry[0] != gen or entry[1].get_loop() is not loop:
+        task = loop.create_task(_fetch_vs_files_http(vector_store_id))
+        _vs_files_inflight[vector_store_id] = (gen, task)
+
+        def _done(t: asyncio.Task) -> None:
+            cur = _vs_files_inflight.get(vector_store_id)
+            if cur is not None and cur[1] is t:
+                del _vs_files_inflight[vector_store_id]
+            # A listing that raced an attach/detach must not be served from cache
+            if not t.cancelled() and t.exception() is None and _vs_files_gen.get(vector_store_id, 0) == gen:
+                _vs_files_cache[vector_store_id] = (time.monotonic(), t.result())
+
+        task.add_done_callback(_done)
+    else:
+        task = entry[1]
+    # shield: one caller disconnecting must not cancel the fetch the others are waiting on
+    return await asyncio.shield(task)
+
+
+async def _iter_vs_files_http(vector_store_id: str) -> AsyncIterator[list[dict]]:
+    """Yield a store's attachments one page (<=100) at a time, following the after= cursor."""
     base = os.environ.get("OPENAI_BASE_URL", "https://api.openai.com")
-    url = f"{base}/v1/vector_stores/{vector_store_id}/files?limit=100"
-    resp = await _http_request("GET", url)
-    if not resp.is_success:
-        raise HTTPException(status_code=resp.status_code, detail=f"VS list failed: {resp.text}")
-    data = resp.json() or {}
-    return data.get("data", [])
+    after: Optional[str] = None
+    while True:
+        url = f"{base}/v1/vector_stores/{vector_store_id}/files?limit=100"
+        if after:
+            url += f"&after={after}"
+        resp = await _http_request("GET", url)
+        if not resp.is_success:
+            raise HTTPException(status_code=resp.status_code, detail=f"VS list failed: {resp.text}")
+        body = resp.json() or {}
+        page = body.get("data", [])
+        yield page
+        after = body.get("last_id") or (page[-1].get("id") if page else None)
+        if not body.get("has_more") or not page or not after:
+            return
+
+
+async def _fetch_vs_files_http(vector_store_id: str) -> list[dict]:
+    data: list[dict] = []
+    async for page in _iter_vs_files_http(vector_store_id):
+        data.extend(page)
+    return data
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison: any listed tag (W/ prefix ignored) or * matches."""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
 
 
 @router.get("/vector-store/progress")
 async def vector_store_progress(
+    request: Request,
+    response: Response,
     workspace_id: Optional[str] = Query(None),
     vector_store_id: Optional[str] = Query(None),
     include_files: bool = Query(False),
 ):
     """
     Lightweight progress summary for a Vector Store's attachments.
-    Returns counts by status and an overall done flag.
+    Returns counts by status and an overall done flag. Carries a strong ETag over the
+    attachment ids/statuses; a matching If-None-Match gets an empty 304.
 
     Query:
       - workspace_id: resolve the store via DB mapping (preferred)
@@ -117,26 +300,24 @@ async def vector_store_progress(
     if not vector_store_id:
         if not workspace_id:
             raise HTTPException(status_code=400, detail="Provide either workspace_id or vector_store_id")
-        vector_store_id = _get_vector_store_id(workspace_id)
+        vector_store_id = await asyncio.to_thread(_get_vector_store_id, workspace_id)
 
-    data = await _list_vs_files_http(vector_store_id)
+    data = await _list_vs_files_http(vector_store_id, max_age=_VS_LIST_CACHE_TTL)
 
-    total = len(data)
-    counts = {"in_progress": 0, "completed": 0, "failed": 0, "other": 0}
-    files: list[dict] = []
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{vector_store_id}|{int(include_files)}".encode())
     for it in data:
-        status = (it.get("status") or "").lower()
-        if status in counts:
-            counts[status] += 1
-        else:
-            counts["other"] += 1
-        if include_files:
-            files.append({
-                "vs_file_id": it.get("id"),
-                "file_id": it.get("file_id") or it.get("id"),
-                "status": it.get("status"),
-                "created_at": it.get("created_at"),
-            })
+        digest.update(f"|{it.get('id')}:{it.get('status')}".encode())
+    etag = f'"{digest.hexdigest()}"'
+    cache_headers = {"ETag": etag, "Cache-Control": f"max-age={int(_VS_LIST_CACHE_TTL)}"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers)
+    response.headers.update(cache_headers)
+
+    total = len(data)
+    by_status = Counter((it.get("status") or "").lower() for it in data)
+    counts = {k: by_status.get(k, 0) for k in ("in_progress", "completed", "failed")}
+    counts["other"] = total - sum(counts.values())
 
     done = total > 0 and counts["in_progress"] == 0 and counts["failed"] == 0
 
@@ -147,7 +328,15 @@ async def vector_store_progress(
         "done": done,
     }
     if include_files:
-        resp["files"] = files
+        resp["files"] = [
+            {
+                "vs_file_id": it.get("id"),
+                "file_id": it.get("file_id") or it.get("id"),
+                "status": it.get("status"),
+                "created_at": it.get("created_at"),
+            }
+            for it in data
+        ]
     return resp
 
 
@@ -155,6 +344,8 @@ async def _delete_vs_attachment_http(vector_store_id: str, id_or_file_id: str) -
     base = os.environ.get("OPENAI_BASE_URL", "https://api.openai.com")
     url = f"{base}/v1/vector_stores/{vector_store_id}/files/{id_or_file_id}"
     resp = await _http_request("DELETE", url)
+    # Pollers should see the detach on their next call rather than a cached listing
+    _invalidate_vs_files(vector_store_id)
     if not resp.is_success and resp.status_code != 404:
         raise HTTPException(status_code=resp.status_code, detail=f"VS detach failed: {resp.text}")
 
@@ -163,103 +354,208 @@ async def _delete_openai_file_http(file_id: str) -> None:
     base = os.environ.get("OPENAI_BASE_URL", "https://api.openai.com")
     url = f"{base}/v1/files/{file_id}"
     resp = await _http_request("DELETE", url)
+    _file_meta_cache.pop(file_id, None)
     if not resp.is_success and resp.status_code != 404:
         raise HTTPException(status_code=resp.status_code, detail=f"File delete failed: {resp.text}")
 
 
-def _attach_file_to_vector_store(client: OpenAI, vector_store_id: str, file_id: str) -> Optional[str]:
-    """Attach file to Vector Store and return vs_file_id if the SDK returns it."""
-    # Handle possible API variants
-    try:
-        obj = client.vector_stores.files.create(vector_store_id=vector_store_id, file_id=file_id)
-        # Try to pull id regardless of SDK shape
-        return getattr(obj, "id", None) or (obj.get("id") if isinstance(obj, dict) else None)
-    except Exception as e1:
-        # Older beta path
+async def _create_openai_file_http(name: str, content, mime: str, purpose: str = "assistants") -> str:
+    """POST /v1/files as a hand-framed multipart body streamed over the shared AsyncClient.
+    content is bytes or a Path; a Path is read from disk in _SPOOL_CHUNK pieces, never fully buffered.
+    Returns the new file id.
+    """
+    base = os.environ.get("OPENAI_BASE_URL", "https://api.openai.com")
+    boundary = uuid.uuid4().hex
+    safe_name = name.replace("\r", "").replace("\n", "").replace('"', "%22")
+    head = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="purpose"\r\n\r\n{purpose}\r\n'
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{safe_name}"\r\n'
+        f"Content-Type: {mime}\r\n\r\n"
+    ).encode("utf-8")
+    tail = f"\r\n--{boundary}--\r\n".encode("ascii")
+    size = len(content) if isinstance(content, bytes) else os.path.getsize(content)
+
+    async def _body() -> AsyncIterator[bytes]:
+        yield head
+        if isinstance(content, bytes):
+            yield content
+        else:
+            async with aiofiles.open(content, "rb") as fh:
+                while chunk := await fh.read(_SPOOL_CHUNK):
+                    yield chunk
+        yield tail
+
+    headers = {
+        **_openai_headers(),
+        "Content-Type": f"multipart/form-data; boundary={boundary}",
+        "Content-Length": str(len(head) + size + len(tail)),
+    }
+    resp = await get_async_http_client().post(
+        f"{base}/v1/files", content=_body(), headers=headers, timeout=httpx.Timeout(600.0, connect=5.0)
+    )
+    if not resp.is_success:
+        raise HTTPException(status_code=resp.status_code, detail=f"File upload failed: {resp.text}")
+    return resp.json()["id"]
+
+
+_RETRYABLE_STATUS = (408, 429, 500, 502, 503, 504)
+
+
+def _is_transient_openai_error(e: Exception) -> bool:
+    """Rate limits, 408/5xx and connection/timeout errors are worth retrying."""
+    if isinstance(e, (APIConnectionError, httpx.TransportError)):  # includes timeouts
+        return True
+    if getattr(e, "status_code", None) in _RETRYABLE_STATUS:
+        return True
+    msg = str(e).lower()
+    return "rate limit" in msg or "quota" in msg
+
+
+def _retry(fn, *args, attempts: int = 3, base: float = 1.0, cap: float = 8.0, **kwargs):
+    """Call fn(*args, **kwargs), retrying transient OpenAI errors with full-jitter exponential backoff."""
+    for i in range(attempts):
         try:
-            beta = getattr(client, "beta")
-            obj = beta.vector_stores.files.create(vector_store_id=vector_store_id, file_id=file_id)  # type: ignore
-            return getattr(obj, "id", None) or (obj.get("id") if isinstance(obj, dict) else None)
-        except Exception as e2:
-            logger.error(f"Failed attaching file to vector store: {e1} | {e2}")
-            raise HTTPException(status_code=500, detail="Failed to attach file to vector store")
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if i == attempts - 1 or not _is_transient_openai_error(e):
+                raise
+            delay = random.uniform(0, min(cap, base * 2 ** i))
+            logger.debug(f"{getattr(fn, '__name__', fn)} failed transiently (attempt {i + 1}/{attempts}), retrying in {delay:.2f}s: {e}")
+            time.sleep(delay)
 
 
-def _delete_vs_file(client: OpenAI, vector_store_id: str, file_id: str):
-    # Detach from Vector Store
-    last_err = None
-    for attr in ["delete", "del"]:
+async def _aretry(fn, *args, attempts: int = 3, base: float = 1.0, cap: float = 8.0, **kwargs):
+    """Async counterpart of _retry for AsyncOpenAI calls."""
+    for i in range(attempts):
         try:
-            getattr(client.vector_stores.files, attr)(vector_store_id=vector_store_id, file_id=file_id)
-            last_err = None
-            break
+            return await fn(*args, **kwargs)
         except Exception as e:
-            last_err = e
-    if last_err:
+            if i == attempts - 1 or not _is_transient_openai_error(e):
+                raise
+            delay = random.uniform(0, min(cap, base * 2 ** i))
+            logger.debug(f"{getattr(fn, '__name__', fn)} failed transiently (attempt {i + 1}/{attempts}), retrying in {delay:.2f}s: {e}")
+            await asyncio.sleep(delay)
+
+
+# Upper bound on file_ids accepted by one vector store file batch
+_VS_BATCH_MAX_FILES = 500
+
+
+def _vs_batch_chunks(file_ids: List[str]) -> List[List[str]]:
+    return [file_ids[i:i + _VS_BATCH_MAX_FILES] for i in range(0, len(file_ids), _VS_BATCH_MAX_FILES)]
+
+
+def _attach_batch_failed(e: Exception) -> HTTPException:
+    logger.error(f"Failed attaching file batch to vector store: {e}")
+    return HTTPException(status_code=500, detail="Failed to attach files to vector store")
+
+
+def _record_batch_files(batch, listed: list, vs_ids: dict) -> None:
+    """Record the files of a settled batch that finished embedding (failed/cancelled ones stay unmapped)."""
+    counts = getattr(batch, "file_counts", None)
+    if counts is not None and getattr(counts, "failed", 0):
+        logger.warning(f"Vector store file batch {batch.id} reported {counts.failed} failed file(s)")
+    for it in listed:
+        if isinstance(it, dict):
+            vid, status = it.get("id"), it.get("status")
+        else:
+            vid, status = getattr(it, "id", None), getattr(it, "status", None)
+        if not vid:
+            continue
+        if status == "completed":
+            vs_ids[vid] = vid
+        else:
+            logger.warning(f"Vector store attach for {vid} ended with status={status}")
+
+
+def _attach_result(vector_store_id: str, file_ids: List[str], vs_ids: dict) -> dict:
+    _invalidate_vs_files(vector_store_id)
+    return {fid: vs_ids.get(fid) for fid in file_ids}
+
+
+def _attach_files_to_vector_store(client: OpenAI, vector_store_id: str, file_ids: List[str]) -> dict:
+    """Attach many files with as few file batches as possible and wait for them to settle.
+    Returns {file_id: vs_file_id}; vs_file_id is None for files that did not complete.
+    """
+    if not file_ids:
+        return {}
+    batches = _vs_file_batches(client)
+    vs_ids: dict = {}
+    for chunk in _vs_batch_chunks(file_ids):
         try:
-            beta = getattr(client, "beta")
-            for attr in ["delete", "del"]:
-                try:
-                    getattr(beta.vector_stores.files, attr)(vector_store_id=vector_store_id, file_id=file_id)
-                    last_err = None
-                    break
-                except Exception as e2:
-                    last_err = e2
-        except Exception:
-            pass
-    if last_err:
-        logger.error(f"Failed detaching file from vector store: {last_err}")
+            batch = _retry(batches.create_and_poll, vector_store_id=vector_store_id, file_ids=chunk)
+        except Exception as e:
+            raise _attach_batch_failed(e)
+        try:
+            listed = list(batches.list_files(batch.id, vector_store_id=vector_store_id))
+        except Exception as e:
+            logger.warning(f"Listing files for batch {batch.id} failed (continuing): {e}")
+            listed = []
+        _record_batch_files(batch, listed, vs_ids)
+    return _attach_result(vector_store_id, file_ids, vs_ids)
+
+
+async def _attach_files_to_vector_store_async(client: AsyncOpenAI, vector_store_id: str, file_ids: List[str]) -> dict:
+    """AsyncOpenAI counterpart of _attach_files_to_vector_store (same chunking and return shape)."""
+    if not file_ids:
+        return {}
+    batches = _vs_file_batches(client)
+    vs_ids: dict = {}
+    for chunk in _vs_batch_chunks(file_ids):
+        try:
+            batch = await _aretry(batches.create_and_poll, vector_store_id=vector_store_id, file_ids=chunk)
+        except Exception as e:
+            raise _attach_batch_failed(e)
+        try:
+            listed = [it async for it in batches.list_files(batch.id, vector_store_id=vector_store_id)]
+        except Exception as e:
+            logger.warning(f"Listing files for batch {batch.id} failed (continuing): {e}")
+            listed = []
+        _record_batch_files(batch, listed, vs_ids)
+    return _attach_result(vector_store_id, file_ids, vs_ids)
+
+
+def _delete_vs_file(client: OpenAI, vector_store_id: str, file_id: str):
+    # Detach from Vector Store
+    try:
+        _vs_file_detach(client)(vector_store_id=vector_store_id, file_id=file_id)
+    except Exception as e:
+        logger.error(f"Failed detaching file from vector store: {e}")
         raise HTTPException(status_code=500, detail="Failed detaching file from vector store")
 
     # Delete the underlying OpenAI File
-    last_err = None
-    for attr in ["delete", "del"]:
-        try:
-            getattr(client.files, attr)(file_id)
-            last_err = None
-            break
-        except Exception as e:
-            last_err = e
-    if last_err:
-        logger.warning(f"Detached but failed deleting OpenAI file: {last_err}")
+    try:
+        _file_delete(client)(file_id)
+    except Exception as e:
+        logger.warning(f"Detached but failed deleting OpenAI file: {e}")
 
 
 def _flexible_detach(client: OpenAI, vector_store_id: str, vs_file_id: Optional[str], openai_file_id: Optional[str]) -> bool:
-    """Attempt to detach using either vs_file_id or openai_file_id, tolerant of variants.
+    """Attempt to detach using either vs_file_id or openai_file_id.
     Returns True if detachment appears successful or the file was already absent.
     """
     candidates = [c for c in [openai_file_id, vs_file_id] if c]
     if not candidates:
         return True  # nothing to detach
 
-    # Try modern and beta namespaces; tolerate 404s/not-found
+    detach = _vs_file_detach(client)
+    # Tolerate 404s/not-found
     for cid in candidates:
-        last_err = None
-        for api in [getattr(client, "vector_stores", None), getattr(getattr(client, "beta", None), "vector_stores", None)]:
-            if api is None:
-                continue
-            for attr in ["delete", "del"]:
-                try:
-                    getattr(api.files, attr)(vector_store_id=vector_store_id, file_id=cid)
-                    last_err = None
-                    return True
-                except Exception as e:
-                    msg = f"{e}".lower()
-                    if any(s in msg for s in ["not found", "no such", "not attached", "already"]) or getattr(e, "status", None) == 404:
-                        return True
-                    last_err = e
-        if last_err:
-            logger.debug(f"Detach attempt failed for candidate id {cid}: {last_err}")
+        try:
+            detach(vector_store_id=vector_store_id, file_id=cid)
+            return True
+        except Exception as e:
+            msg = f"{e}".lower()
+            if any(s in msg for s in ["not found", "no such", "not attached", "already"]) or getattr(e, "status", None) == 404:
+                return True
+            logger.debug(f"Detach attempt failed for candidate id {cid}: {e}")
     return False
 
 
+@functools.lru_cache(maxsize=1)
 def _has_ocrmypdf() -> bool:
-    import subprocess
-    try:
-        subprocess.run(["ocrmypdf", "--version"], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        return True
-    except Exception:
-        return False
+    # PATH scan only, once per process: no fork/exec per PDF
+    return shutil.which("ocrmypdf") is not None
 
 
 def _run_ocrmypdf(src_pdf_path: str) -> Optional[str]:
@@ -297,70 +593,116 @@ def _run_ocrmypdf(src_pdf_path: str) -> Optional[str]:
         return None
 
 
+# Storage folder for OCR'd PDFs keyed by the SHA-256 of the original bytes
+_OCR_CACHE_PREFIX = "ocr_cache"
+
+
+def _run_ocrmypdf_cached(src_pdf_path: str, content_sha256: Optional[str]) -> Optional[str]:
+    """_run_ocrmypdf, memoized in Storage by the input's SHA-256 (already computed while spooling).
+    A hit downloads the earlier OCR output instead of re-running ocrmypdf; cache errors fall back to OCR.
+    """
+    if not (settings.INGEST_OCR_CACHE and content_sha256):
+        return _run_ocrmypdf(src_pdf_path)
+    key = f"{_OCR_CACHE_PREFIX}/{content_sha256}.pdf"
+    try:
+        bucket = supabase.storage.from_(settings.SUPABASE_STORAGE_BUCKET)
+        cached = bucket.download(key)
+    except Exception:
+        cached = None  # miss (404) or Storage unavailable
+    if cached:
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as dst:
+            dst.write(cached)
+        logger.info(f"Reusing cached OCR output {key}")
+        return dst.name
+    ocr_path = _run_ocrmypdf(src_pdf_path)
+    if ocr_path:
+        try:
+            with open(ocr_path, "rb") as fh:
+                bucket.upload(key, fh, {"content-type": "application/pdf", "upsert": "true"})
+        except Exception as e:
+            logger.warning(f"Failed to cache OCR output {key}: {e}")
+    return ocr_path
+
+
+# Common civic document types, checked in priority order (first marker found wins)
+_DOC_TYPES = (
+    ("agenda", "agenda"),
+    ("minutes", "minutes"),
+    ("ordinance", "ordinance"),
+    ("transcript", "transcript"),
+    ("transcipt", "transcript"),  # tolerate misspelling
+    ("report", "report"),
+)
+_YEAR_RE = re.compile(r"\b(20\d{2}|19\d{2})\b")
+
+
 def _derive_year_and_doctype(filename: str) -> tuple[Optional[str], Optional[str]]:
     fn = filename or ""
-    m = re.search(r"\b(20\d{2}|19\d{2})\b", fn)
+    m = _YEAR_RE.search(fn)
     year = m.group(1) if m else None
     low = fn.lower()
-    doc_type = None
-    # Recognize common civic document types
-    if "agenda" in low:
-        doc_type = "agenda"
-    elif "minutes" in low:
-        doc_type = "minutes"
-    elif "ordinance" in low:
-        doc_type = "ordinance"
-    elif "transcript" in low or "transcipt" in low:  # tolerate misspelling
-        doc_type = "transcript"
-    elif "report" in low:
-        doc_type = "report"
+    doc_type = next((v for k, v in _DOC_TYPES if k in low), None)
     return year, doc_type
 
 
+_MONTHS = {
+    "january": 1, "february": 2, "march": 3, "april": 4, "may": 5, "june": 6,
+    "july": 7, "august": 8, "september": 9, "october": 10, "november": 11, "december": 12,
+}
+# YYYY[-_./]MM[-_./]DD, MM[-_./]DD[-_./]YYYY and "Month D, YYYY" fused into one alternation
+# (priority order). The lookahead lets finditer() report a candidate at every position in a
+# single walk over the text; the alternatives can't start at the same position, so none hides
+# another.
+_MEETING_DATE_RE = re.compile(
+    r"(?=\b(?:"
+    r"(?P<ymd>(20\d{2}|19\d{2})[-_\./](\d{1,2})[-_\./](\d{1,2}))"
+    r"|(?P<mdy>(\d{1,2})[-_\./](\d{1,2})[-_\./](20\d{2}|19\d{2}))"
+    r"|(?P<named>(" + "|".join(_MONTHS) + r")\s+(\d{1,2})(?:st|nd|rd|th)?\,\s*(20\d{2}|19\d{2}))"
+    r")\b)",
+    re.IGNORECASE,
+)
+_MEETING_DATE_FORMATS = ("ymd", "mdy", "named")
+
+
+def _meeting_date_from_match(kind: str, m: re.Match) -> Optional[date]:
+    g = m.groups()
+    try:
+        if kind == "ymd":
+            return date(int(g[1]), int(g[2]), int(g[3]))
+        if kind == "mdy":
+            return date(int(g[7]), int(g[5]), int(g[6]))
+        return date(int(g[11]), _MONTHS[g[9].lower()], int(g[10]))
+    except Exception:
+        return None
+
+
 def _parse_meeting_date_from_text(text: str) -> Optional[date]:
     """Best-effort meeting date parser from filename or small text snippet.
     Supports formats: YYYY-MM-DD, YYYY_MM_DD, MM-DD-YYYY, MM/DD/YYYY, Month D, YYYY.
+    The first occurrence of each format is tried in that order; an invalid date falls through to the next format.
     """
     if not text:
         return None
-    t = text.strip()
-    # 1) YYYY[-_/]MM[-_/]DD
-    m = re.search(r"\b(20\d{2}|19\d{2})[-_\./](\d{1,2})[-_\./](\d{1,2})\b", t)
-    if m:
-        y, mo, d = int(m.group(1)), int(m.group(2)), int(m.group(3))
-        try:
-            return date(y, mo, d)
-        except Exception:
-            pass
-    # 2) MM[-_/]DD[-_/]YYYY
-    m = re.search(r"\b(\d{1,2})[-_\./](\d{1,2})[-_\./](20\d{2}|19\d{2})\b", t)
-    if m:
-        mo, d, y = int(m.group(1)), int(m.group(2)), int(m.group(3))
-        try:
-            return date(y, mo, d)
-        except Exception:
-            pass
-    # 3) Month D, YYYY
-    months = {
-        "january": 1, "february": 2, "march": 3, "april": 4, "may": 5, "june": 6,
-        "july": 7, "august": 8, "september": 9, "october": 10, "november": 11, "december": 12,
-    }
-    m = re.search(r"\b(january|february|march|april|may|june|july|august|september|october|november|december)\s+(\d{1,2})(?:st|nd|rd|th)?\,\s*(20\d{2}|19\d{2})\b", t, flags=re.IGNORECASE)
-    if m:
-        mo = months[m.group(1).lower()]
-        d = int(m.group(2))
-        y = int(m.group(3))
-        try:
-            return date(y, mo, d)
-        except Exception:
-            pass
+    first: dict = {}
+    for m in _MEETING_DATE_RE.finditer(text.strip()):
+        if m.lastgroup in first:
+            continue
+        first[m.lastgroup] = m
+        # A valid date in the top-priority format can't be beaten: stop scanning
+        if m.lastgroup == _MEETING_DATE_FORMATS[0] and _meeting_date_from_match(m.lastgroup, m):
+            break
+    for kind in _MEETING_DATE_FORMATS:
+        if kind in first:
+            parsed = _meeting_date_from_match(kind, first[kind])
+            if parsed:
+                return parsed
     return None
 
 
-def _derive_meeting_body(text: str) -> Optional[str]:
-    if not text:
-        return None
-    candidates = [
+# Meeting bodies in priority order, paired with their title-cased storage form
+_MEETING_BODIES = tuple(
+    (c, " ".join(w.capitalize() for w in c.split()))
+    for c in (
         "city council",
         "town council",
         "village council",
@@ -371,20 +713,25 @@ def _derive_meeting_body(text: str) -> Optional[str]:
         "zoning board",
         "board of supervisors",
         "council meeting",
-    ]
+    )
+)
+
+
+def _derive_meeting_body(text: str) -> Optional[str]:
+    if not text:
+        return None
     low = text.lower()
-    for c in candidates:
-        if c in low:
-            # Title case it for storage
-            return " ".join(w.capitalize() for w in c.split())
-    return None
+    return next((titled for c, titled in _MEETING_BODIES if c in low), None)
+
+
+# Match patterns like: Ordinance 2023-15, Ord. No. 1234, Ordinance #4567
+_ORD_RE = re.compile(r"\b(?:ordinance|ord\.)\s*(?:no\.|#)?\s*([A-Za-z0-9-]+)\b", re.IGNORECASE)
 
 
 def _derive_ordinance_number(text: str) -> Optional[str]:
     if not text:
         return None
-    # Match patterns like: Ordinance 2023-15, Ord. No. 1234, Ordinance #4567
-    m = re.search(r"\b(?:ordinance|ord\.)\s*(?:no\.|#)?\s*([A-Za-z0-9-]+)\b", text, flags=re.IGNORECASE)
+    m = _ORD_RE.search(text)
     if m:
         return m.group(1)
     return None
@@ -406,19 +753,110 @@ def _safe_extract_text(path: str, limit: int = 2000) -> str:
         return ""
 
 
-def _upload_file_with_optional_metadata(client: OpenAI, file_path: str, metadata: Optional[dict] = None):
-    """Create OpenAI File with purpose 'assistants'. Try with metadata, fallback without if unsupported."""
-    with open(file_path, "rb") as fh:
+@functools.lru_cache(maxsize=256)
+def _mime_for_ext(ext: str) -> str:
+    return mimetypes.guess_type(f"x{ext}")[0] or "application/octet-stream"
+
+
+def _mime_for_name(name: str) -> str:
+    """Content type for an upload name, cached per extension so files.create never has to guess."""
+    return _mime_for_ext(os.path.splitext(name or "")[1].lower())
+
+
+def _upload_file_with_optional_metadata(client: OpenAI, file: str | Tuple[str, bytes, str], metadata: Optional[dict] = None):
+    """Create OpenAI File with purpose 'assistants'. Try with metadata, fallback without if unsupported.
+    `file` is a path on disk or a (filename, bytes or open binary handle, mimetype) tuple.
+    """
+    if isinstance(file, tuple):
+        return _create_file_with_optional_metadata(client, file, metadata)
+    with open(file, "rb") as fh:
+        name = os.path.basename(file)
+        return _create_file_with_optional_metadata(client, (name, fh, _mime_for_name(name)), metadata)
+
+
+def _create_file_with_optional_metadata(client: OpenAI, file, metadata: Optional[dict] = None):
+    if hasattr(file[1], "seek"):
+        # Rewind so _retry can resend the same handle
+        file[1].seek(0)
+    try:
+        if metadata:
+            return client.files.create(file=file, purpose="assistants", metadata=metadata)  # type: ignore[arg-type]
+        else:
+            return client.files.create(file=file, purpose="assistants")
+    except Exception as e:
+        if _is_transient_openai_error(e):
+            raise
+        # Retry without metadata if the SDK/server rejects it
+        logger.debug(f"files.create with metadata failed, retrying without. err={e}")
+        if hasattr(file[1], "seek"):
+            file[1].seek(0)
+        return client.files.create(file=file, purpose="assistants")
+
+
+# Spool uploads in 1 MiB chunks so peak memory per file stays bounded
+_SPOOL_CHUNK = 1 << 20
+
+
+async def _spool_upload(uf: UploadFile, tmp_dir: Optional[str] = None) -> Tuple[str, Optional[int], str]:
+    """Stream an UploadFile to a tmp path (keeping its suffix) and return (path, size, sha256 hex).
+    tmp_dir places the file in a caller-owned directory (e.g. one per request).
+    """
+    suffix = os.path.splitext(uf.filename or "upload.bin")[1]
+    fd, tmp_path = tempfile.mkstemp(suffix=suffix, dir=tmp_dir)
+    os.close(fd)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(tmp_path, "wb") as out:
+            while chunk := await uf.read(_SPOOL_CHUNK):
+                digest.update(chunk)
+                size += len(chunk)
+                await out.write(chunk)
+    except Exception:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+    return tmp_path, (size or None), digest.hexdigest()
+
+
+def _build_upload_payload(filename: Optional[str], tmp_path: str, ocr_pages: int, size: Optional[int] = None) -> Tuple[tuple, str, int]:
+    """Extract/OCR one spooled upload (blocking; run in a worker thread).
+    Returns the upload payload (name, bytes or Path, content type), the result name and byte size.
+    size is the spooled byte count, when the caller already knows it.
+    The caller owns tmp_path and removes it once the upload is done.
+    """
+    suffix = os.path.splitext(filename or "upload.bin")[1]
+    # Probe the text layer first: image-only PDFs skip the full parse, born-digital ones skip OCR
+    is_pdf = suffix.lower() == ".pdf"
+    text_layer = pdf_has_text_layer(tmp_path) if is_pdf else None
+
+    text_to_use: Optional[str] = None
+    if text_layer is not False:
         try:
-            if metadata:
-                return client.files.create(file=fh, purpose="assistants", metadata=metadata)  # type: ignore[arg-type]
-            else:
-                return client.files.create(file=fh, purpose="assistants")
+            text = extract_text(tmp_path)
+            if text and len(text.strip()) >= 200:
+                text_to_use = text
         except Exception as e:
-            # Retry without metadata if the SDK/server rejects it
-            logger.debug(f"files.create with metadata failed, retrying without. err={e}")
-            fh.seek(0)
-            return client.files.create(file=fh, purpose="assistants")
+            logger.warning(f"Text extraction failed for {filename}: {e}")
+
+    # Optional lightweight OCR on first N pages if PDF and no usable text
+    if text_to_use is None and ocr_pages and is_pdf and text_layer is not True:
+        try:
+            # Render just the pages we will OCR, instead of the whole document
+            ocr_text = ocr_images(render_pdf_pages(tmp_path, ocr_pages))
+            if ocr_text and len(ocr_text.strip()) >= 200:
+                text_to_use = ocr_text
+        except Exception as e:
+            logger.warning(f"Lightweight OCR failed for {filename}: {e}")
+
+    if text_to_use is not None:
+        # Upload the text under the original filename (so OpenAI sees a friendly name)
+        base = os.path.splitext(filename or "upload")[0]
+        data = text_to_use.encode("utf-8")
+        return (os.path.basename(f"{base}.txt"), data, "text/plain"), f"{filename}.txt", len(data)
+
+    # Fallback: stream the spooled file itself under the friendly filename (no renamed copy)
+    name = os.path.basename(filename or "upload.bin")
+    return (name, Path(tmp_path), _mime_for_name(name)), filename or os.path.basename(tmp_path), size if size is not None else os.path.getsize(tmp_path)
 
 
 @router.post("/upload", response_model=list[UploadResult])
@@ -432,99 +870,69 @@ async def upload_to_vector_store(
     - Accepts files
     - Attempts text extraction; if low-content PDF and ocr_pages>0, runs lightweight OCR on first N pages
     - Uploads the best artifact (text, else original) to OpenAI Files
-    - Attaches each file to the workspace vector store
+    - Attaches the uploaded files to the workspace vector store
+    Files are processed concurrently (up to INGEST_CONCURRENCY at a time).
     Returns: list of { id, name, size }
     """
-    vector_store_id = _get_vector_store_id(workspace_id)
-    client = OpenAI()
+    vector_store_id = await asyncio.to_thread(_get_vector_store_id, workspace_id)
+    client = get_async_openai_client()
+    sem = asyncio.Semaphore(max(1, settings.INGEST_CONCURRENCY))
+    # Extraction/OCR is CPU-bound: cap it like the ingest pipeline's OCR stage so the
+    # remaining slots keep streaming uploads instead of contending for cores
+    cpu_sem = asyncio.Semaphore(max(1, settings.INGEST_OCR_WORKERS))
+    # One scratch dir per request, removed in a single rmtree once every file has settled.
+    # TemporaryDirectory's finalizer still removes it if this coroutine is torn down early.
+    req_tmp = tempfile.TemporaryDirectory(prefix="vs_upload_", ignore_cleanup_errors=True)
+    req_dir = req_tmp.name
+
+    async def _ingest_one(uf: UploadFile) -> UploadResult:
+        async with sem:
+            # Spool, extract/OCR in a worker thread, then stream the upload without blocking the loop
+            tmp_path, spooled_size, _ = await _spool_upload(uf, req_dir)
+            async with cpu_sem:
+                payload, name, size = await asyncio.to_thread(_build_upload_payload, uf.filename, tmp_path, ocr_pages, spooled_size or 0)
+            file_id = await _aretry(_create_openai_file_http, *payload)
+            return UploadResult(id=file_id, name=name, size=size)
+
+    # gather keeps results in upload order; surface the first failure once every file has settled
+    try:
+        outcomes = await asyncio.gather(*[_ingest_one(uf) for uf in files], return_exceptions=True)
+    finally:
+        # rmtree is blocking filesystem work; keep it off the event loop
+        await asyncio.to_thread(req_tmp.cleanup)
+    results: List[UploadResult] = [out for out in outcomes if not isinstance(out, BaseException)]
+    failure = next((out for out in outcomes if isinstance(out, BaseException)), None)
+
+    # Attach every file that did upload in one file batch, even when another one failed,
+    # so successes are kept (as the per-file attach did) instead of orphaned in OpenAI Files
+    try:
+        await _attach_files_to_vector_store_async(client, vector_store_id, [r.id for r in results])
+    except Exception:
+        await _gather_limited(_delete_openai_file_http, [r.id for r in results])
+        raise
+    if failure is not None:
+        raise failure
 
-    results: List[UploadResult] = []
+    return results
 
-    for uf in files:
-        # Save to temp file (raw) but upload using a friendly filename path
-        upload_dir = tempfile.mkdtemp(prefix="vs_upload_")
-        suffix = os.path.splitext(uf.filename or "upload.bin")[1]
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            raw = await uf.read()
-            tmp.write(raw)
-            tmp_path = tmp.name
 
-        text_to_use: Optional[str] = None
-        try:
-            text = extract_text(tmp_path)
-            if text and len(text.strip()) >= 200:
-                text_to_use = text
-        except Exception as e:
-            logger.warning(f"Text extraction failed for {uf.filename}: {e}")
-
-        # Optional lightweight OCR on first N pages if PDF and no usable text
-        if text_to_use is None and ocr_pages and suffix.lower() == ".pdf":
-            try:
-                from pdf2image import convert_from_path
-                import pytesseract
-                pages = convert_from_path(tmp_path)
-                pages = pages[: max(1, min(len(pages), ocr_pages))]
-                ocr_text = "\n\n".join(pytesseract.image_to_string(p) for p in pages)
-                if ocr_text and len(ocr_text.strip()) >= 200:
-                    text_to_use = ocr_text
-            except Exception as e:
-                logger.warning(f"Lightweight OCR failed for {uf.filename}: {e}")
-
-        # Prepare and upload to OpenAI
-        if text_to_use is not None:
-            # Write text to a path that uses the original filename (so OpenAI sees a friendly name)
-            base = os.path.splitext(uf.filename or "upload")[0]
-            desired = os.path.basename(f"{base}.txt")
-            txt_path = os.path.join(upload_dir, desired)
-            with open(txt_path, "w", encoding="utf-8") as t:
-                t.write(text_to_use)
-            with open(txt_path, "rb") as fh:
-                try:
-                    created = client.files.create(file=fh, purpose="assistants")
-                except Exception:
-                    fh.seek(0)
-                    created = client.files.create(file=fh, purpose="assistants")
-            _attach_file_to_vector_store(client, vector_store_id, created.id)
-            results.append(UploadResult(id=created.id, name=f"{uf.filename}.txt", size=len(text_to_use)))
-        else:
-            # Fallback to original file: copy to a friendly-named path for upload
-            desired = os.path.basename(uf.filename or "upload.bin")
-            upload_path = os.path.join(upload_dir, desired)
-            try:
-                # Copy bytes to the upload path
-                with open(tmp_path, "rb") as src, open(upload_path, "wb") as dst:
-                    dst.write(src.read())
-            except Exception:
-                upload_path = tmp_path
-            with open(upload_path, "rb") as fh:
-                created = client.files.create(file=fh, purpose="assistants")
-            _attach_file_to_vector_store(client, vector_store_id, created.id)
-            results.append(UploadResult(id=created.id, name=uf.filename or os.path.basename(tmp_path)))
+# file_id -> {"name", "size"}; an OpenAI file's name and byte count never change, so no TTL
+_FILE_META_CACHE_MAX = 10_000
+_file_meta_cache: "OrderedDict[str, dict]" = OrderedDict()
 
-        # Cleanup tmp
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
-        try:
-            # cleanup any upload artifacts
-            if 'upload_path' in locals() and upload_path and os.path.exists(upload_path) and upload_path != tmp_path:
-                os.remove(upload_path)
-            if 'txt_path' in locals() and txt_path and os.path.exists(txt_path):
-                os.remove(txt_path)
-            if upload_dir and os.path.isdir(upload_dir):
-                os.rmdir(upload_dir)
-        except Exception:
-            pass
 
-    return results
+def _remember_file_meta(file_id: str, meta: dict) -> None:
+    _file_meta_cache[file_id] = meta
+    _file_meta_cache.move_to_end(file_id)
+    while len(_file_meta_cache) > _FILE_META_CACHE_MAX:
+        _file_meta_cache.popitem(last=False)
 
 
 @router.get("/list")
 async def list_vector_store_files(workspace_id: str = Query(...), enrich: bool = Query(False)):
-    vector_store_id = _get_vector_store_id(workspace_id)
+    vector_store_id = await asyncio.to_thread(_get_vector_store_id, workspace_id)
     # HTTP-first for reliability across SDK variants
-    data = await _list_vs_files_http(vector_store_id)
+    data = await _list_vs_files_http(vector_store_id, max_age=_VS_LIST_CACHE_TTL)
 
     items: list[dict] = []
     for it in data:
@@ -542,26 +950,28 @@ async def list_vector_store_files(workspace_id: str = Query(...), enrich: bool =
     # Optional enrichment with filename/bytes
     if enrich and items:
         base = os.environ.get("OPENAI_BASE_URL", "https://api.openai.com")
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            for item in items:
-                fid = item.get("file_id")
-                if not fid:
-                    continue
-                try:
-                    r = await client.get(f"{base}/v1/files/{fid}", headers=_openai_headers())
-                    if r.is_success:
-                        meta = r.json() or {}
-                        item["name"] = meta.get("filename")
-                        item["size"] = meta.get("bytes")
-                except Exception:
-                    pass
+        client = get_async_http_client()
+
+        async def _fetch_meta(file_id: str):
+            r = await client.get(f"{base}/v1/files/{file_id}", headers=_openai_headers(), timeout=10.0)
+            if r.is_success:
+                meta = r.json() or {}
+                _remember_file_meta(file_id, {"name": meta.get("filename"), "size": meta.get("bytes")})
+
+        # Only cache misses hit OpenAI; failures leave name/size unset, as before
+        misses = list({item["file_id"] for item in items if item.get("file_id") and item["file_id"] not in _file_meta_cache})
+        await _gather_limited(_fetch_meta, misses)
+        for item in items:
+            meta = _file_meta_cache.get(item.get("file_id"))
+            if meta:
+                item.update(meta)
 
     return {"vector_store_id": vector_store_id, "files": items}
 
 
 @router.delete("/file/{id_or_file_id}")
 async def delete_vector_store_file(id_or_file_id: str, workspace_id: str = Query(...), also_delete_file: bool = Query(True)):
-    vector_store_id = _get_vector_store_id(workspace_id)
+    vector_store_id = await asyncio.to_thread(_get_vector_store_id, workspace_id)
     # Try REST detach; tolerate 404
     await _delete_vs_attachment_http(vector_store_id, id_or_file_id)
     # Optionally delete underlying OpenAI file (best-effort)
@@ -615,7 +1025,7 @@ def soft_delete_file(body: SoftDeleteBody):
         raise HTTPException(status_code=500, detail="Failed to query file_workspaces")
 
     # Detach (tolerant)
-    client = OpenAI()
+    client = get_openai_client()
     try:
         _flexible_detach(client, vector_store_id, row.get("vs_file_id"), row.get("openai_file_id"))
     except Exception as e:
@@ -623,16 +1033,10 @@ def soft_delete_file(body: SoftDeleteBody):
 
     # Optionally delete OpenAI File
     if body.also_delete_openai and row.get("openai_file_id"):
-        last_err = None
-        for attr in ["delete", "del"]:
-            try:
-                getattr(client.files, attr)(row["openai_file_id"])  # type: ignore
-                last_err = None
-                break
-            except Exception as e:
-                last_err = e
-        if last_err:
-            logger.warning(f"Failed deleting OpenAI file {row.get('openai_file_id')}: {last_err}")
+        try:
+            _file_delete(client)(row["openai_file_id"])
+        except Exception as e:
+            logger.warning(f"Failed deleting OpenAI file {row.get('openai_file_id')}: {e}")
 
     # Optionally delete storage object
     f = row.get("files") or {}
@@ -647,11 +1051,12 @@ def soft_delete_file(body: SoftDeleteBody):
         supabase.table("file_workspaces").update(
             {
                 "deleted": True,
-                "deleted_at": __import__("datetime").datetime.utcnow().isoformat(),
+                "deleted_at": datetime.now(timezone.utc).isoformat(),
                 "ingested": False,
                 "openai_file_id": None,
                 "vs_file_id": None,
-            }
+            },
+            returning="minimal",
         ).eq("workspace_id", ws_id).eq("file_id", file_id).execute()
     except Exception as e:
         logger.error(f"Failed to update file_workspaces soft-delete flags: {e}")
@@ -717,24 +1122,53 @@ class PurgeBody(BaseModel):
     reset_db_flags: bool = True
 
 
+async def _detach_all(vector_store_id: str, data: list[dict], delete_files: bool) -> Tuple[int, int]:
+    """Detach every listed attachment (bounded fan-out), then optionally delete the OpenAI files.
+    Returns (detached, files_deleted).
+    """
+    targets: list = []
+    file_ids: list = []
+    for it in data:
+        file_id = it.get("file_id") or it.get("id")
+        target = file_id or it.get("id")
+        if not target:
+            continue
+        targets.append(target)
+        if delete_files and file_id and str(file_id).startswith("file-"):
+            file_ids.append(file_id)
+
+    detached = 0
+    for target, res in zip(targets, await _gather_limited(lambda t: _delete_vs_attachment_http(vector_store_id, t), targets)):
+        if isinstance(res, BaseException):
+            logger.warning(f"Detach failed for {target}: {res}")
+        else:
+            detached += 1
+
+    deleted = 0
+    if file_ids:
+        for file_id, res in zip(file_ids, await _gather_limited(_delete_openai_file_http, file_ids)):
+            if isinstance(res, BaseException):
+                logger.debug(f"OpenAI file delete failed for {file_id} (continuing): {res}")
+            else:
+                deleted += 1
+    return detached, deleted
+
+
 @router.post("/vector-store/purge")
 async def purge_vector_store(body: PurgeBody):
     """
     HTTP-first purge: detach every attachment from the workspace's Vector Store via REST.
     Optionally delete the underlying OpenAI file. Optionally reset DB flags (ignored if DB empty).
     """
-    vector_store_id = _get_vector_store_id(body.workspace_id)
+    vector_store_id = await asyncio.to_thread(_get_vector_store_id, body.workspace_id)
     # Prefer REST listing; fall back to SDK list when REST is unavailable (e.g., unit tests)
     try:
         data = await _list_vs_files_http(vector_store_id)
     except Exception as e_list:
         logger.debug(f"REST list failed in purge (will try SDK fallback): {e_list}")
         try:
-            client = OpenAI()
-            try:
-                lst = client.vector_stores.files.list(vector_store_id=vector_store_id)
-            except Exception:
-                lst = getattr(client, "beta").vector_stores.files.list(vector_store_id=vector_store_id)  # type: ignore
+            client = get_openai_client()
+            lst = await asyncio.to_thread(_vs_files(client).list, vector_store_id=vector_store_id)
             items = getattr(lst, "data", None) or []
             # Normalize to REST-like shape for downstream logic
             data = []
@@ -750,23 +1184,7 @@ async def purge_vector_store(body: PurgeBody):
         except Exception as e_sdk:
             logger.warning(f"Both REST and SDK list failed in purge: {e_sdk}")
             data = []
-    detached = 0
-    for it in data:
-        vs_file_id = it.get("id")
-        file_id = it.get("file_id") or it.get("id")
-        target = file_id or vs_file_id
-        if not target:
-            continue
-        try:
-            await _delete_vs_attachment_http(vector_store_id, target)
-            detached += 1
-        except Exception as e:
-            logger.warning(f"Detach failed for {target}: {e}")
-        if body.delete_openai and file_id and str(file_id).startswith("file-"):
-            try:
-                await _delete_openai_file_http(file_id)
-            except Exception as e:
-                logger.debug(f"OpenAI file delete failed (continuing): {e}")
+    detached, _ = await _detach_all(vector_store_id, data, body.delete_openai)
 
     if body.reset_db_flags:
         try:
@@ -774,7 +1192,7 @@ async def purge_vector_store(body: PurgeBody):
                 "ingested": False,
                 "openai_file_id": None,
                 "vs_file_id": None,
-            }).eq("workspace_id", body.workspace_id).execute()
+            }, returning="minimal").eq("workspace_id", body.workspace_id).execute()
         except Exception as e:
             logger.debug(f"DB reset skipped/failed (continuing): {e}")
 
@@ -798,33 +1216,35 @@ async def hard_purge_vector_store(body: HardPurgeBody):
       - polls until empty or max_iters reached
     Ignores DB state entirely (safe for wiped DBs).
     """
-    vector_store_id = _get_vector_store_id(body.workspace_id)
+    vector_store_id = await asyncio.to_thread(_get_vector_store_id, body.workspace_id)
 
     iters = 0
     total_detached = 0
     while iters < body.max_iters:
-        data = await _list_vs_files_http(vector_store_id)
-        if not data:
+        # Pipeline list + detach: page N is detached while page N+1 is fetched
+        seen_any = False
+        detached_this_round = 0
+        pending: Optional[asyncio.Task] = None
+        try:
+            async for page in _iter_vs_files_http(vector_store_id):
+                if not page:
+                    break
+                seen_any = True
+                if pending is not None:
+                    detached_this_round += (await pending)[0]
+                pending = asyncio.create_task(_detach_all(vector_store_id, page, body.also_delete_file))
+        except HTTPException as e:
+            if not seen_any:
+                raise
+            # The cursor can go stale under concurrent deletes; the next round re-lists from the start
+            logger.debug(f"Listing the next page failed mid-purge (re-listing next round): {e}")
+        finally:
+            if pending is not None:
+                detached_this_round += (await pending)[0]
+        if not seen_any:
             return {"ok": True, "vector_store_id": vector_store_id, "detached": total_detached, "iterations": iters}
 
-        detached_this_round = 0
-        for it in data:
-            vs_file_id = it.get("id")
-            file_id = it.get("file_id") or it.get("id")
-            primary = file_id or vs_file_id
-            if not primary:
-                continue
-            try:
-                await _delete_vs_attachment_http(vector_store_id, primary)
-                detached_this_round += 1
-                total_detached += 1
-            except Exception as e:
-                logger.warning(f"Hard purge detach failed for {primary}: {e}")
-            if body.also_delete_file and file_id and str(file_id).startswith("file-"):
-                try:
-                    await _delete_openai_file_http(file_id)
-                except Exception as e:
-                    logger.debug(f"OpenAI file delete failed (continuing): {e}")
+        total_detached += detached_this_round
 
         iters += 1
         if detached_this_round == 0:
@@ -842,7 +1262,8 @@ async def hard_purge_vector_store(body: HardPurgeBody):
     }
 
 
-@router.get("/vector-store/health")
+# orjson: the full health payload (counts plus id samples) serializes several times faster
+@router.get("/vector-store/health", response_class=ORJSONResponse)
 def vector_store_health(workspace_id: str = Query(...)):
     """
     Report current health for a workspace's Vector Store and DB join state.
@@ -852,7 +1273,7 @@ def vector_store_health(workspace_id: str = Query(...)):
     - Dangling attachments: VS items without matching DB ids; DB ingested rows missing in VS
     """
     vector_store_id = _get_vector_store_id(workspace_id)
-    client = OpenAI()
+    client = get_openai_client()
 
     # Gather DB rows for this workspace
     try:
@@ -868,56 +1289,81 @@ def vector_store_health(workspace_id: str = Query(...)):
         logger.error(f"Failed to query file_workspaces for health: {e}")
         raise HTTPException(status_code=500, detail="Failed to query DB for health")
 
+    # One pass over the rows: counts, DB-mapped id sets, and the ingested rows that carry
+    # an id to check against the VS listing below
     active = len(fw_rows)
-    ing_true = sum(1 for r in fw_rows if r.get("ingested") is True)
-    ing_false = sum(1 for r in fw_rows if r.get("ingested") is False)
-    with_openai = sum(1 for r in fw_rows if (r.get("openai_file_id") or None))
-    with_vs = sum(1 for r in fw_rows if (r.get("vs_file_id") or None))
-
-    # Build lookup sets for DB-mapped ids
-    db_openai_ids = {r.get("openai_file_id") for r in fw_rows if r.get("openai_file_id")}
-    db_vs_ids = {r.get("vs_file_id") for r in fw_rows if r.get("vs_file_id")}
-
-    # List VS attachments
+    ing_true = ing_false = with_openai = with_vs = 0
+    db_openai_ids: set = set()
+    db_vs_ids: set = set()
+    ingested_rows: list = []
+    for r in fw_rows:
+        oid = r.get("openai_file_id")
+        vid = r.get("vs_file_id")
+        if oid:
+            with_openai += 1
+            db_openai_ids.add(oid)
+        if vid:
+            with_vs += 1
+            db_vs_ids.add(vid)
+        ingested = r.get("ingested")
+        if ingested is True:
+            ing_true += 1
+            if oid or vid:
+                ingested_rows.append((r, oid, vid))
+        elif ingested is False:
+            ing_false += 1
+
+    # List VS attachments: every page (the default page is only 20 items, which made the
+    # dangling counts below silently wrong on any real store)
+    vs_items: list = []
+    after: Optional[str] = None
     try:
-        try:
-            lst = client.vector_stores.files.list(vector_store_id=vector_store_id)
-        except Exception:
-            lst = getattr(client, "beta").vector_stores.files.list(vector_store_id=vector_store_id)  # type: ignore
+        while True:
+            kwargs = {"vector_store_id": vector_store_id, "limit": 100}
+            if after:
+                kwargs["after"] = after
+            page = _vs_files(client).list(**kwargs)
+            data = getattr(page, "data", None) or []
+            vs_items.extend(data)
+            if not data or not getattr(page, "has_more", False):
+                break
+            after = getattr(data[-1], "id", None)
+            if not after:
+                break
     except Exception as e:
         logger.error(f"Failed listing vector store files for health: {e}")
         raise HTTPException(status_code=500, detail="Failed listing vector store files")
 
-    vs_items = getattr(lst, "data", None) or []
-    # Normalize to a set of candidate ids we can compare against DB mapping
-    vs_ids = set()
-    for it in vs_items:
-        vid = getattr(it, "file_id", None) or getattr(it, "id", None) or (isinstance(it, dict) and (it.get("file_id") or it.get("id")))
-        if vid:
-            vs_ids.add(vid)
+    # Normalize to a set of candidate ids we can compare against DB mapping. Every item in a
+    # listing has the same shape, so pick the accessor once instead of probing per item.
+    if vs_items and isinstance(vs_items[0], dict):
+        vs_ids = {vid for vid in (it.get("file_id") or it.get("id") for it in vs_items) if vid}
+    else:
+        vs_ids = set(map(_vs_item_id, vs_items))
+        vs_ids.discard(None)
 
     # Dangling: in VS but not in DB
     vs_not_in_db = sorted(list(vs_ids - db_openai_ids - db_vs_ids))
 
-    # Dangling: in DB (ingested) but not in VS (compare against either stored id)
-    db_ing_missing = []
-    for r in fw_rows:
-        if r.get("ingested") is not True:
+    # Dangling: in DB (ingested) but not in VS (compare against either stored id).
+    # Only the first few are reported, so count the rest without building their dicts.
+    sample_db_ing_missing = []
+    db_ing_missing_count = 0
+    for r, oid, vid in ingested_rows:
+        if (oid and oid in vs_ids) or (vid and vid in vs_ids):
             continue
-        cand_ids = [cid for cid in [r.get("openai_file_id"), r.get("vs_file_id")] if cid]
-        if cand_ids and not any(cid in vs_ids for cid in cand_ids):
+        db_ing_missing_count += 1
+        if len(sample_db_ing_missing) < 5:
             # capture a small sample with filename for convenience
-            name = (r.get("files") or {}).get("name")
-            db_ing_missing.append({
+            sample_db_ing_missing.append({
                 "file_id": r.get("file_id"),
-                "name": name,
-                "openai_file_id": r.get("openai_file_id"),
-                "vs_file_id": r.get("vs_file_id"),
+                "name": (r.get("files") or {}).get("name"),
+                "openai_file_id": oid,
+                "vs_file_id": vid,
             })
 
     # Trim samples
     sample_vs_not_in_db = vs_not_in_db[:5]
-    sample_db_ing_missing = db_ing_missing[:5]
 
     return {
         "workspace_id": workspace_id,
@@ -940,7 +1386,7 @@ def vector_store_health(workspace_id: str = Query(...)):
                 "sample_ids": sample_vs_not_in_db,
             },
             "db_ingested_missing_in_vs": {
-                "count": len(db_ing_missing),
+                "count": db_ing_missing_count,
                 "sample": sample_db_ing_missing,
             },
         },
@@ -957,7 +1403,8 @@ async def vector_store_health_summary(workspace_id: str = Query(...)):
     except Exception:
         # Fallback if __wrapped__ missing (older Python); just call directly
         base = vector_store_health
-    data = base(workspace_id)  # type: ignore
+    # The full health check does blocking SDK + Supabase calls; keep them off the event loop
+    data = await asyncio.to_thread(base, workspace_id)  # type: ignore
     return {
         "ok": True,
         "vector_store_id": data.get("vector_store_id"),
@@ -971,15 +1418,17 @@ async def vector_store_health_summary(workspace_id: str = Query(...)):
     }
 
 
+_NORM_RE = re.compile(r"[^a-zA-Z0-9]+")
+
+
+@functools.lru_cache(maxsize=4096)
 def _normalize_name(name: str) -> str:
+    # The `+` already collapses runs, so a single substitution pass is enough
     base = os.path.splitext(name or "")[0]
-    import re
-    s = re.sub(r"[^a-zA-Z0-9]+", "-", base.strip())
-    s = re.sub(r"-+", "-", s)
-    return s.strip("-").lower()
+    return _NORM_RE.sub("-", base.strip()).strip("-").lower()
 
 
-def _upsert_file_and_join(
+def _build_file_row(
     workspace_id: str,
     filename: str,
     openai_file_id: Optional[str],
@@ -993,88 +1442,229 @@ def _upsert_file_and_join(
     file_ext: Optional[str] = None,
     meeting_body: Optional[str] = None,
     ordinance_number: Optional[str] = None,
-) -> str:
-    """Create/update files and file_workspaces rows so the UI can list this upload.
-    Returns the files.id used.
+    content_sha256: Optional[str] = None,
+) -> dict:
+    """Build the file_workspaces payload for one upload (file_id is filled in by _flush_file_rows)."""
+    payload = {
+        "workspace_id": workspace_id,
+        "name": filename,
+        "normalized_name": _normalize_name(filename),
+        "ingested": True,
+        "deleted": False,
+        "deleted_at": None,
+        "openai_file_id": openai_file_id,
+        "vs_file_id": vs_file_id,
+    }
+
+    # Add optional metadata fields
+    optional = {
+        "meeting_date": meeting_date_iso,
+        "meeting_year": meeting_year,
+        "meeting_month": meeting_month,
+        "meeting_day": meeting_day,
+        "doc_type": doc_type,
+        "has_ocr": has_ocr,
+        "file_ext": file_ext,
+        "meeting_body": meeting_body,
+        "ordinance_number": ordinance_number,
+        "content_sha256": content_sha256,
+    }
+    payload.update({k: v for k, v in optional.items() if v is not None})
+    return payload
+
+
+# Flipped off once PostgREST reports the ingest_files_and_join function is missing
+_INGEST_RPC_AVAILABLE = True
+
+
+def _flush_file_rows(rows: List[dict], workspace_id: str) -> dict:
+    """Create/update files and file_workspaces rows for a batch of uploads so the UI can list them.
+
+    Prefers the ingest_files_and_join RPC (one round-trip, one transaction); falls back to
+    the REST path only when the function is not deployed. Returns {filename: files.id}.
     """
-    norm = _normalize_name(filename)
+    global _INGEST_RPC_AVAILABLE
+    if not rows:
+        return {}
+    if _INGEST_RPC_AVAILABLE:
+        try:
+            res = supabase.rpc("ingest_files_and_join", {"p_workspace_id": workspace_id, "p_rows": rows}).execute()
+            return {r.get("file_name"): r.get("files_id") for r in (getattr(res, "data", None) or [])}
+        except Exception as e:
+            msg = str(e)
+            if "PGRST202" not in msg and "Could not find the function" not in msg:
+                # A failure inside the function would fail the REST path the same way
+                raise RuntimeError(f"ingest_files_and_join failed: {e}")
+            _INGEST_RPC_AVAILABLE = False
+            logger.debug(f"ingest_files_and_join RPC not deployed, using REST upserts: {e}")
+    return _flush_file_rows_rest(rows, workspace_id)
+
 
-    # 1) Ensure a files row exists (lookup by exact name first)
-    file_row = None
+def _workspace_owner_id(workspace_id: str) -> str:
+    """Owner to attribute new file_workspaces rows to (user_id is NOT NULL there)."""
     try:
-        sel = supabase.table("files").select("id,name").eq("name", filename).maybe_single().execute()
-        file_row = getattr(sel, "data", None)
+        ws = supabase.table("workspaces").select("user_id").eq("id", workspace_id).maybe_single().execute()
+        row = getattr(ws, "data", None)
+        if row and row.get("user_id"):
+            return row["user_id"]
     except Exception:
-        file_row = None
-    if not file_row:
-        # Insert a minimal files row; file_path can be null
+        pass
+    # Same system user FileProcessingService and the Drive sync fall back to
+    return "773e2630-2cca-44c3-957c-0cf5ccce7411"
+
+
+def _flush_file_rows_rest(rows: List[dict], workspace_id: str) -> dict:
+    """REST fallback for _flush_file_rows.
+
+    files.name is not unique, so files are resolved with one select plus one bulk insert for
+    the missing names; file_workspaces is then written with upserts on its primary key.
+    """
+    names = list(dict.fromkeys(r["name"] for r in rows))
+
+    # 1) Ensure a files row exists for every name (lookup by exact name first)
+    file_ids: dict = {}
+    try:
+        sel = supabase.table("files").select("id,name").in_("name", names).execute()
+        for fr in getattr(sel, "data", None) or []:
+            file_ids.setdefault(fr.get("name"), fr.get("id"))
+    except Exception:
+        pass
+    missing = [n for n in names if not file_ids.get(n)]
+    if missing:
+        # Insert minimal files rows; file_path can be null
         try:
-            ins = supabase.table("files").insert({
-                "name": filename,
-            }).execute()
-            data = getattr(ins, "data", None) or []
-            file_row = data[0] if data else None
+            ins = supabase.table("files").insert([{"name": n} for n in missing]).execute()
+            for fr in getattr(ins, "data", None) or []:
+                file_ids[fr.get("name")] = fr.get("id")
         except Exception as e:
-            raise RuntimeError(f"Failed to insert files row: {e}")
-    if not file_row or not file_row.get("id"):
+            raise RuntimeError(f"Failed to insert files rows: {e}")
+    if any(not file_ids.get(n) for n in names):
         raise RuntimeError("files.id not found after upsert")
-    file_id = file_row["id"]
 
-    # 2) Upsert file_workspaces for this workspace + normalized_name
-    join_row = None
+    # 2) Reuse the file_id and user_id of any live join row already holding a normalized_name,
+    # so the primary-key upsert updates it in place instead of tripping the
+    # (workspace_id, normalized_name) unique index. user_id is NOT NULL and Postgres checks
+    # it on the proposed row before resolving ON CONFLICT, so every row must carry one.
+    norms = list(dict.fromkeys(r["normalized_name"] for r in rows))
+    existing: dict = {}
     try:
         sel = (
             supabase.table("file_workspaces")
-            .select("file_id, ingested, deleted, normalized_name, openai_file_id, vs_file_id")
+            .select("file_id, user_id, normalized_name")
             .eq("workspace_id", workspace_id)
-            .eq("normalized_name", norm)
-            .maybe_single()
+            .eq("deleted", False)
+            .in_("normalized_name", norms)
             .execute()
         )
-        join_row = getattr(sel, "data", None)
+        existing = {jr.get("normalized_name"): jr for jr in (getattr(sel, "data", None) or [])}
     except Exception:
-        join_row = None
+        existing = {}
+    owner_id = _workspace_owner_id(workspace_id) if any(n not in existing for n in norms) else None
+
+    # One row per normalized_name (last upload wins), as the per-file path did
+    payloads: dict = {}
+    for r in rows:
+        live = existing.get(r["normalized_name"]) or {}
+        payload = {k: v for k, v in r.items() if k != "name"}
+        payload["file_id"] = live.get("file_id") or file_ids[r["name"]]
+        payload["user_id"] = live.get("user_id") or owner_id
+        payloads[r["normalized_name"]] = payload
+
+    # PostgREST bulk writes need identical keys per row, so upsert once per key set
+    # (rows only carry the optional metadata they actually have)
+    groups: dict = {}
+    for payload in payloads.values():
+        groups.setdefault(frozenset(payload), []).append(payload)
+    try:
+        for group in groups.values():
+            supabase.table("file_workspaces").upsert(group, on_conflict="file_id,workspace_id", returning="minimal").execute()
+    except Exception as e:
+        raise RuntimeError(f"Failed to upsert file_workspaces: {e}")
 
-    payload = {
-        "workspace_id": workspace_id,
-        "file_id": file_id,
-        "normalized_name": norm,
-        "ingested": True,
-        "deleted": False,
-        "deleted_at": None,
-        "openai_file_id": openai_file_id,
-        "vs_file_id": vs_file_id,
-    }
+    return file_ids
 
-    # Add optional metadata fields
-    if meeting_date_iso is not None:
-        payload["meeting_date"] = meeting_date_iso
-    if meeting_year is not None:
-        payload["meeting_year"] = meeting_year
-    if meeting_month is not None:
-        payload["meeting_month"] = meeting_month
-    if meeting_day is not None:
-        payload["meeting_day"] = meeting_day
-    if doc_type is not None:
-        payload["doc_type"] = doc_type
-    if has_ocr is not None:
-        payload["has_ocr"] = has_ocr
-    if file_ext is not None:
-        payload["file_ext"] = file_ext
-    if meeting_body is not None:
-        payload["meeting_body"] = meeting_body
-    if ordinance_number is not None:
-        payload["ordinance_number"] = ordinance_number
 
+def _find_ingested_by_hash(workspace_id: str, content_sha256: str) -> Optional[dict]:
+    """Return the live, ingested file_workspaces row holding identical bytes, if any."""
     try:
-        if join_row:
-            supabase.table("file_workspaces").update(payload).eq("workspace_id", workspace_id).eq("normalized_name", norm).execute()
-        else:
-            supabase.table("file_workspaces").insert(payload).execute()
+        sel = (
+            supabase.table("file_workspaces")
+            .select("openai_file_id, vs_file_id, normalized_name")
+            .eq("workspace_id", workspace_id)
+            .eq("content_sha256", content_sha256)
+            .eq("deleted", False)
+            .eq("ingested", True)
+            .limit(1)
+            .execute()
+        )
+        rows = getattr(sel, "data", None) or []
     except Exception as e:
-        raise RuntimeError(f"Failed to upsert file_workspaces: {e}")
+        logger.debug(f"Content-hash lookup failed (continuing without dedupe): {e}")
+        return None
+    return next((r for r in rows if r.get("openai_file_id")), None)
 
-    return file_id
+
+class _FileRowBuffer:
+    """Process-level write buffer for ingest DB rows.
+
+    Concurrent /ingest/upload requests submit their rows here; one flusher task coalesces
+    everything that arrives within INGEST_DB_FLUSH_MS (or until INGEST_DB_FLUSH_ROWS rows)
+    into a single _flush_file_rows call per workspace. The flusher is started on demand on
+    the running loop and exits once the queue drains.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def submit(self, workspace_id: str, rows: List[dict]) -> dict:
+        """Queue rows and wait for their flush; returns {filename: files.id} for these rows."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._queue, self._task = loop, asyncio.Queue(), None
+        fut = loop.create_future()
+        self._queue.put_nowait((workspace_id, rows, fut))
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+        return await fut
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        window = max(0, settings.INGEST_DB_FLUSH_MS) / 1000.0
+        max_rows = max(1, settings.INGEST_DB_FLUSH_ROWS)
+        while not self._queue.empty():
+            batch = [self._queue.get_nowait()]
+            n_rows = len(batch[0][1])
+            deadline = loop.time() + window
+            while n_rows < max_rows:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                n_rows += len(item[1])
+
+            by_workspace: dict = {}
+            for workspace_id, rows, fut in batch:
+                by_workspace.setdefault(workspace_id, []).append((rows, fut))
+            for workspace_id, entries in by_workspace.items():
+                try:
+                    ids = await asyncio.to_thread(_flush_file_rows, [r for rows, _ in entries for r in rows], workspace_id)
+                except Exception as e:
+                    for _, fut in entries:
+                        if not fut.done():
+                            fut.set_exception(e)
+                    continue
+                for rows, fut in entries:
+                    if not fut.done():
+                        fut.set_result({r["name"]: ids.get(r["name"]) for r in rows})
+
+
+_file_row_buffer = _FileRowBuffer()
 
 
 class IngestUploadResult(BaseModel):
@@ -1083,181 +1673,399 @@ class IngestUploadResult(BaseModel):
     size: Optional[int] = None
 
 
-@router.post("/vector-store/ingest/upload")
-async def ingest_and_upload_to_vector_store(
-    workspace_id: str = Form(...),
-    files: List[UploadFile] = File(...),
-):
-    """
-    End-to-end ingestion under Responses:
-    - Accept files (multipart)
-    - For PDFs, attempt to create a single searchable OCR PDF via ocrmypdf
-    - Derive small metadata (workspace_id, original_filename, mime_type, size, year, doc_type, source)
-    - Optionally extract a short text sample and upload a tiny enrichment .context.txt
-    - Upload the best artifact to OpenAI Files and attach to the workspace Vector Store
-    Returns: { vector_store_id, files: [{ id, name, size }], failed: [{ name, reason }] }
+def _prepare_ingest_artifact(
+    workspace_id: str,
+    filename: Optional[str],
+    content_type: Optional[str],
+    tmp_path: str,
+    size: Optional[int],
+    content_sha256: Optional[str] = None,
+) -> dict:
+    """OCR + metadata stage of /ingest/upload (blocking; run in a worker thread).
+    Returns everything the upload stage needs: artifact paths, OpenAI metadata,
+    enrichment text and the DB row (minus the OpenAI ids).
     """
-    vector_store_id = _get_vector_store_id(workspace_id)
-    client = OpenAI()
+    suffix = os.path.splitext(filename or "upload.bin")[1]
 
-    results: List[IngestUploadResult] = []
-    failed: List[dict] = []
+    # If PDF, try to create a searchable OCR version
+    # (born-digital PDFs already carry a text layer, so OCR would only re-render them)
+    ocr_path: Optional[str] = None
+    if suffix.lower() == ".pdf" and pdf_has_text_layer(tmp_path) is not True:
+        ocr_path = _run_ocrmypdf_cached(tmp_path, content_sha256)
 
-    for uf in files:
-        # Persist upload to a tmp path, but upload using a friendly filename path
-        upload_dir = tempfile.mkdtemp(prefix="vs_ingest_")
-        suffix = os.path.splitext(uf.filename or "upload.bin")[1]
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            raw = await uf.read()
-            tmp.write(raw)
-            tmp_path = tmp.name
+    # Build base metadata
+    year, doc_type = _derive_year_and_doctype(filename or "")
+    base_metadata = {
+        "workspace_id": workspace_id,
+        "original_filename": filename or None,
+        "mime_type": content_type or None,
+        "size": size,
+        "year": year,
+        "doc_type": doc_type,
+    }
+
+    # Extract a short sample for enrichment
+    sample_text = _safe_extract_text(ocr_path or tmp_path, 2000)
+
+    # Try to parse a more precise meeting date from filename+sample text
+    meeting_date = _parse_meeting_date_from_text((filename or "") + "\n" + sample_text)
+    # Derive the date parts once: ints feed the DB row, their strings the OpenAI metadata
+    if meeting_date:
+        meeting_date_iso = meeting_date.isoformat()
+        meeting_year, meeting_month, meeting_day = meeting_date.year, meeting_date.month, meeting_date.day
+    else:
+        meeting_date_iso = None
+        meeting_year = int(year) if year else None  # year always matched \d{4}
+        meeting_month = meeting_day = None
+
+    # Choose artifact
+    target_path = ocr_path or tmp_path
+    source_label = "ocr-pdf" if ocr_path else "original"
+    # Meeting-date overlay is shared by the primary and enrichment metadata
+    date_overlay = {
+        k: str(v) for k, v in (("meeting_year", meeting_year), ("meeting_month", meeting_month), ("meeting_day", meeting_day)) if v
+    }
+    metadata = base_metadata | {"source": source_label} | date_overlay
+    # Additional soft-filter metadata
+    has_ocr = bool(ocr_path)
+    file_ext = _file_ext_from_name(filename or "")
+    meeting_body = _derive_meeting_body((filename or "") + "\n" + sample_text)
+    ord_no = _derive_ordinance_number((filename or "") + "\n" + sample_text)
+    metadata["has_ocr"] = has_ocr
+    if file_ext:
+        metadata["file_ext"] = file_ext
+    if meeting_body:
+        metadata["meeting_body"] = meeting_body
+    if ord_no:
+        metadata["ordinance_number"] = ord_no
+
+    # Friendly name for OpenAI (preserve human filename)
+    res_name = (filename or os.path.basename(target_path))
+    if ocr_path and res_name.lower().endswith(".pdf"):
+        res_name = res_name[:-4] + ".ocr.pdf"
+
+    # Enrichment: small context file to reinforce year/doc_type and provide a brief excerpt
+    title = filename or "file"
+    header = f"[Context] Title: {title}"
+    if year:
+        header += f" | Year: {year}"
+    if doc_type:
+        header += f" | DocType: {doc_type}"
+    parts = [header]
+    if year:
+        # repeat year a couple times to increase chunk-level recall
+        parts.append(f"Year: {year}\nYear: {year}")
+    if sample_text:
+        parts.append(f"\nExcerpt:\n{sample_text}")
+    enrichment_text = "\n".join(parts).strip()
+    # A bare "[Context] Title: ..." line carries no signal; skip uploading/embedding it
+    if not (year or doc_type or sample_text):
+        enrichment_text = ""
+    ctx_meta = base_metadata | {"source": "enrichment"} | date_overlay
 
+    return {
+        "tmp_path": tmp_path,
+        "ocr_path": ocr_path,
+        "target_path": target_path,
+        "res_name": res_name,
+        "metadata": metadata,
+        "title": title,
+        "enrichment_text": enrichment_text,
+        "ctx_meta": ctx_meta,
+        "row": dict(
+            filename=res_name,
+            meeting_date_iso=meeting_date_iso,
+            meeting_year=meeting_year,
+            meeting_month=meeting_month,
+            meeting_day=meeting_day,
+            doc_type=doc_type,
+            has_ocr=has_ocr,
+            file_ext=file_ext,
+            meeting_body=meeting_body,
+            ordinance_number=ord_no,
+            content_sha256=content_sha256,
+        ),
+    }
+
+
+def _upload_ingest_artifact(client: OpenAI, prepared: dict) -> Tuple[List[IngestUploadResult], dict]:
+    """OpenAI upload stage of /ingest/upload (blocking; run in a worker thread).
+    Uploads the primary artifact plus its enrichment context file and returns
+    (results, db_row). Attaching to the Vector Store happens later in one batch.
+    """
+    target_path = prepared["target_path"]
+    res_name = prepared["res_name"]
+    try:
+        # Upload the artifact from an open handle under a friendly name (preserve human
+        # filename): httpx streams it in chunks, so neither a renamed copy nor a full
+        # in-memory read is needed
+        mime = "application/pdf" if prepared["ocr_path"] else (prepared["metadata"].get("mime_type") or _mime_for_name(res_name))
+        with open(target_path, "rb") as src:
+            # The spooled size is known already; only an OCR'd artifact needs a stat
+            size = prepared["metadata"].get("size") if not prepared["ocr_path"] else None
+            if size is None:
+                size = os.fstat(src.fileno()).st_size
+            created = _retry(_upload_file_with_optional_metadata, client, (os.path.basename(res_name), src, mime), prepared["metadata"])
+        results = [IngestUploadResult(id=created.id, name=res_name, size=size)]
+        row = {**prepared["row"], "openai_file_id": created.id}
+
+        enrichment_text = prepared["enrichment_text"]
+        if enrichment_text:
+            # Small (<~2 KB) text: upload straight from memory, no tmp file round-trip
+            title = prepared["title"]
+            ctx_name = os.path.basename(f"{title}.context.txt")
+            ctx_bytes = enrichment_text.encode("utf-8")
+            created_ctx = _retry(_upload_file_with_optional_metadata, client, (ctx_name, ctx_bytes, "text/plain"), prepared["ctx_meta"])
+            results.append(IngestUploadResult(id=created_ctx.id, name=f"{title}.context.txt", size=len(ctx_bytes)))
+        return results, row
+    finally:
+        _cleanup_ingest_paths(prepared["tmp_path"], prepared["ocr_path"])
+
+
+def _cleanup_ingest_paths(tmp_path: Optional[str], ocr_path: Optional[str] = None) -> None:
+    # Artifacts upload from their own paths under a friendly name, so there is no
+    # per-file upload dir left to create or remove
+    for path in (tmp_path, ocr_path):
+        if path:
+            Path(path).unlink(missing_ok=True)
+
+
+async def _spool_uploads(files: List[UploadFile]) -> AsyncIterator[Tuple[int, object]]:
+    """Spool each UploadFile, yielding (idx, (filename, content_type, tmp_path, size, sha256))
+    or (idx, {name, reason}) when spooling failed."""
+    for idx, uf in enumerate(files):
         try:
-            # If PDF, try to create a searchable OCR version
-            ocr_path: Optional[str] = None
-            if suffix.lower() == ".pdf":
-                ocr_path = _run_ocrmypdf(tmp_path)
-
-            # Build base metadata
-            year, doc_type = _derive_year_and_doctype(uf.filename or "")
-            base_metadata = {
-                "workspace_id": workspace_id,
-                "original_filename": uf.filename or None,
-                "mime_type": getattr(uf, "content_type", None) or None,
-                "size": len(raw) if raw else None,
-                "year": year,
-                "doc_type": doc_type,
-            }
+            tmp_path, size, sha = await _spool_upload(uf)
+        except Exception as e:
+            yield idx, {"name": uf.filename or "upload", "reason": str(e)}
+            continue
+        yield idx, (uf.filename, getattr(uf, "content_type", None), tmp_path, size, sha)
 
-            # Extract a short sample for enrichment
-            sample_text = ""
-            if ocr_path:
-                sample_text = _safe_extract_text(ocr_path, 2000)
-            else:
-                sample_text = _safe_extract_text(tmp_path, 2000)
-
-            # Try to parse a more precise meeting date from filename+sample text
-            meeting_date = _parse_meeting_date_from_text((uf.filename or "") + "\n" + sample_text)
-            meeting_year = str(meeting_date.year) if meeting_date else (year or None)
-            meeting_month = str(meeting_date.month) if meeting_date else None
-            meeting_day = str(meeting_date.day) if meeting_date else None
-
-            # Choose artifact and upload
-            target_path = ocr_path or tmp_path
-            source_label = "ocr-pdf" if ocr_path else "original"
-            metadata = {**base_metadata, "source": source_label}
-            if meeting_year:
-                metadata["meeting_year"] = meeting_year
-            if meeting_month:
-                metadata["meeting_month"] = meeting_month
-            if meeting_day:
-                metadata["meeting_day"] = meeting_day
-            # Additional soft-filter metadata
-            has_ocr = bool(ocr_path)
-            file_ext = _file_ext_from_name(uf.filename or "")
-            meeting_body = _derive_meeting_body((uf.filename or "") + "\n" + sample_text)
-            ord_no = _derive_ordinance_number((uf.filename or "") + "\n" + sample_text)
-            metadata["has_ocr"] = has_ocr
-            if file_ext:
-                metadata["file_ext"] = file_ext
-            if meeting_body:
-                metadata["meeting_body"] = meeting_body
-            if ord_no:
-                metadata["ordinance_number"] = ord_no
-
-            # Construct a friendly-named upload path for OpenAI (preserve human filename)
-            res_name = (uf.filename or os.path.basename(target_path))
-            if ocr_path and res_name.lower().endswith(".pdf"):
-                res_name = res_name[:-4] + ".ocr.pdf"
-            desired = os.path.basename(res_name)
-            upload_path = os.path.join(upload_dir, desired)
-            try:
-                with open(target_path, "rb") as src, open(upload_path, "wb") as dst:
-                    dst.write(src.read())
-            except Exception:
-                upload_path = target_path
 
-            created = _upload_file_with_optional_metadata(client, upload_path, metadata)
-            vs_file_id = _attach_file_to_vector_store(client, vector_store_id, created.id)
-            results.append(IngestUploadResult(id=created.id, name=res_name, size=os.path.getsize(target_path)))
+async def _iter_spooled(items: List[Tuple[int, object]]) -> AsyncIterator[Tuple[int, object]]:
+    for it in items:
+        yield it
 
-            # Upsert into Supabase DB: files and file_workspaces (primary artifact only)
-            try:
-                file_row_id = _upsert_file_and_join(
-                    workspace_id=workspace_id,
-                    filename=res_name,
-                    openai_file_id=created.id,
-                    vs_file_id=vs_file_id,
-                    meeting_date_iso=(meeting_date.isoformat() if meeting_date else None),
-                    meeting_year=(int(meeting_year) if meeting_year else None),
-                    meeting_month=(int(meeting_month) if meeting_month else None),
-                    meeting_day=(int(meeting_day) if meeting_day else None),
-                    doc_type=doc_type,
-                    has_ocr=has_ocr,
-                    file_ext=file_ext,
-                    meeting_body=meeting_body,
-                    ordinance_number=ord_no,
-                )
-                logger.debug(f"Upserted DB rows for file '{res_name}' (file_id={file_row_id})")
-            except Exception as db_e:
-                logger.warning(f"DB upsert failed for '{res_name}': {db_e}")
-
-            # Enrichment: small context file to reinforce year/doc_type and provide a brief excerpt
-            lines: List[str] = []
-            title = uf.filename or "file"
-            context_header = ["[Context] Title: " + title]
-            if year:
-                context_header.append(f"Year: {year}")
-            if doc_type:
-                context_header.append(f"DocType: {doc_type}")
-            lines.append(" | ".join(context_header))
-            if year:
-                # repeat year a couple times to increase chunk-level recall
-                lines += [f"Year: {year}", f"Year: {year}"]
-            if sample_text:
-                lines.append("\nExcerpt:\n" + sample_text)
-            enrichment_text = "\n".join(lines).strip()
-            if enrichment_text:
-                ctx_name = os.path.basename(f"{title}.context.txt")
-                ctx_path = os.path.join(upload_dir, ctx_name)
-                with open(ctx_path, "w", encoding="utf-8") as ctx:
-                    ctx.write(enrichment_text)
-                try:
-                    ctx_meta = {**base_metadata, "source": "enrichment"}
-                    if meeting_year:
-                        ctx_meta["meeting_year"] = meeting_year
-                    if meeting_month:
-                        ctx_meta["meeting_month"] = meeting_month
-                    if meeting_day:
-                        ctx_meta["meeting_day"] = meeting_day
-                    created_ctx = _upload_file_with_optional_metadata(client, ctx_path, ctx_meta)
-                    _attach_file_to_vector_store(client, vector_store_id, created_ctx.id)
-                    results.append(IngestUploadResult(id=created_ctx.id, name=f"{title}.context.txt", size=len(enrichment_text)))
-                finally:
-                    try:
-                        os.remove(ctx_path)
-                    except Exception:
-                        pass
 
-        except Exception as e:
-            failed.append({"name": uf.filename or os.path.basename(tmp_path), "reason": str(e)})
-        finally:
+async def _run_ingest_pipeline(workspace_id: str, vector_store_id: str, spooled: AsyncIterator[Tuple[int, object]], n_files: int) -> dict:
+    """OCR -> upload -> attach -> DB pipeline behind /vector-store/ingest/upload.
+    Files flow through bounded queues, so OCR of one file overlaps the OpenAI upload of another.
+    """
+    client = get_openai_client()
+
+    n_ocr = max(1, settings.INGEST_OCR_WORKERS)
+    n_up = max(1, settings.INGEST_UPLOAD_WORKERS)
+    # Bounded queues keep at most ~2x workers spooled files waiting per stage
+    spool_q: asyncio.Queue = asyncio.Queue(maxsize=2 * n_ocr)
+    ocr_q: asyncio.Queue = asyncio.Queue(maxsize=2 * n_up)
+    # Per-input outcome, kept positional so the response preserves upload order:
+    # (results, db_row) on success, (results, None) when identical bytes were already
+    # ingested under the same name, {name, reason} on failure. A hit under a new name
+    # carries a db_row with the hit's vs_file_id so only its join row is written.
+    outcomes: list = [None] * n_files
+
+    async def _ocr_worker():
+        while (item := await spool_q.get()) is not None:
+            idx, filename, content_type, tmp_path, size, sha = item
+            # Re-uploads of known bytes skip OCR, upload and attach entirely
+            hit = await asyncio.to_thread(_find_ingested_by_hash, workspace_id, sha)
+            if hit:
+                _cleanup_ingest_paths(tmp_path)
+                name = filename or "upload"
+                row = None
+                if hit.get("normalized_name") != _normalize_name(name):
+                    row = {
+                        "filename": name,
+                        "openai_file_id": hit["openai_file_id"],
+                        "vs_file_id": hit.get("vs_file_id"),
+                        "content_sha256": sha,
+                    }
+                outcomes[idx] = ([IngestUploadResult(id=hit["openai_file_id"], name=name, size=size)], row)
+                continue
             try:
-                os.remove(tmp_path)
-            except Exception:
-                pass
+                prepared = await asyncio.to_thread(_prepare_ingest_artifact, workspace_id, filename, content_type, tmp_path, size, sha)
+            except Exception as e:
+                _cleanup_ingest_paths(tmp_path)
+                outcomes[idx] = {"name": filename or os.path.basename(tmp_path), "reason": str(e)}
+                continue
+            await ocr_q.put((idx, filename, prepared))
+
+    async def _upload_worker():
+        while (item := await ocr_q.get()) is not None:
+            idx, filename, prepared = item
             try:
-                if 'upload_path' in locals() and upload_path and os.path.exists(upload_path) and upload_path != tmp_path:
-                    os.remove(upload_path)
-                if upload_dir and os.path.isdir(upload_dir):
-                    os.rmdir(upload_dir)
-            except Exception:
-                pass
+                outcomes[idx] = await asyncio.to_thread(_upload_ingest_artifact, client, prepared)
+            except Exception as e:
+                outcomes[idx] = {"name": filename or os.path.basename(prepared["tmp_path"]), "reason": str(e)}
+
+    ocr_tasks = [asyncio.create_task(_ocr_worker()) for _ in range(n_ocr)]
+    up_tasks = [asyncio.create_task(_upload_worker()) for _ in range(n_up)]
+    try:
+        async for idx, item in spooled:
+            if isinstance(item, dict):
+                outcomes[idx] = item
+                continue
+            await spool_q.put((idx, *item))
+    finally:
+        for _ in ocr_tasks:
+            await spool_q.put(None)
+        await asyncio.gather(*ocr_tasks)
+        for _ in up_tasks:
+            await ocr_q.put(None)
+        await asyncio.gather(*up_tasks)
+
+    results: List[IngestUploadResult] = []
+    failed: List[dict] = []
+    pending_rows: List[dict] = []
+    reused_rows: List[dict] = []
+    fresh_ids: set = set()
+    for out in outcomes:
+        if isinstance(out, dict):
+            failed.append(out)
+        elif out is not None:
+            res, row = out
+            results.extend(res)
+            if row is None:
+                continue
+            if "vs_file_id" in row:
+                # Content-hash hit under a new name: already attached, only the join row is new
+                reused_rows.append(row)
+            else:
+                fresh_ids.update(r.id for r in res)
+                pending_rows.append(row)
+
+    # Attach new primary + context files in one file batch, then record the primaries in the DB
+    vs_file_ids: dict = {}
+    if fresh_ids:
+        try:
+            vs_file_ids = await asyncio.to_thread(
+                _attach_files_to_vector_store, client, vector_store_id, [r.id for r in results if r.id in fresh_ids]
+            )
+        except Exception as e:
+            failed.extend({"name": r.name, "reason": str(e)} for r in results if r.id in fresh_ids)
+            results = [r for r in results if r.id not in fresh_ids]
+            pending_rows = []
+        # Files whose attach failed or was cancelled must not be recorded as ingested
+        unattached = {fid for fid in fresh_ids if fid in vs_file_ids and not vs_file_ids[fid]}
+        if unattached:
+            failed.extend({"name": r.name, "reason": "Vector Store attach did not complete"} for r in results if r.id in unattached)
+            results = [r for r in results if r.id not in unattached]
+            pending_rows = [row for row in pending_rows if row["openai_file_id"] not in unattached]
+    pending_rows.extend(reused_rows)
+
+    # Upsert into Supabase DB: files and file_workspaces (primary artifact only), one batch
+    if pending_rows:
+        try:
+            file_row_ids = await _file_row_buffer.submit(
+                workspace_id,
+                [
+                    _build_file_row(workspace_id=workspace_id, **{"vs_file_id": vs_file_ids.get(row["openai_file_id"]), **row})
+                    for row in pending_rows
+                ],
+            )
+            logger.debug(f"Upserted DB rows for {len(file_row_ids)} file(s)")
+        except Exception as db_e:
+            logger.warning(f"DB upsert failed for {len(pending_rows)} file(s): {db_e}")
 
     status = 200 if results else 500
     return {
         "vector_store_id": vector_store_id,
-        "files": [r.dict() for r in results],
+        # FastAPI serializes the models directly; no per-item .dict() pass
+        "files": results,
         **({"failed": failed} if failed else {}),
         "status": status,
     }
+
+
+def _update_ingest_job(job_id: str, payload: dict) -> None:
+    try:
+        payload = {**payload, "updated_at": datetime.now(timezone.utc).isoformat()}
+        supabase.table("ingest_jobs").update(payload, returning="minimal").eq("id", job_id).execute()
+    except Exception as e:
+        logger.warning(f"Failed to update ingest job {job_id}: {e}")
+
+
+async def _run_ingest_job(job_id: str, workspace_id: str, vector_store_id: str, spooled: List[Tuple[int, object]]) -> None:
+    """Background body for /vector-store/ingest/upload?background=true; records the outcome on ingest_jobs."""
+    await asyncio.to_thread(_update_ingest_job, job_id, {"status": "running"})
+    try:
+        result = await _run_ingest_pipeline(workspace_id, vector_store_id, _iter_spooled(spooled), len(spooled))
+    except Exception as e:
+        logger.error(f"Ingest job {job_id} failed: {e}")
+        for _, item in spooled:
+            if not isinstance(item, dict):
+                _cleanup_ingest_paths(item[2])
+        await asyncio.to_thread(_update_ingest_job, job_id, {"status": "failed", "error": str(e)})
+        return
+    status = "completed" if result["status"] == 200 else "failed"
+    result["files"] = [r.model_dump() for r in result["files"]]
+    await asyncio.to_thread(_update_ingest_job, job_id, {"status": status, "result": result})
+
+
+@router.post("/vector-store/ingest/upload")
+async def ingest_and_upload_to_vector_store(
+    background_tasks: BackgroundTasks,
+    workspace_id: str = Form(...),
+    files: List[UploadFile] = File(...),
+    background: bool = Form(False),
+):
+    """
+    End-to-end ingestion under Responses:
+    - Accept files (multipart)
+    - For PDFs, attempt to create a single searchable OCR PDF via ocrmypdf
+    - Derive small metadata (workspace_id, original_filename, mime_type, size, year, doc_type, source)
+    - Optionally extract a short text sample and upload a tiny enrichment .context.txt
+    - Upload the best artifact to OpenAI Files and attach to the workspace Vector Store
+    Returns: { vector_store_id, files: [{ id, name, size }], failed: [{ name, reason }] }
+
+    With background=true the files are spooled, an ingest_jobs row is created and the
+    rest runs after the response: returns 202 { job_id, status_url } (poll GET /vector-store/ingest/jobs/{job_id}).
+    """
+    vector_store_id = await asyncio.to_thread(_get_vector_store_id, workspace_id)
+    if not background:
+        return await _run_ingest_pipeline(workspace_id, vector_store_id, _spool_uploads(files), len(files))
+
+    # UploadFiles are closed once the response is sent, so spool before handing off
+    spooled = [it async for it in _spool_uploads(files)]
+    try:
+        ins = await asyncio.to_thread(supabase.table("ingest_jobs").insert({
+            "workspace_id": workspace_id,
+            "status": "queued",
+            "files": [uf.filename for uf in files],
+        }).execute)
+        data = getattr(ins, "data", None) or []
+        job_id = data[0]["id"] if data else None
+    except Exception as e:
+        logger.error(f"Failed to create ingest job: {e}")
+        job_id = None
+    if not job_id:
+        for _, item in spooled:
+            if not isinstance(item, dict):
+                _cleanup_ingest_paths(item[2])
+        raise HTTPException(status_code=500, detail="Failed to create ingest job")
+
+    background_tasks.add_task(_run_ingest_job, job_id, workspace_id, vector_store_id, spooled)
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job_id, "status": "queued", "status_url": f"{settings.API_PREFIX}{router.prefix}/vector-store/ingest/jobs/{job_id}"},
+    )
+
+
+@router.get("/vector-store/ingest/jobs/{job_id}")
+def get_ingest_job(job_id: str):
+    """Status of a background /vector-store/ingest/upload job: queued | running | completed | failed."""
+    try:
+        sel = (
+            supabase.table("ingest_jobs")
+            .select("id, workspace_id, status, files, result, error, created_at, updated_at")
+            .eq("id", job_id)
+            .maybe_single()
+            .execute()
+        )
+        row = getattr(sel, "data", None)
+    except Exception as e:
+        logger.error(f"Failed to query ingest job {job_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to query ingest_jobs")
+    if not row:
+        raise HTTPException(status_code=404, detail="Ingest job not found")
+    return row
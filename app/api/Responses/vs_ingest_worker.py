@@ -1,18 +1,27 @@
-import io
+import asyncio
+import functools
+import hashlib
 import os
-import tempfile
 import time
 import logging
-from typing import Optional, List, Dict
+import operator
+import random
+import re
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import IO, Optional, List, Dict
 from datetime import datetime, timezone
 
-from openai import OpenAI
+import httpx
+from openai import APIConnectionError, OpenAI, RateLimitError
 from fastapi import HTTPException
 
 from app.core.config import settings
 from app.core.supabase_client import supabase
 from app.core.document_profiler import generate_profile_from_text
-from app.core.openai_async_client import AsyncOpenAIClient
+from app.core.openai_sync_client import get_openai_client
 # Note: multi-store mapping helpers live in app.api.Responses.vs_store_mapping
 # When enabling Drive subfolder → store routing, resolve a per-file target store
 # via vs_store_mapping.resolve_vector_store_for(workspace_id, drive_folder_id=..., label=...)
@@ -20,18 +29,54 @@ from app.core.openai_async_client import AsyncOpenAIClient
 logger = logging.getLogger(__name__)
 
 
-def _extract_text_from_pdf_bytes(content: bytes) -> Optional[str]:
-    """Best-effort text extraction from PDF bytes.
-    Tries pypdf first; returns None on failure.
+# Poppler's pdftotext, probed once per process; the whole parse runs natively when present
+_PDFTOTEXT = shutil.which("pdftotext")
+
+
+def _pdftotext(path: str) -> tuple[bool, Optional[str]]:
+    """Run pdftotext on a PDF on disk. Returns (ok, text); ok=False means fall back."""
+    try:
+        proc = subprocess.run([_PDFTOTEXT, "-q", "-nopgbrk", "-enc", "UTF-8", path, "-"], capture_output=True, timeout=30)
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"[vs_ingest_worker] pdftotext failed, trying PyMuPDF/pypdf: {e}")
+        return False, None
+    if proc.returncode != 0:
+        return False, None
+    return True, proc.stdout.decode("utf-8", "ignore").strip() or None
+
+
+def _extract_text_from_pdf(path: str) -> Optional[str]:
+    """Best-effort text extraction from a PDF on disk (parsers read the file directly, no in-memory copy).
+    Tries pdftotext (Poppler) when installed, then PyMuPDF (parsing runs in the MuPDF C engine,
+    far faster than pypdf), then pypdf; returns None on failure.
     """
+    if _PDFTOTEXT:
+        ok, text = _pdftotext(path)
+        if ok:
+            return text
+
+    try:
+        import fitz  # type: ignore
+    except ImportError:
+        fitz = None
+
+    if fitz is not None:
+        try:
+            with fitz.open(path) as doc:
+                parts = [txt for txt in (page.get_text("text") for page in doc) if txt.strip()]
+            joined = "\n\n".join(parts).strip()
+            return joined if joined else None
+        except Exception as e:
+            logger.warning(f"[vs_ingest_worker] PyMuPDF failed to extract PDF text, trying pypdf: {e}")
+
     try:
         from pypdf import PdfReader  # type: ignore
     except Exception:
-        logger.warning("[vs_ingest_worker] pypdf not available; cannot extract text from PDF.")
+        logger.warning("[vs_ingest_worker] Neither PyMuPDF nor pypdf available; cannot extract text from PDF.")
         return None
 
     try:
-        reader = PdfReader(io.BytesIO(content))
+        reader = PdfReader(path)
         parts: List[str] = []
         for page in reader.pages:
             try:
@@ -47,9 +92,26 @@ def _extract_text_from_pdf_bytes(content: bytes) -> Optional[str]:
         return None
 
 
-def _resolve_vector_store_id() -> str:
+# (expires_at, vector_store_id) for GDRIVE_WORKSPACE_ID; the mapping effectively never changes
+_resolved_vs_id: Optional[tuple] = None
+
+
+def invalidate_resolved_vector_store_id() -> None:
+    """Forget the cached Supabase lookup so the next run resolves the store again."""
+    global _resolved_vs_id
+    _resolved_vs_id = None
+
+
+def resolve_vector_store_id() -> str:
+    """Vector Store for the Drive workspace (GDRIVE_VECTOR_STORE_ID, else its workspace_vector_stores row),
+    cached for VECTOR_STORE_ID_CACHE_TTL seconds. Raises HTTPException(404) when neither is available.
+    """
+    global _resolved_vs_id
     if settings.GDRIVE_VECTOR_STORE_ID:
         return settings.GDRIVE_VECTOR_STORE_ID
+    hit = _resolved_vs_id
+    if hit and hit[0] > time.monotonic():
+        return hit[1]
     if settings.GDRIVE_WORKSPACE_ID:
         try:
             res = (
@@ -61,55 +123,146 @@ def _resolve_vector_store_id() -> str:
             )
             row = getattr(res, "data", None)
             if row and row.get("vector_store_id"):
+                if settings.VECTOR_STORE_ID_CACHE_TTL > 0:
+                    _resolved_vs_id = (time.monotonic() + settings.VECTOR_STORE_ID_CACHE_TTL, row["vector_store_id"])
                 return row["vector_store_id"]
         except Exception as e:
             logger.error(f"Failed to lookup vector_store_id from Supabase: {e}")
     raise HTTPException(status_code=404, detail="Vector store id not configured or not found for workspace")
 
 
-def _attach_file_to_vector_store(client: OpenAI, vector_store_id: str, file_id: str) -> Optional[str]:
-    """Attach an OpenAI File to a Vector Store and return the VS file id if available."""
-    last_err = None
-    # Try modern namespace first
-    try:
-        res = client.vector_stores.files.create(vector_store_id=vector_store_id, file_id=file_id)
-        return getattr(res, "id", None)
-    except Exception as e:
-        last_err = e
-        logger.warning("[vs_ingest_worker] vector_stores.files.create failed; trying beta fallback: %s", e)
-    # Beta namespace fallback
-    try:
-        res = getattr(client, "beta").vector_stores.files.create(  # type: ignore
-            vector_store_id=vector_store_id, file_id=file_id
-        )
-        return getattr(res, "id", None)
-    except Exception as e2:
-        last_err = e2
-    raise RuntimeError(f"Attach failed: {last_err}")
+_client: Optional[OpenAI] = None
+
+
+def _get_client() -> OpenAI:
+    """The process-wide pooled OpenAI client, reused across runs so keep-alive connections survive.
+    SDK retries are off: _retry_call owns backoff, so attempts don't multiply.
+    """
+    global _client
+    if _client is None:
+        _client = get_openai_client().with_options(max_retries=0)
+    return _client
+
+
+# Resolve the SDK shape once at import (newer SDKs: client.vector_stores, older: client.beta.vector_stores)
+_vs_file_batches = operator.attrgetter(
+    "vector_stores.file_batches" if hasattr(OpenAI, "vector_stores") else "beta.vector_stores.file_batches"
+)
+
+# The file_batches endpoint accepts at most 500 file ids per batch (hard cap for VS_ATTACH_BATCH_SIZE)
+_ATTACH_BATCH_SIZE = 500
+
+
+def _attach_files_to_vector_store(client: OpenAI, vector_store_id: str, file_ids: List[str]) -> Dict[str, Optional[str]]:
+    """Attach OpenAI Files to a Vector Store via file batches.
+    Returns {openai_file_id: vs_file_id} for the files that finished attaching; anything
+    missing from the result failed (or was cancelled) and should be retried later.
+    """
+    batches = _vs_file_batches(client)
+    attached: Dict[str, Optional[str]] = {}
+    for i in range(0, len(file_ids), _ATTACH_BATCH_SIZE):
+        chunk = file_ids[i:i + _ATTACH_BATCH_SIZE]
+        # SDK errors propagate unwrapped so _retry_call can tell transient failures from permanent ones
+        batch = batches.create_and_poll(vector_store_id=vector_store_id, file_ids=chunk)
+        # Iterating the page auto-paginates through every file in the batch
+        for vf in batches.list_files(vector_store_id=vector_store_id, batch_id=batch.id, limit=100):
+            if getattr(vf, "status", None) == "completed":
+                attached[vf.id] = vf.id
+            else:
+                logger.warning(f"[vs_ingest_worker] Vector Store attach for {vf.id} ended with status={getattr(vf, 'status', None)}: {getattr(vf, 'last_error', None)}")
+    return attached
+
+
+def _ingest_failure_row(fw: Dict, name: str, workspace_id: str, max_retries: int) -> Dict:
+    """file_workspaces row bumping ingest_retries (and setting ingest_failed once the limit is reached)."""
+    file_id = fw["file_id"]
+    retries = (fw.get("ingest_retries") or 0) + 1
+    row = {"file_id": file_id, "workspace_id": workspace_id, "user_id": fw.get("user_id"), "ingest_retries": retries}
+    if retries >= max_retries:
+        row["ingest_failed"] = True
+        logger.error(f"File {name} (id={file_id}) has failed ingestion {retries} times and will be marked as failed.")
+    return row
+
+
+def _write_file_workspace_rows(workspace_id: str, rows: List[Dict]) -> None:
+    """Write a run's file_workspaces changes with one upsert per key set (PostgREST bulk writes need
+    identical keys per row). A failed bulk write falls back to per-row updates so one bad row
+    doesn't leave the whole batch un-ingested.
+    """
+    groups: Dict[frozenset, List[Dict]] = {}
+    for row in rows:
+        groups.setdefault(frozenset(row), []).append(row)
+    for group in groups.values():
+        try:
+            supabase.table("file_workspaces").upsert(group, on_conflict="file_id,workspace_id", returning="minimal").execute()
+        except Exception as bulk_e:
+            logger.warning(f"[vs_ingest_worker] Bulk file_workspaces upsert failed, retrying per row: {bulk_e}")
+            for row in group:
+                payload = {k: v for k, v in row.items() if k not in ("file_id", "workspace_id", "user_id")}
+                try:
+                    _update_file_workspace(row["file_id"], workspace_id, payload)
+                except Exception as row_e:
+                    logger.error(f"[vs_ingest_worker] Failed to update file_workspaces for file_id {row['file_id']}: {row_e}")
+
+
+_YEAR_RE = re.compile(r"\b(20\d{2}|19\d{2})\b")
+# Filename keywords in priority order (none overlaps another, so one finditer pass sees them all)
+_DOC_TYPES = ("agenda", "minutes", "ordinance", "transcript")
+_DOC_TYPE_RE = re.compile("|".join(_DOC_TYPES))
+_MONTHS = {
+    "jan": 1, "january": 1,
+    "feb": 2, "february": 2,
+    "mar": 3, "march": 3,
+    "apr": 4, "april": 4,
+    "may": 5,
+    "jun": 6, "june": 6,
+    "jul": 7, "july": 7,
+    "aug": 8, "august": 8,
+    "sep": 9, "sept": 9, "september": 9,
+    "oct": 10, "october": 10,
+    "nov": 11, "november": 11,
+    "dec": 12, "december": 12,
+}
+# Month name, YYYY[-_/ ]MM, MM[-_/ ]YYYY, YYYYMM, MMYYYY fused into one alternation
+# (listed in priority order). Wrapped in a lookahead so finditer() reports a
+# candidate at every position in a single walk; the caller keeps the
+# highest-priority, leftmost one, matching the old pass-per-pattern order.
+_MONTH_ANY_RE = re.compile(
+    r"(?=\b(?:"
+    r"(?P<name>jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|jun(?:e)?|jul(?:y)?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+    r"|(?P<y1>20\d{2}|19\d{2})[\-_/ ](?P<m1>1[0-2]|0?[1-9])"
+    r"|(?P<m2>1[0-2]|0?[1-9])[\-_/ ](?P<y2>20\d{2}|19\d{2})"
+    r"|(?P<y3>20\d{2}|19\d{2})(?P<m3>1[0-2]|0[1-9])"
+    r"|(?P<m4>1[0-2]|0[1-9])(?P<y4>20\d{2}|19\d{2})"
+    r")\b)"
+)
+# lastgroup -> (priority, month group)
+_MONTH_ANY_GROUPS = {"name": (0, "name"), "m1": (1, "m1"), "y2": (2, "m2"), "m3": (3, "m3"), "y4": (4, "m4")}
+
+
+@functools.lru_cache(maxsize=4096)
+def _filename_meta(name: str) -> tuple[Optional[int], Optional[str], Optional[int], Optional[str]]:
+    """(meeting_year, doc_type, meeting_month, file_ext) for a filename.
+    Lowercases once for all three helpers below, which expect an already-lowercased name.
+    """
+    low = (name or "").lower()
+    year, doc_type = _derive_year_and_doctype(low)
+    return year, doc_type, _derive_month_from_filename(low), _file_ext_from_name(low)
 
 
 def _derive_year_and_doctype(filename: str) -> tuple[Optional[int], Optional[str]]:
-    """Lightweight metadata derivation from filename only (no content extraction).
+    """Lightweight metadata derivation from a lowercased filename only (no content extraction).
     - Returns a (year, doc_type) tuple where doc_type ∈ {agenda, minutes, ordinance, transcript} when detected.
     """
-    year: Optional[int] = None
-    try:
-        import re
-        m = re.search(r"\b(20\d{2}|19\d{2})\b", filename or "")
-        if m:
-            year = int(m.group(1))
-    except Exception:
-        year = None
-    low = (filename or "").lower()
+    m = _YEAR_RE.search(filename or "")
+    year: Optional[int] = int(m.group(1)) if m else None
     doc_type: Optional[str] = None
-    if "agenda" in low:
-        doc_type = "agenda"
-    elif "minutes" in low:
-        doc_type = "minutes"
-    elif "ordinance" in low:
-        doc_type = "ordinance"
-    elif "transcript" in low:
-        doc_type = "transcript"
+    # One pass over the name; when several keywords occur, the earlier entry in _DOC_TYPES wins
+    for dm in _DOC_TYPE_RE.finditer(filename or ""):
+        if doc_type is None or _DOC_TYPES.index(dm.group(0)) < _DOC_TYPES.index(doc_type):
+            doc_type = dm.group(0)
+            if doc_type == _DOC_TYPES[0]:
+                break
     return year, doc_type
 
 
@@ -117,72 +270,84 @@ def _file_ext_from_name(name: str) -> Optional[str]:
     if not name:
         return None
     _, ext = os.path.splitext(name)
-    return ext.lstrip(".").lower() if ext else None
+    return ext.lstrip(".") if ext else None
 
 
 def _derive_month_from_filename(filename: str) -> Optional[int]:
-    """Best-effort month extraction from filename.
+    """Best-effort month extraction from a lowercased filename.
     Supports month names (jan, january, ... dec, december) and numeric patterns near a year.
     Returns 1-12 or None.
     """
     if not filename:
         return None
-    low = filename.lower()
-    # Month names
-    months = {
-        "jan": 1, "january": 1,
-        "feb": 2, "february": 2,
-        "mar": 3, "march": 3,
-        "apr": 4, "april": 4,
-        "may": 5,
-        "jun": 6, "june": 6,
-        "jul": 7, "july": 7,
-        "aug": 8, "august": 8,
-        "sep": 9, "sept": 9, "september": 9,
-        "oct": 10, "october": 10,
-        "nov": 11, "november": 11,
-        "dec": 12, "december": 12,
-    }
-    try:
-        import re
-        mname = re.search(r"\b(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|jun(?:e)?|jul(?:y)?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\b", low)
-        if mname:
-            return months.get(mname.group(1), None)
-        # Numeric patterns around a year
-        # YYYY[-_/ ]MM
-        mnum = re.search(r"\b(20\d{2}|19\d{2})[\-_/ ](1[0-2]|0?[1-9])\b", low)
-        if mnum:
-            val = int(mnum.group(2))
-            return val if 1 <= val <= 12 else None
-        # MM[-_/ ]YYYY
-        mnum2 = re.search(r"\b(1[0-2]|0?[1-9])[\-_/ ](20\d{2}|19\d{2})\b", low)
-        if mnum2:
-            val = int(mnum2.group(1))
-            return val if 1 <= val <= 12 else None
-        # Fallback: YYYYMM or MMYYYY contiguous
-        mnum3 = re.search(r"\b(20\d{2}|19\d{2})(1[0-2]|0[1-9])\b", low)
-        if mnum3:
-            val = int(mnum3.group(2))
-            return val if 1 <= val <= 12 else None
-        mnum4 = re.search(r"\b(1[0-2]|0[1-9])(20\d{2}|19\d{2})\b", low)
-        if mnum4:
-            val = int(mnum4.group(1))
-            return val if 1 <= val <= 12 else None
-    except Exception:
-        return None
+    best = None
+    for m in _MONTH_ANY_RE.finditer(filename):
+        rank, group = _MONTH_ANY_GROUPS[m.lastgroup]
+        if rank == 0:
+            return _MONTHS.get(m.group(group), None)
+        if best is None or rank < best[0]:
+            best = (rank, m.group(group))
+    if best is not None:
+        val = int(best[1])
+        return val if 1 <= val <= 12 else None
     return None
 
 
+_RETRYABLE_STATUS = (408, 429, 500, 502, 503, 504)
+# Upper bound (seconds) for one backoff sleep, including server-sent Retry-After
+_RETRY_BACKOFF_CAP = 60.0
+
+
+def _is_transient_error(e: Exception) -> bool:
+    """Rate limits, 408/5xx and connection/timeout errors are worth retrying; 4xx and the rest are not."""
+    if isinstance(e, (APIConnectionError, RateLimitError)):  # includes timeouts
+        return True
+    return getattr(e, "status_code", None) in _RETRYABLE_STATUS
+
+
+def _retry_after_seconds(e: Exception) -> float:
+    """Seconds from a numeric Retry-After header on the error's response, else 0."""
+    try:
+        return max(0.0, float(e.response.headers.get("retry-after", "")))  # type: ignore[attr-defined]
+    except (AttributeError, ValueError):
+        return 0.0
+
+
+def _backoff_seconds(e: Exception, delay: float) -> float:
+    # Jittered exponential backoff so parallel workers don't retry in lockstep;
+    # a server-sent Retry-After wins when it asks for longer
+    return min(_RETRY_BACKOFF_CAP, max(delay * (0.5 + random.random()), _retry_after_seconds(e)))
+
+
 def _retry_call(fn, *args, retries=4, base_delay=1.0, **kwargs):
     delay = base_delay
     for attempt in range(retries):
         try:
             return fn(*args, **kwargs)
         except Exception as e:
-            if attempt == retries - 1:
+            if attempt == retries - 1 or not _is_transient_error(e):
                 raise
-            # Backoff on rate limits and transient errors
-            time.sleep(delay)
+            sleep_s = _backoff_seconds(e, delay)
+            logger.debug(f"[vs_ingest_worker] {getattr(fn, '__name__', fn)} failed transiently (attempt {attempt + 1}/{retries}), retrying in {sleep_s:.2f}s: {e}")
+            time.sleep(sleep_s)
+            delay *= 2
+
+
+async def _aretry_call(coro_fn, *args, retries=4, base_delay=1.0, **kwargs):
+    """Async twin of _retry_call: backoff waits on the event loop instead of parking a worker thread.
+    Wrap blocking SDK calls as _aretry_call(asyncio.to_thread, fn, ...).
+    """
+    delay = base_delay
+    for attempt in range(retries):
+        try:
+            return await coro_fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == retries - 1 or not _is_transient_error(e):
+                raise
+            sleep_s = _backoff_seconds(e, delay)
+            target = args[0] if coro_fn is asyncio.to_thread and args else coro_fn
+            logger.debug(f"[vs_ingest_worker] {getattr(target, '__name__', target)} failed transiently (attempt {attempt + 1}/{retries}), retrying in {sleep_s:.2f}s: {e}")
+            await asyncio.sleep(sleep_s)
             delay *= 2
 
 
@@ -198,10 +363,11 @@ def _get_eligible_files(limit: int, workspace_id: Optional[str]) -> List[Dict]:
     logger.info(f"[vs_ingest_worker] Querying for eligible files for workspace_id: {workspace_id}")
     
     try:
-        # Join file_workspaces with files to get paths and OCR fields
+        # Join file_workspaces with files to get paths and OCR fields. The inner join lets the
+        # OCR-readiness filter run server-side, so OCR-pending rows no longer eat into `limit`.
         sel = (
-            "file_id, workspace_id, ingested, deleted, openai_file_id, vs_file_id, ingest_retries, "
-            "files(id,name,file_path,type,ocr_needed,ocr_scanned,ocr_text_path)"
+            "file_id, workspace_id, user_id, ingested, deleted, openai_file_id, vs_file_id, ingest_retries, "
+            "files!inner(id,name,file_path,type,ocr_needed,ocr_scanned,ocr_text_path)"
         )
         q = (
             supabase.table("file_workspaces")
@@ -210,6 +376,8 @@ def _get_eligible_files(limit: int, workspace_id: Optional[str]) -> List[Dict]:
             .eq("ingested", False)
             .eq("deleted", False)
             .eq("ingest_failed", False)
+            # NULL ocr_needed counts as "no OCR needed", matching the Python check below
+            .or_("ocr_needed.is.null,ocr_needed.eq.false,ocr_scanned.eq.true", reference_table="files")
             .limit(limit)
         )
         
@@ -250,14 +418,17 @@ def _get_unprofiled_files(limit: int, workspace_id: Optional[str]) -> List[Dict]
     try:
         sel = (
             "file_id, workspace_id, ingested, deleted, openai_file_id, vs_file_id, doc_profile_processed, "
-            "files(id,name,file_path,type,ocr_needed,ocr_scanned,ocr_text_path)"
+            "files!inner(id,name,file_path,type,ocr_needed,ocr_scanned,ocr_text_path)"
         )
+        # Same server-side text-availability filter as _get_eligible_files, so rows still
+        # waiting on OCR don't eat into `limit`
         q = (
             supabase.table("file_workspaces")
             .select(sel)
             .eq("workspace_id", workspace_id)
             .eq("deleted", False)
             .eq("doc_profile_processed", False)
+            .or_("ocr_needed.is.null,ocr_needed.eq.false,ocr_scanned.eq.true", reference_table="files")
             .limit(limit)
         )
         res = q.execute()
@@ -282,21 +453,266 @@ def _get_unprofiled_files(limit: int, workspace_id: Optional[str]) -> List[Dict]
         return []
 
 
+# Storage objects are fetched in 1 MiB chunks straight to disk
+_DOWNLOAD_CHUNK = 1 << 20
+
+
+# Originals up to this size stay in memory when spooled; larger ones roll over to disk
+_SPOOL_MAX_SIZE = 8 << 20
+
+
+def _stream_storage_object(storage_path: str, out: IO[bytes], hasher=None) -> None:
+    """Stream a Storage object into out via a short-lived signed URL, feeding hasher (if given) on the way.
+    storage3's download() buffers the whole object in memory, which adds up under VS_UPLOAD_CONCURRENCY.
+    """
+    signed = supabase.storage.from_(settings.SUPABASE_STORAGE_BUCKET).create_signed_url(storage_path, 300)
+    url = signed.get("signedURL") or signed.get("signedUrl")
+    with httpx.stream("GET", url, timeout=httpx.Timeout(300.0, connect=5.0)) as resp:
+        resp.raise_for_status()
+        for chunk in resp.iter_bytes(_DOWNLOAD_CHUNK):
+            out.write(chunk)
+            if hasher is not None:
+                hasher.update(chunk)
+
+
+def _download_to_tmp(storage_path: str, tmp_dir: str, filename: str, hasher=None) -> str:
+    """Stream a Storage object to tmp_dir/filename and return the path."""
+    dest = os.path.join(tmp_dir, filename)
+    with open(dest, "wb") as out:
+        _stream_storage_object(storage_path, out, hasher)
+    return dest
+
+
+def _find_ingested_by_hash(workspace_id: str, content_sha256: str) -> Optional[Dict]:
+    """Return a live, ingested file_workspaces row of this workspace holding identical bytes, if any."""
+    try:
+        res = (
+            supabase.table("file_workspaces")
+            .select("openai_file_id, vs_file_id")
+            .eq("workspace_id", workspace_id)
+            .eq("content_sha256", content_sha256)
+            .eq("deleted", False)
+            .eq("ingested", True)
+            .limit(1)
+            .execute()
+        )
+        rows = getattr(res, "data", None) or []
+    except Exception as e:
+        logger.debug(f"[vs_ingest_worker] Content-hash lookup failed (continuing without dedupe): {e}")
+        return None
+    return next((r for r in rows if r.get("openai_file_id")), None)
+
+
+def _download_spooled(storage_path: str) -> IO[bytes]:
+    """Stream a Storage object into a SpooledTemporaryFile (rewound); the caller closes it."""
+    out = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_SIZE)
+    try:
+        _stream_storage_object(storage_path, out)
+    except BaseException:
+        out.close()
+        raise
+    out.seek(0)
+    return out
+
+
+def _read_original_text(name: str, file_path: str, file_id: str) -> Optional[str]:
+    """Profiling text from an original Storage object (text files and PDFs); blocking, run in a thread."""
+    lname = (name or "").lower()
+    if not lname.endswith((".txt", ".md", ".json", ".pdf")):
+        return None
+    if lname.endswith(".pdf"):
+        # PDFs go to a real file so pdftotext/MuPDF parse straight from disk
+        with tempfile.TemporaryDirectory(prefix="vs_profile_") as tmp_dir:
+            return _extract_text_from_pdf(_download_to_tmp(file_path, tmp_dir, "original.pdf"))
+    with _download_spooled(file_path) as fh:
+        try:
+            return fh.read().decode("utf-8")
+        except UnicodeDecodeError:
+            logger.warning(f"[vs_ingest_worker] Could not decode text file as utf-8 (profile-only), file_id: {file_id}")
+            return None
+
+
+def _read_profile_text(fw: Dict, name: str) -> Optional[str]:
+    """Profiling text for an already-ingested file: its OCR text when present, else the original.
+    Blocking; download failures are logged and yield None.
+    """
+    file_id = fw["file_id"]
+    f = fw.get("files") or {}
+    ocr_text_path = f.get("ocr_text_path")
+    if f.get("ocr_scanned") and ocr_text_path:
+        try:
+            content_bytes = supabase.storage.from_(settings.SUPABASE_STORAGE_BUCKET).download(ocr_text_path)
+            try:
+                return content_bytes.decode("utf-8")
+            except UnicodeDecodeError:
+                logger.warning(f"[vs_ingest_worker] Could not decode OCR text as utf-8 for profiling (profile-only), file_id: {file_id}")
+        except Exception as e:
+            logger.warning(f"[vs_ingest_worker] Failed downloading OCR text (profile-only) for {name}: {e}")
+    try:
+        # Originals can be large: spool the stream instead of holding download() bytes
+        return _read_original_text(name, f.get("file_path"), file_id)
+    except Exception as e:
+        logger.warning(f"[vs_ingest_worker] Failed downloading original content (profile-only) for {name}: {e}")
+        return None
+
+
+def _update_file_workspace(file_id: str, workspace_id: str, payload: Dict) -> None:
+    supabase.table("file_workspaces").update(payload).eq("file_id", file_id).eq("workspace_id", workspace_id).execute()
+
+
+def _mark_profile_processed(file_id: str, workspace_id: str) -> None:
+    _update_file_workspace(file_id, workspace_id, {
+        "doc_profile_processed": True,
+        "doc_profile_processed_at": datetime.now(timezone.utc).isoformat(),
+    })
+
+
+def _save_profile_only(file_id: str, workspace_id: str, profile: Dict) -> None:
+    """Persist a profile-only result; the profile columns are best-effort, the processed flag is not."""
+    # Deprecated: document_profiles table removed; persist directly to file_workspaces only
+    try:
+        _update_file_workspace(file_id, workspace_id, {
+            "profile_summary": profile.get("summary"),
+            "profile_keywords": profile.get("keywords"),
+            "profile_entities": profile.get("entities"),
+            "profile_generated_at": datetime.now(timezone.utc).isoformat(),
+        })
+    except Exception as e_profile_cols:
+        logger.debug(f"[vs_ingest_worker] file_workspaces profile columns not present or update failed (continuing): {e_profile_cols}")
+    _mark_profile_processed(file_id, workspace_id)
+
+
+def _display_name(fw: Dict) -> str:
+    f = fw.get("files") or {}
+    return f.get("name") or os.path.basename(f.get("file_path", "")) or f"file-{fw['file_id']}"
+
+
+def _upload_one(client: OpenAI, fw: Dict, name: str, workspace_id: str) -> Dict:
+    """Download one eligible file from Storage and upload it to OpenAI Files (blocking; run in a
+    worker thread). Returns the staged entry for the batched Vector Store attach; raises on failure.
+    """
+    file_id = fw["file_id"]
+    f = fw.get("files") or {}
+    file_path = f.get("file_path")
+
+    logger.info(f"[vs_ingest_worker] Processing file: {name} (file_id: {file_id})")
+
+    # Prefer OCR text if available. Storage objects stream to a per-file tmp dir (removed on
+    # every exit path) and upload from an open handle, so no file is ever held in memory whole.
+    upload_name = None
+    local_path = None
+    ocr_text_path = f.get("ocr_text_path")
+    # Reflect actual OCR status from files.ocr_scanned; don't rely solely on text path presence
+    has_ocr = bool(f.get("ocr_scanned"))
+    text_content_for_profiling = None
+    # SHA-256 of the original bytes (as /ingest/upload records it); not set for OCR-text uploads
+    content_sha256 = None
+    reuse = None
+
+    with tempfile.TemporaryDirectory(prefix="vs_ingest_") as tmp_dir:
+        if f.get("ocr_scanned") and ocr_text_path:
+            logger.info(f"[vs_ingest_worker] Attempting to download OCR text from: {ocr_text_path}")
+            try:
+                # Upload under the original base name, so OpenAI sees a friendly filename
+                base, _ = os.path.splitext(name)
+                local_path = _download_to_tmp(ocr_text_path, tmp_dir, os.path.basename(f"{base}.txt"))
+                upload_name = os.path.basename(local_path)
+                # Text path present implies we used OCR-extracted text
+                has_ocr = True
+
+                # Decode for profiling
+                try:
+                    text_content_for_profiling = Path(local_path).read_bytes().decode("utf-8")
+                except UnicodeDecodeError:
+                    logger.warning(f"[vs_ingest_worker] Could not decode OCR text as utf-8 for profiling, file_id: {file_id}")
+                    text_content_for_profiling = None # Will skip profiling
+            except Exception as e:
+                local_path = upload_name = None
+                logger.warning(f"[vs_ingest_worker] Failed downloading OCR text for {name}, falling back to original: {e}")
+
+        if local_path is None:
+            logger.info(f"[vs_ingest_worker] No OCR text used. Downloading original file from: {file_path}")
+            # Upload under the original filename, preserving its extension
+            suffix = os.path.splitext(name)[1] or ".bin"
+            desired = name if os.path.splitext(name)[1] else f"{name}{suffix}"
+            # Sanitize desired filename minimally to avoid path traversal
+            upload_name = os.path.basename(desired)
+            # Hash while streaming: identical bytes already ingested in this workspace skip the upload
+            hasher = hashlib.sha256()
+            local_path = _download_to_tmp(file_path, tmp_dir, upload_name, hasher)
+            content_sha256 = hasher.hexdigest()
+            reuse = _find_ingested_by_hash(workspace_id, content_sha256)
+
+            # Attempt to get text for profiling from text-based files (including PDFs)
+            if upload_name.lower().endswith(('.txt', '.md', '.json')):
+                try:
+                    text_content_for_profiling = Path(local_path).read_bytes().decode("utf-8")
+                except UnicodeDecodeError:
+                    logger.warning(f"[vs_ingest_worker] Could not decode text file as utf-8 for profiling, file_id: {file_id}")
+            elif upload_name.lower().endswith('.pdf'):
+                pdf_text = _extract_text_from_pdf(local_path)
+                if pdf_text:
+                    text_content_for_profiling = pdf_text
+
+        # Upload to OpenAI Files with retry/backoff, streaming from the open handle under the
+        # friendly name (rewound before every attempt)
+        def _create_file(upload_name, fh):
+            logger.info(f"[vs_ingest_worker] Uploading {upload_name} to OpenAI Files API.")
+            fh.seek(0)
+            # Attach a tiny bit of metadata to aid later debugging (optional)
+            try:
+                return client.files.create(file=(upload_name, fh), purpose="assistants", metadata={
+                    "source": "ocr_text" if upload_name.lower().endswith('.txt') else "original",
+                    "workspace_id": workspace_id or "",
+                    "original_filename": name,
+                })
+            except Exception as e:
+                # Transient failures go back to _retry_call's backoff; re-sending the whole
+                # file without metadata straight away would just hit the same limit
+                if _is_transient_error(e):
+                    raise
+                # Fallback for SDKs/environments that don't accept metadata
+                logger.warning("[vs_ingest_worker] OpenAI files.create with metadata failed, retrying without.")
+                fh.seek(0)
+                return client.files.create(file=(upload_name, fh), purpose="assistants")
+
+        if reuse:
+            openai_file_id = reuse["openai_file_id"]
+            logger.info(f"[vs_ingest_worker] Identical content already ingested; reusing OpenAI File ID: {openai_file_id}")
+        else:
+            with open(local_path, "rb") as fh:
+                openai_file_id = _retry_call(_create_file, upload_name, fh, retries=4, base_delay=1.0).id
+            logger.info(f"[vs_ingest_worker] Successfully created OpenAI File ID: {openai_file_id}")
+
+    # Attach happens in micro-batches across the run (file batches), not per file; a reused
+    # file that is already in the store (vs_file_id) skips it
+    return {
+        "fw": fw,
+        "name": name,
+        "openai_file_id": openai_file_id,
+        "vs_file_id": (reuse or {}).get("vs_file_id"),
+        "content_sha256": content_sha256,
+        "has_ocr": has_ocr,
+        "text": text_content_for_profiling,
+    }
+
+
 async def upload_missing_files_to_vector_store():
     """Uploads pending Supabase files into the OpenAI Vector Store with backoff.
     On success, sets files.ingested=True (repurposed to mean VS-uploaded).
-    Rate is controlled by VS_UPLOAD_DELAY_MS and VS_UPLOAD_BATCH_LIMIT envs.
+    Rate is controlled by VS_UPLOAD_DELAY_MS, VS_UPLOAD_CONCURRENCY and VS_UPLOAD_BATCH_LIMIT envs.
     """
     logger.info("[vs_ingest_worker] Starting upload_missing_files_to_vector_store task.")
+    # This also runs as a FastAPI background task on the API's event loop: every blocking
+    # Supabase/SDK call below goes through a worker thread so requests keep being served
     try:
-        vector_store_id = _resolve_vector_store_id()
+        vector_store_id = await asyncio.to_thread(resolve_vector_store_id)
         logger.info(f"[vs_ingest_worker] Resolved vector_store_id: {vector_store_id}")
     except Exception as e:
         logger.error(f"[vs_ingest_worker] Could not resolve vector_store_id. Aborting. Error: {e}", exc_info=True)
         return {"error": "Failed to resolve vector_store_id"}
 
-    client = OpenAI()
-    async_openai_client = AsyncOpenAIClient()
+    client = _get_client()
     delay_ms = max(0, int(settings.VS_UPLOAD_DELAY_MS))
     per_call_sleep = delay_ms / 1000.0
     batch_limit = max(1, int(settings.VS_UPLOAD_BATCH_LIMIT))
@@ -307,9 +723,8 @@ async def upload_missing_files_to_vector_store():
         logger.error("[vs_ingest_worker] GDRIVE_WORKSPACE_ID is not set. Aborting.")
         return {"error": "GDRIVE_WORKSPACE_ID not set"}
 
-    files = _get_eligible_files(batch_limit, workspace_id)
+    files = await asyncio.to_thread(_get_eligible_files, batch_limit, workspace_id)
     uploaded = 0
-    skipped = 0
     errors = 0
     profiles_attempted = 0
     profiles_saved = 0
@@ -317,330 +732,256 @@ async def upload_missing_files_to_vector_store():
     if not files:
         logger.info("[vs_ingest_worker] No eligible files to upload.")
 
-    for fw in (files or []):
-        file_id = fw["file_id"]
-        f = fw.get("files") or {}
-        name = f.get("name") or os.path.basename(f.get("file_path", "")) or f"file-{file_id}"
-        file_path = f.get("file_path")
-        content_type = f.get("type", "application/octet-stream")
-        
-        logger.info(f"[vs_ingest_worker] Processing file: {name} (file_id: {file_id})")
-
-        # Prefer OCR text if available
-        temp_path = None
-        upload_dir = None
-        try:
-            ocr_text_path = f.get("ocr_text_path")
-            # Reflect actual OCR status from files.ocr_scanned; don't rely solely on text path presence
-            has_ocr = bool(f.get("ocr_scanned"))
-            text_content_for_profiling = None
-
-            if f.get("ocr_scanned") and ocr_text_path:
-                logger.info(f"[vs_ingest_worker] Attempting to download OCR text from: {ocr_text_path}")
-                try:
-                    content_bytes = supabase.storage.from_(settings.SUPABASE_STORAGE_BUCKET).download(ocr_text_path)
-                    # Text path present implies we used OCR-extracted text
-                    has_ocr = True
-                    # Create a stable temp file path using the original base name, so OpenAI sees a friendly filename
-                    upload_dir = tempfile.mkdtemp(prefix="vs_ingest_")
-                    base, _ = os.path.splitext(name)
-                    desired = f"{base}.txt"
-                    temp_path = os.path.join(upload_dir, desired)
-                    
-                    # Decode for profiling, write bytes to temp file for upload
-                    try:
-                        text_content_for_profiling = content_bytes.decode("utf-8")
-                    except UnicodeDecodeError:
-                        logger.warning(f"[vs_ingest_worker] Could not decode OCR text as utf-8 for profiling, file_id: {file_id}")
-                        text_content_for_profiling = None # Will skip profiling
-
-                    with open(temp_path, "wb") as tmp:
-                        tmp.write(content_bytes)
-
-                    logger.info(f"[vs_ingest_worker] Successfully created temp file with OCR text at: {temp_path}")
-                except Exception as e:
-                    logger.warning(f"[vs_ingest_worker] Failed downloading OCR text for {name}, falling back to original: {e}")
-            
-            if temp_path is None:
-                logger.info(f"[vs_ingest_worker] No OCR text used. Downloading original file from: {file_path}")
-                content_bytes = supabase.storage.from_(settings.SUPABASE_STORAGE_BUCKET).download(file_path)
-                # Create a stable temp file path using the original filename, preserving its extension
-                upload_dir = tempfile.mkdtemp(prefix="vs_ingest_") if upload_dir is None else upload_dir
-                suffix = os.path.splitext(name)[1] or ".bin"
-                desired = name if os.path.splitext(name)[1] else f"{name}{suffix}"
-                # Sanitize desired filename minimally to avoid path traversal
-                desired = os.path.basename(desired)
-                temp_path = os.path.join(upload_dir, desired)
-                with open(temp_path, "wb") as tmp:
-                    tmp.write(content_bytes)
-                logger.info(f"[vs_ingest_worker] Successfully created temp file with original content at: {temp_path}")
-
-                # Attempt to get text for profiling from text-based files (including PDFs)
-                if temp_path.lower().endswith(('.txt', '.md', '.json')):
-                    try:
-                        text_content_for_profiling = content_bytes.decode("utf-8")
-                    except UnicodeDecodeError:
-                        logger.warning(f"[vs_ingest_worker] Could not decode text file as utf-8 for profiling, file_id: {file_id}")
-                elif temp_path.lower().endswith('.pdf'):
-                    pdf_text = _extract_text_from_pdf_bytes(content_bytes)
-                    if pdf_text:
-                        text_content_for_profiling = pdf_text
-
-
-            # Upload to OpenAI Files with retry/backoff
-            def _create_file(p):
-                with open(p, "rb") as fh:
-                    logger.info(f"[vs_ingest_worker] Uploading {p} to OpenAI Files API.")
-                    # Attach a tiny bit of metadata to aid later debugging (optional)
-                    try:
-                        return client.files.create(file=fh, purpose="assistants", metadata={
-                            "source": "ocr_text" if temp_path and temp_path.lower().endswith('.txt') else "original",
-                            "workspace_id": workspace_id or "",
-                            "original_filename": name,
-                        })
-                    except Exception:
-                        # Fallback for SDKs/environments that don't accept metadata
-                        logger.warning("[vs_ingest_worker] OpenAI files.create with metadata failed, retrying without.")
-                        fh.seek(0)
-                        return client.files.create(file=fh, purpose="assistants")
-
-            created = _retry_call(_create_file, temp_path, retries=4, base_delay=1.0)
-            logger.info(f"[vs_ingest_worker] Successfully created OpenAI File ID: {created.id}")
-
-            # Attach to Vector Store with retry/backoff
-            vs_file_id = _retry_call(_attach_file_to_vector_store, client, vector_store_id, created.id, retries=4, base_delay=1.0)
-            logger.info(f"[vs_ingest_worker] Successfully attached to Vector Store. VS File ID: {vs_file_id}")
-
-            # --- Persist baseline ingestion metadata on file_workspaces ---
+    # Files uploaded to OpenAI in the loop below, waiting for the batched Vector Store attach
+    staged: List[Dict] = []
+    # Retry-counter rows for files that failed this run; written with the ingested rows
+    failure_rows: List[Dict] = []
+
+    # Uploads are independent network I/O: run up to VS_UPLOAD_CONCURRENCY at once in worker
+    # threads. VS_UPLOAD_DELAY_MS now spaces out upload *starts* across the pool instead of
+    # serializing the whole run.
+    sem = asyncio.Semaphore(max(1, settings.VS_UPLOAD_CONCURRENCY))
+    pace_lock = asyncio.Lock()
+    next_start = 0.0
+
+    # Attach in micro-batches of VS_ATTACH_BATCH_SIZE as uploads finish, so Vector Store
+    # indexing overlaps the remaining uploads instead of waiting for the whole run
+    attach_size = max(1, min(_ATTACH_BATCH_SIZE, settings.VS_ATTACH_BATCH_SIZE))
+    attached: Dict[str, Optional[str]] = {}
+    pending_attach: List[str] = []
+    attach_tasks: List[asyncio.Task] = []
+    # Profiling starts per micro-batch as soon as its attach lands (Upload -> Attach -> Profile),
+    # with its own bound so LLM calls don't take upload slots
+    staged_by_oid: Dict[str, List[Dict]] = {}
+    profile_sem = asyncio.Semaphore(max(1, settings.VS_UPLOAD_CONCURRENCY))
+    profile_tasks: List[asyncio.Task] = []
+
+    # --- Document Profiling Step ---
+    # Each profile is an independent LLM call. The resulting columns are kept on the staged
+    # entry and merged into the file's baseline row, so they land in the same bulk write.
+    async def _profile_staged(st: Dict) -> None:
+        nonlocal profiles_attempted, profiles_saved
+        file_id = st["fw"]["file_id"]
+        text_content_for_profiling = st["text"]
+        if text_content_for_profiling:
+            logger.info(f"[vs_ingest_worker] Generating document profile for file_id: {file_id}")
             try:
-                # Derive light metadata from filename
-                year, derived_doc_type = _derive_year_and_doctype(name)
-                month = _derive_month_from_filename(name)
-                ext = _file_ext_from_name(name)
-
-                supabase.table("file_workspaces").update({
-                    "ingested": True,
-                    "openai_file_id": created.id,
-                    "vs_file_id": vs_file_id,
-                    "has_ocr": bool(has_ocr),
-                    "file_ext": ext,
-                    "doc_type": derived_doc_type,
-                    "meeting_year": year,
-                    "meeting_month": month,
-                }).eq("file_id", file_id).eq("workspace_id", workspace_id).execute()
-                logger.info(f"[vs_ingest_worker] Updated file_workspaces baseline metadata for file_id: {file_id}")
-            except Exception as meta_e:
-                logger.error(f"[vs_ingest_worker] Failed to update baseline ingestion metadata for file_id {file_id}: {meta_e}")
-
-            # --- Document Profiling Step ---
-            profile_saved = False
-            if text_content_for_profiling:
-                logger.info(f"[vs_ingest_worker] Generating document profile for file_id: {file_id}")
-                try:
-                    profile = await generate_profile_from_text(text_content_for_profiling)
-                    if profile:
-                        profile_data = {
-                            "file_id": file_id,
-                            "workspace_id": workspace_id,
-                            "summary": profile.get("summary"),
-                            "keywords": profile.get("keywords"),
-                            "entities": profile.get("entities"),
-                            "processed_at": datetime.now(timezone.utc).isoformat(),
-                        }
-                        # Deprecated: document_profiles table removed; persist directly to file_workspaces only
-                        # Best-effort: also persist profile onto file_workspaces if columns exist
-                        try:
-                            # Persist profile onto file_workspaces and mark processed
-                            now_iso = datetime.now(timezone.utc).isoformat()
-                            supabase.table("file_workspaces").update({
-                                "profile_summary": profile.get("summary"),
-                                "profile_keywords": profile.get("keywords"),
-                                "profile_entities": profile.get("entities"),
-                                "doc_profile_processed": True,
-                                "doc_profile_processed_at": now_iso,
-                                "doc_profile_status": "Success",
-                            }).eq("file_id", file_id).eq("workspace_id", workspace_id).execute()
-                        except Exception as e_profile_cols:
-                            logger.debug(f"[vs_ingest_worker] file_workspaces profile columns update failed (continuing): {e_profile_cols}")
-                        profile_saved = True
-                        profiles_saved += 1
-                        logger.info(f"[vs_ingest_worker] Successfully saved document profile for file_id: {file_id}")
-                    else:
-                        logger.warning(f"[vs_ingest_worker] Document profiling returned no data for file_id: {file_id}")
-                        try:
-                            supabase.table("file_workspaces").update({
-                                "doc_profile_processed": True,
-                                "doc_profile_processed_at": datetime.now(timezone.utc).isoformat(),
-                                "doc_profile_status": "Skipped: Profiling returned no data",
-                            }).eq("file_id", file_id).eq("workspace_id", workspace_id).execute()
-                        except Exception as e_mark_processed:
-                            logger.warning(f"[vs_ingest_worker] Failed to mark file as processed after empty profile result: {e_mark_processed}")
-                except Exception as e_profile_gen:
-                    logger.error(f"[vs_ingest_worker] Failed to generate or save document profile for file_id {file_id}: {e_profile_gen}", exc_info=True)
-                    try:
-                        supabase.table("file_workspaces").update({
-                            "doc_profile_processed": True,
-                            "doc_profile_processed_at": datetime.now(timezone.utc).isoformat(),
-                            "doc_profile_status": f"Failed: {e_profile_gen}",
-                        }).eq("file_id", file_id).eq("workspace_id", workspace_id).execute()
-                    except Exception as e_mark_processed:
-                        logger.warning(f"[vs_ingest_worker] Failed to mark file as processed after profile generation error: {e_mark_processed}")
-                finally:
-                    profiles_attempted += 1
-            else:
-                logger.info(f"[vs_ingest_worker] Skipping document profiling for file_id {file_id} (no text content).")
-                # Also mark as processed to avoid re-queueing
-                try:
-                    supabase.table("file_workspaces").update({
+                profile = await generate_profile_from_text(text_content_for_profiling)
+                if profile:
+                    # Deprecated: document_profiles table removed; persist directly to file_workspaces only
+                    st["profile"] = {
+                        "profile_summary": profile.get("summary"),
+                        "profile_keywords": profile.get("keywords"),
+                        "profile_entities": profile.get("entities"),
                         "doc_profile_processed": True,
                         "doc_profile_processed_at": datetime.now(timezone.utc).isoformat(),
-                        "doc_profile_status": "Skipped: No text content found",
-                    }).eq("file_id", file_id).eq("workspace_id", workspace_id).execute()
-                except Exception as e_mark_processed:
-                    logger.warning(f"[vs_ingest_worker] Failed to mark file as processed after skipping profiling: {e_mark_processed}")
+                        "doc_profile_status": "Success",
+                    }
+                    profiles_saved += 1
+                    logger.info(f"[vs_ingest_worker] Generated document profile for file_id: {file_id}")
+                else:
+                    logger.warning(f"[vs_ingest_worker] Document profiling returned no data for file_id: {file_id}")
+                    st["profile"] = {
+                        "doc_profile_processed": True,
+                        "doc_profile_processed_at": datetime.now(timezone.utc).isoformat(),
+                        "doc_profile_status": "Skipped: Profiling returned no data",
+                    }
+            except Exception as e_profile_gen:
+                logger.error(f"[vs_ingest_worker] Failed to generate document profile for file_id {file_id}: {e_profile_gen}", exc_info=True)
+                st["profile"] = {
+                    "doc_profile_processed": True,
+                    "doc_profile_processed_at": datetime.now(timezone.utc).isoformat(),
+                    "doc_profile_status": f"Failed: {e_profile_gen}",
+                }
+            finally:
+                profiles_attempted += 1
+        else:
+            logger.info(f"[vs_ingest_worker] Skipping document profiling for file_id {file_id} (no text content).")
+            # Also mark as processed to avoid re-queueing
+            st["profile"] = {
+                "doc_profile_processed": True,
+                "doc_profile_processed_at": datetime.now(timezone.utc).isoformat(),
+                "doc_profile_status": "Skipped: No text content found",
+            }
+
+    async def _bounded_profile(st: Dict) -> None:
+        try:
+            async with profile_sem:
+                await _profile_staged(st)
+        except Exception as e:
+            logger.error(f"[vs_ingest_worker] Post-attach processing failed for {st['name']} (id={st['fw']['file_id']}): {e}", exc_info=True)
 
-            uploaded += 1
-            if per_call_sleep:
-                time.sleep(per_call_sleep)
+    async def _attach_chunk(file_ids: List[str]) -> None:
+        try:
+            # Retry on the loop so a backing-off attach doesn't hold an executor thread
+            done = await _aretry_call(
+                asyncio.to_thread, _attach_files_to_vector_store, client, vector_store_id, file_ids, retries=4, base_delay=1.0,
+            )
+            attached.update(done)
+            logger.info(f"[vs_ingest_worker] Attached {len(done)}/{len(file_ids)} files to Vector Store via file batch.")
         except Exception as e:
-            logger.error(f"[vs_ingest_worker] Failed VS upload for {name} (id={file_id}): {e}", exc_info=True)
+            logger.error(f"[vs_ingest_worker] Batched Vector Store attach failed for {len(file_ids)} files: {e}", exc_info=True)
+            return
+        for oid in done:
+            for st in staged_by_oid[oid]:
+                profile_tasks.append(asyncio.create_task(_bounded_profile(st)))
+
+    def _flush_attach() -> None:
+        if pending_attach:
+            attach_tasks.append(asyncio.create_task(_attach_chunk(pending_attach[:])))
+            pending_attach.clear()
+
+    async def _pace() -> None:
+        # Space out call starts by VS_UPLOAD_DELAY_MS across all concurrent tasks
+        nonlocal next_start
+        if not per_call_sleep:
+            return
+        loop = asyncio.get_running_loop()
+        async with pace_lock:
+            now = loop.time()
+            wait = next_start - now
+            next_start = max(now, next_start) + per_call_sleep
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def _paced_upload(fw: Dict) -> Dict:
+        async with sem:
+            await _pace()
+            st = await asyncio.to_thread(_upload_one, client, fw, _display_name(fw), workspace_id)
+        oid = st["openai_file_id"]
+        if st["vs_file_id"]:
+            # Reused content that is already in the store: nothing to attach
+            attached[oid] = st["vs_file_id"]
+            profile_tasks.append(asyncio.create_task(_bounded_profile(st)))
+            return st
+        # Several files may reuse one OpenAI file; attach it once
+        if oid not in staged_by_oid:
+            pending_attach.append(oid)
+        staged_by_oid.setdefault(oid, []).append(st)
+        if len(pending_attach) >= attach_size:
+            _flush_attach()
+        return st
+
+    outcomes = await asyncio.gather(*[_paced_upload(fw) for fw in (files or [])], return_exceptions=True)
+    for fw, out in zip(files or [], outcomes):
+        if isinstance(out, BaseException):
+            name = _display_name(fw)
+            logger.error(f"[vs_ingest_worker] Failed VS upload for {name} (id={fw['file_id']}): {out}", exc_info=out)
             errors += 1
             # Increment retry counter and mark as failed if limit is exceeded
-            try:
-                retries = (fw.get("ingest_retries") or 0) + 1
-                update_payload = {"ingest_retries": retries}
-                if retries >= max_retries:
-                    update_payload["ingest_failed"] = True
-                    logger.error(f"File {name} (id={file_id}) has failed ingestion {retries} times and will be marked as failed.")
-                supabase.table("file_workspaces").update(update_payload).eq("file_id", file_id).eq("workspace_id", workspace_id).execute()
-            except Exception as db_e:
-                logger.error(f"Failed to update retry count for file {file_id}: {db_e}")
-        finally:
-            # Cleanup temp file and directory
-            try:
-                if temp_path and os.path.exists(temp_path):
-                    os.remove(temp_path)
-            except Exception:
-                pass
-            try:
-                if upload_dir and os.path.isdir(upload_dir):
-                    os.rmdir(upload_dir)
-            except Exception:
-                pass
-    
+            failure_rows.append(_ingest_failure_row(fw, name, workspace_id, max_retries))
+        else:
+            staged.append(out)
+
+    # Attach whatever is left, then drain the in-flight file batches and the profiles they started
+    _flush_attach()
+    if attach_tasks:
+        await asyncio.gather(*attach_tasks)
+    if profile_tasks:
+        await asyncio.gather(*profile_tasks)
+
+    baseline_rows: List[Dict] = []
+    for st in staged:
+        fw = st["fw"]
+        file_id = fw["file_id"]
+        name = st["name"]
+        created_id = st["openai_file_id"]
+        if created_id not in attached:
+            logger.error(f"[vs_ingest_worker] Failed VS attach for {name} (id={file_id}, openai_file_id={created_id})")
+            errors += 1
+            failure_rows.append(_ingest_failure_row(fw, name, workspace_id, max_retries))
+            continue
+        # --- Collect baseline ingestion metadata; written for all files in one upsert below ---
+        # Derive light metadata from filename
+        year, derived_doc_type, month, ext = _filename_meta(name)
+        baseline_rows.append({
+            "file_id": file_id,
+            "workspace_id": workspace_id,
+            "user_id": fw.get("user_id"),
+            "ingested": True,
+            "openai_file_id": created_id,
+            "vs_file_id": attached[created_id],
+            "has_ocr": bool(st["has_ocr"]),
+            "file_ext": ext,
+            "doc_type": derived_doc_type,
+            "meeting_year": year,
+            "meeting_month": month,
+            **({"content_sha256": st["content_sha256"]} if st["content_sha256"] else {}),
+            **st.get("profile", {}),
+        })
+    uploaded = len(baseline_rows)
+
+    # --- Persist baseline metadata, profiles and retry counters on file_workspaces (one bulk write per run) ---
+    if baseline_rows or failure_rows:
+        await asyncio.to_thread(_write_file_workspace_rows, workspace_id, baseline_rows + failure_rows)
+        logger.info(f"[vs_ingest_worker] Updated file_workspaces for {len(baseline_rows)} ingested and {len(failure_rows)} failed files.")
+
     # Second pass: profile-only for already-ingested but unprofiled files
-    profile_only = _get_unprofiled_files(batch_limit, workspace_id)
+    profile_only = await asyncio.to_thread(_get_unprofiled_files, batch_limit, workspace_id)
     profiled = 0
     if profile_only:
         logger.info(f"[vs_ingest_worker] Starting profile-only pass for {len(profile_only)} files.")
     else:
         logger.info("[vs_ingest_worker] No unprofiled files found for profile-only pass.")
 
-    for fw in profile_only:
+    # Prefetch profiling text for the whole pass up front: Storage downloads are independent,
+    # so the pass waits on roughly the slowest one instead of their sum
+    async def _bounded_read(fw: Dict) -> Optional[str]:
+        async with sem:
+            return await asyncio.to_thread(_read_profile_text, fw, _display_name(fw))
+
+    texts = await asyncio.gather(*[_bounded_read(fw) for fw in profile_only])
+
+    # Profile calls are independent LLM requests: run them concurrently under the profile bound,
+    # paced like the uploads; each file's rows are written from a worker thread
+    async def _profile_only(fw: Dict, text_content_for_profiling: Optional[str]) -> None:
+        nonlocal profiled, profiles_attempted, profiles_saved
         file_id = fw["file_id"]
-        f = fw.get("files") or {}
-        name = f.get("name") or os.path.basename(f.get("file_path", "")) or f"file-{file_id}"
-        file_path = f.get("file_path")
+        if not text_content_for_profiling:
+            logger.info(f"[vs_ingest_worker] Skipping profile-only for file_id {file_id} (no text content).")
+            # Mark as processed to avoid re-queueing
+            try:
+                await asyncio.to_thread(_mark_profile_processed, file_id, workspace_id)
+            except Exception as e_mark_processed:
+                logger.warning(f"[vs_ingest_worker] Failed to mark file as processed after skipping profile-only: {e_mark_processed}")
+            return
 
+        # Generate and save profile
         try:
-            ocr_text_path = f.get("ocr_text_path")
-            text_content_for_profiling = None
-
-            if f.get("ocr_scanned") and ocr_text_path:
-                try:
-                    content_bytes = supabase.storage.from_(settings.SUPABASE_STORAGE_BUCKET).download(ocr_text_path)
-                    try:
-                        text_content_for_profiling = content_bytes.decode("utf-8")
-                    except UnicodeDecodeError:
-                        logger.warning(f"[vs_ingest_worker] Could not decode OCR text as utf-8 for profiling (profile-only), file_id: {file_id}")
-                except Exception as e:
-                    logger.warning(f"[vs_ingest_worker] Failed downloading OCR text (profile-only) for {name}: {e}")
-
-            if text_content_for_profiling is None:
-                try:
-                    content_bytes = supabase.storage.from_(settings.SUPABASE_STORAGE_BUCKET).download(file_path)
-                    lname = (name or "").lower()
-                    if lname.endswith((".txt", ".md", ".json")):
-                        try:
-                            text_content_for_profiling = content_bytes.decode("utf-8")
-                        except UnicodeDecodeError:
-                            logger.warning(f"[vs_ingest_worker] Could not decode text file as utf-8 (profile-only), file_id: {file_id}")
-                    elif lname.endswith('.pdf'):
-                        pdf_text = _extract_text_from_pdf_bytes(content_bytes)
-                        if pdf_text:
-                            text_content_for_profiling = pdf_text
-                except Exception as e:
-                    logger.warning(f"[vs_ingest_worker] Failed downloading original content (profile-only) for {name}: {e}")
-
-            if not text_content_for_profiling:
-                logger.info(f"[vs_ingest_worker] Skipping profile-only for file_id {file_id} (no text content).")
+            async with profile_sem:
+                await _pace()
+                profile = await generate_profile_from_text(text_content_for_profiling)
+            if profile:
+                await asyncio.to_thread(_save_profile_only, file_id, workspace_id, profile)
+                profiled += 1
+                profiles_saved += 1
+                logger.info(f"[vs_ingest_worker] Profile-only saved for file_id: {file_id}")
+            else:
+                logger.warning(f"[vs_ingest_worker] Profile-only generation returned no data for file_id: {file_id}")
                 # Mark as processed to avoid re-queueing
                 try:
-                    supabase.table("file_workspaces").update({
-                        "doc_profile_processed": True,
-                        "doc_profile_processed_at": datetime.now(timezone.utc).isoformat(),
-                    }).eq("file_id", file_id).eq("workspace_id", workspace_id).execute()
+                    await asyncio.to_thread(_mark_profile_processed, file_id, workspace_id)
                 except Exception as e_mark_processed:
-                    logger.warning(f"[vs_ingest_worker] Failed to mark file as processed after skipping profile-only: {e_mark_processed}")
-                continue
-
-            # Generate and save profile
-            try:
-                profile = await generate_profile_from_text(text_content_for_profiling)
-                if profile:
-                    profile_data = {
-                        "file_id": file_id,
-                        "workspace_id": workspace_id,
-                        "summary": profile.get("summary"),
-                        "keywords": profile.get("keywords"),
-                        "entities": profile.get("entities"),
-                        "processed_at": datetime.now(timezone.utc).isoformat(),
-                    }
-                    # Deprecated: document_profiles table removed; persist directly to file_workspaces only
-                    # Best-effort: also persist profile onto file_workspaces if columns exist
-                    try:
-                        supabase.table("file_workspaces").update({
-                            "profile_summary": profile.get("summary"),
-                            "profile_keywords": profile.get("keywords"),
-                            "profile_entities": profile.get("entities"),
-                            "profile_generated_at": datetime.now(timezone.utc).isoformat(),
-                        }).eq("file_id", file_id).eq("workspace_id", workspace_id).execute()
-                    except Exception as e_profile_cols:
-                        logger.debug(f"[vs_ingest_worker] file_workspaces profile columns not present or update failed (continuing): {e_profile_cols}")
-                    supabase.table("file_workspaces").update({
-                        "doc_profile_processed": True,
-                        "doc_profile_processed_at": datetime.now(timezone.utc).isoformat(),
-                    }).eq("file_id", file_id).eq("workspace_id", workspace_id).execute()
-                    profiled += 1
-                    profiles_saved += 1
-                    logger.info(f"[vs_ingest_worker] Profile-only saved for file_id: {file_id}")
-                else:
-                    logger.warning(f"[vs_ingest_worker] Profile-only generation returned no data for file_id: {file_id}")
-                    # Mark as processed to avoid re-queueing
-                    try:
-                        supabase.table("file_workspaces").update({
-                            "doc_profile_processed": True,
-                            "doc_profile_processed_at": datetime.now(timezone.utc).isoformat(),
-                        }).eq("file_id", file_id).eq("workspace_id", workspace_id).execute()
-                    except Exception as e_mark_processed:
-                        logger.warning(f"[vs_ingest_worker] Failed to mark file as processed after empty profile-only result: {e_mark_processed}")
-            except Exception as e_profile:
-                logger.error(f"[vs_ingest_worker] Profile-only generation failed for file_id {file_id}: {e_profile}", exc_info=True)
-            finally:
-                profiles_attempted += 1
+                    logger.warning(f"[vs_ingest_worker] Failed to mark file as processed after empty profile-only result: {e_mark_processed}")
+        except Exception as e_profile:
+            logger.error(f"[vs_ingest_worker] Profile-only generation failed for file_id {file_id}: {e_profile}", exc_info=True)
+        finally:
+            profiles_attempted += 1
 
-            if per_call_sleep:
-                time.sleep(per_call_sleep)
-        except Exception as e:
-            logger.error(f"[vs_ingest_worker] Profile-only pass failed for {name} (id={file_id}): {e}", exc_info=True)
+    outcomes = await asyncio.gather(
+        *[_profile_only(fw, text) for fw, text in zip(profile_only, texts)], return_exceptions=True
+    )
+    for fw, out in zip(profile_only, outcomes):
+        if isinstance(out, BaseException):
+            logger.error(f"[vs_ingest_worker] Profile-only pass failed for {_display_name(fw)} (id={fw['file_id']}): {out}", exc_info=out)
 
     logger.info(
-        f"[vs_ingest_worker] Task finished. Uploaded: {uploaded}, Skipped: {skipped}, Errors: {errors}, Profiles attempted: {profiles_attempted}, Profiles saved: {profiles_saved}, Profiled (profile-only): {profiled}"
+        f"[vs_ingest_worker] Task finished. Uploaded: {uploaded}, Errors: {errors}, Profiles attempted: {profiles_attempted}, Profiles saved: {profiles_saved}, Profiled (profile-only): {profiled}"
     )
     return {
         "vector_store_id": vector_store_id,
         "uploaded": uploaded,
-        "skipped": skipped,
+        "skipped": 0,  # nothing is skipped any more; key kept for existing callers
         "errors": errors,
         "profiles_attempted": profiles_attempted,
         "profiles_saved": profiles_saved,
@@ -1,4 +1,5 @@
 import logging
+import operator
 from typing import Optional
 
 from fastapi import APIRouter, HTTPException, Query
@@ -6,9 +7,15 @@ from openai import OpenAI
 
 from app.core.config import settings
 from app.core.supabase_client import supabase
+from app.core.openai_sync_client import get_openai_client
 
 logger = logging.getLogger(__name__)
 
+# Resolve the SDK shape once at import (newer SDKs: client.vector_stores, older: client.beta.vector_stores)
+_vs_files_list = operator.attrgetter(
+    "vector_stores.files.list" if hasattr(OpenAI, "vector_stores") else "beta.vector_stores.files.list"
+)
+
 router = APIRouter(prefix="/health", tags=["health"]) 
 
 
@@ -73,11 +80,7 @@ def health_ingestion(workspace_id: Optional[str] = Query(None)):
         if workspace_id:
             vs_id = _get_vector_store_id(workspace_id)
         if vs_id:
-            client = OpenAI()
-            try:
-                lst = client.vector_stores.files.list(vector_store_id=vs_id)
-            except Exception:
-                lst = getattr(client, "beta").vector_stores.files.list(vector_store_id=vs_id)  # type: ignore
+            lst = _vs_files_list(get_openai_client())(vector_store_id=vs_id)
             data = getattr(lst, "data", None) or []
             vs_file_count = len(data)
     except Exception as e:
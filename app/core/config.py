@@ -29,9 +29,27 @@ class Settings:
     # Workspace/Vector Store targeting for Responses GDrive sync
     GDRIVE_WORKSPACE_ID: str = os.getenv("GDRIVE_WORKSPACE_ID", "").strip()
     GDRIVE_VECTOR_STORE_ID: str = os.getenv("GDRIVE_VECTOR_STORE_ID", "").strip()
+    # Max new Drive files downloaded/registered/OCR-checked concurrently per sync run
+    GDRIVE_SYNC_CONCURRENCY: int = int(os.getenv("GDRIVE_SYNC_CONCURRENCY", "4").strip() or 4)
     # Vector Store upload worker tuning
     VS_UPLOAD_DELAY_MS: int = int(os.getenv("VS_UPLOAD_DELAY_MS", "1000").strip() or 1000)
     VS_UPLOAD_BATCH_LIMIT: int = int(os.getenv("VS_UPLOAD_BATCH_LIMIT", "25").strip() or 25)
+    # Max files the ingest worker downloads/uploads to OpenAI concurrently
+    VS_UPLOAD_CONCURRENCY: int = int(os.getenv("VS_UPLOAD_CONCURRENCY", "8").strip() or 8)
+    # Files per Vector Store file batch; attaching starts as soon as this many uploads finish
+    VS_ATTACH_BATCH_SIZE: int = int(os.getenv("VS_ATTACH_BATCH_SIZE", "100").strip() or 100)
+    # /vector-store/ingest/upload pipeline: OCR workers (CPU-bound) and OpenAI upload workers (I/O-bound)
+    INGEST_OCR_WORKERS: int = int(os.getenv("INGEST_OCR_WORKERS", "2").strip() or 2)
+    # Reuse ocrmypdf output for byte-identical PDFs via Storage (ocr_cache/<sha256>.pdf)
+    INGEST_OCR_CACHE: bool = os.getenv("INGEST_OCR_CACHE", "True").strip().lower() in ("1", "true", "yes")
+    INGEST_UPLOAD_WORKERS: int = int(os.getenv("INGEST_UPLOAD_WORKERS", "4").strip() or 4)
+    # /upload: max files processed (extract/OCR/upload) concurrently per request
+    INGEST_CONCURRENCY: int = int(os.getenv("INGEST_CONCURRENCY", "8").strip() or 8)
+    # Ingest DB write buffer: coalesce rows from concurrent requests for up to N ms / N rows
+    INGEST_DB_FLUSH_MS: int = int(os.getenv("INGEST_DB_FLUSH_MS", "250").strip() or 250)
+    INGEST_DB_FLUSH_ROWS: int = int(os.getenv("INGEST_DB_FLUSH_ROWS", "100").strip() or 100)
+    # Seconds to cache workspace -> vector_store_id lookups in-process (0 disables)
+    VECTOR_STORE_ID_CACHE_TTL: int = int(os.getenv("VECTOR_STORE_ID_CACHE_TTL", "300").strip() or 300)
 
     # ⚙️ Env
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development").strip()
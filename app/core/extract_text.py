@@ -1,5 +1,6 @@
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 
 # Optional dependencies: degrade gracefully if not installed in test/light environments.
 try:  # PyMuPDF
@@ -17,6 +18,11 @@ try:
 except ImportError:  # pragma: no cover
     pytesseract = None
 
+try:  # in-process Tesseract bindings (optional; preferred over pytesseract when present)
+    from tesserocr import PyTessBaseAPI  # type: ignore
+except ImportError:  # pragma: no cover
+    PyTessBaseAPI = None
+
 try:
     from pdf2image import convert_from_path  # type: ignore
 except ImportError:  # pragma: no cover
@@ -31,11 +37,17 @@ class TextExtractionError(Exception):
     """Custom exception for text extraction failures."""
     pass
 
+# Compiled once; clean_text and the page-marker strip run on every extracted document
+_PAGE_NUM_RE = re.compile(r'Page \\d+|\\d+ of \\d+')
+_WS_RE = re.compile(r'\s+')
+_RULE_LINE_RE = re.compile(r'^[-_]+$', flags=re.MULTILINE)
+_PAGE_MARKER_RE = re.compile(r'---PAGE \d+---')
+
 def clean_text(text):
     # ... (keep existing clean_text function)
-    text = re.sub(r'Page \\d+|\\d+ of \\d+', '', text)
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'^[-_]+$', '', text, flags=re.MULTILINE)
+    text = _PAGE_NUM_RE.sub('', text)
+    text = _WS_RE.sub(' ', text)
+    text = _RULE_LINE_RE.sub('', text)
     return text.strip()
 
 def extract_text_from_pdf(path):
@@ -47,7 +59,7 @@ def extract_text_from_pdf(path):
                     f"---PAGE {i+1}---\n" + (page.extract_text() or "")
                     for i, page in enumerate(pdf.pages)
                 )
-                text_content_only = re.sub(r'---PAGE \d+---', '', text).strip()
+                text_content_only = _PAGE_MARKER_RE.sub('', text).strip()
                 if len(text_content_only) > 100:
                     return clean_text(text)
         except Exception as e:  # pragma: no cover
@@ -61,7 +73,7 @@ def extract_text_from_pdf(path):
                 f"---PAGE {i+1}---\n" + page.get_text()
                 for i, page in enumerate(doc)
             )
-            text_content_only = re.sub(r'---PAGE \d+---', '', text).strip()
+            text_content_only = _PAGE_MARKER_RE.sub('', text).strip()
             if len(text_content_only) > 100:
                 return clean_text(text)
         except Exception as e:  # pragma: no cover
@@ -70,6 +82,64 @@ def extract_text_from_pdf(path):
     # Indicate OCR or other fallback needed
     return None
 
+def pdf_has_text_layer(path, max_pages=3, min_chars=50):
+    """Cheap probe of the first few pages for an embedded text layer.
+
+    Returns True/False when PyMuPDF can answer, or None when it is unavailable
+    or the file cannot be opened (callers should then fall back to the full
+    extraction + OCR flow).
+    """
+    if fitz is None:
+        return None
+    try:
+        with fitz.open(path) as doc:
+            for i in range(min(max_pages, doc.page_count)):
+                if len(doc[i].get_text().strip()) > min_chars:
+                    return True
+            return False
+    except Exception as e:  # pragma: no cover
+        print(f"PyMuPDF text-layer probe failed: {e}")
+        return None
+
+# 150 DPI is plenty for Tesseract on typical scans and much cheaper to render than 200+
+OCR_DPI = 150
+
+def render_pdf_pages(path, max_pages, dpi=OCR_DPI):
+    """Render only the first max_pages pages of a PDF, in grayscale, for OCR."""
+    if convert_from_path is None:
+        raise TextExtractionError("pdf2image not installed")
+    return convert_from_path(
+        path,
+        dpi=dpi,
+        first_page=1,
+        last_page=max(1, max_pages),
+        grayscale=True,
+        thread_count=min(max(1, max_pages), os.cpu_count() or 1),
+    )
+
+def ocr_images(images):
+    """OCR a sequence of page images and join the page texts.
+
+    With tesserocr the language model is loaded once and reused for every page;
+    pytesseract (fallback) spawns a tesseract process per page, so those run
+    in parallel threads.
+    """
+    # Tesseract binarizes internally; grayscale input is a third the bytes of RGB
+    images = [img.convert("L") if getattr(img, "mode", "L") not in ("L", "1") else img for img in images]
+    if PyTessBaseAPI is not None:
+        texts = []
+        with PyTessBaseAPI() as api:
+            for img in images:
+                api.SetImage(img)
+                texts.append(api.GetUTF8Text())
+        return "\n\n".join(texts)
+    if pytesseract is None:
+        raise TextExtractionError("No OCR backend installed (tesserocr or pytesseract)")
+    if len(images) <= 1:
+        return "\n\n".join(pytesseract.image_to_string(img) for img in images)
+    with ThreadPoolExecutor(max_workers=min(len(images), os.cpu_count() or 1)) as pool:
+        return "\n\n".join(pool.map(pytesseract.image_to_string, images))
+
 def extract_text_from_docx(path):
     if Document is None:
         raise TextExtractionError("python-docx not installed")
@@ -2,12 +2,72 @@ import asyncio
 import os
 import httpx
 import logging
+from openai import AsyncOpenAI
 from typing import Optional, List, Dict
 
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+try:  # HTTP/2 multiplexing needs the optional `h2` package (httpx[http2])
+    import h2  # type: ignore  # noqa: F401
+    _HTTP2 = True
+except ImportError:  # pragma: no cover
+    _HTTP2 = False
+
+# Shared keep-alive client for OpenAI REST calls. An AsyncClient's pool belongs to the
+# loop it was created on, so it is rebuilt (and the old one closed) if used from a
+# different running loop.
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_async_openai: Optional[AsyncOpenAI] = None
+
+
+def _close_stale_http_client(client: httpx.AsyncClient, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+    """Close a client left behind by a loop switch on the loop that owns its pool.
+
+    A loop that has stopped (e.g. after asyncio.run) can no longer run aclose(); its
+    sockets are released when the client is garbage collected.
+    """
+    if client.is_closed or loop is None or loop.is_closed():
+        return
+    if loop.is_running():
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Return the process-wide httpx.AsyncClient for OpenAI REST calls (must be called inside a loop)."""
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        if _http_client is not None:
+            _close_stale_http_client(_http_client, _http_client_loop)
+        _http_client = httpx.AsyncClient(
+            http2=_HTTP2,
+            timeout=15.0,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+        )
+        _http_client_loop = loop
+    return _http_client
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """Return an AsyncOpenAI SDK client riding on the shared AsyncClient (must be called inside a loop)."""
+    global _async_openai
+    http_client = get_async_http_client()
+    if _async_openai is None or _async_openai._client is not http_client:
+        # The SDK's default 600s timeout suits file uploads and batch polling better than 15s
+        _async_openai = AsyncOpenAI(http_client=http_client, timeout=httpx.Timeout(600.0, connect=5.0))
+    return _async_openai
+
+
+async def close_async_http_client() -> None:
+    global _http_client, _http_client_loop, _async_openai
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client, _http_client_loop, _async_openai = None, None, None
+
+
 class AsyncOpenAIClient:
     def __init__(self, timeout: float = 15.0, retries: int = 3):
         self.base_url = os.environ.get("OPENAI_BASE_URL", "https://api.openai.com").rstrip("/")
@@ -23,29 +83,36 @@ class AsyncOpenAIClient:
     async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
         last_exc: Optional[Exception] = None
         backoff = 0.5
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            for _ in range(self.retries):
-                try:
-                    full_url = f"{self.base_url}{url}" if not url.startswith("http") else url
-                    resp = await client.request(method, full_url, headers=self._headers(), **kwargs)
-                    if resp.status_code in (429, 500, 502, 503, 504):
-                        last_exc = Exception(f"OpenAI API returned {resp.status_code}: {resp.text}")
-                        await asyncio.sleep(backoff)
-                        backoff = min(4.0, backoff * 2)
-                        continue
-                    resp.raise_for_status()
-                    return resp
-                except httpx.RequestError as e:
-                    last_exc = e
+        client = get_async_http_client()
+        for _ in range(self.retries):
+            try:
+                full_url = f"{self.base_url}{url}" if not url.startswith("http") else url
+                resp = await client.request(method, full_url, headers=self._headers(), timeout=self.timeout, **kwargs)
+                if resp.status_code in (429, 500, 502, 503, 504):
+                    last_exc = Exception(f"OpenAI API returned {resp.status_code}: {resp.text}")
                     await asyncio.sleep(backoff)
                     backoff = min(4.0, backoff * 2)
                     continue
+                resp.raise_for_status()
+                return resp
+            except httpx.RequestError as e:
+                last_exc = e
+                await asyncio.sleep(backoff)
+                backoff = min(4.0, backoff * 2)
+                continue
         raise Exception(f"OpenAI HTTP request failed after {self.retries} retries: {last_exc}")
 
     async def list_vector_store_files(self, vector_store_id: str) -> List[Dict]:
-        url = f"/v1/vector_stores/{vector_store_id}/files?limit=100"
-        resp = await self._request("GET", url)
-        return (resp.json() or {}).get("data", [])
+        items: List[Dict] = []
+        after: Optional[str] = None
+        while True:
+            url = f"/v1/vector_stores/{vector_store_id}/files?limit=100" + (f"&after={after}" if after else "")
+            body = (await self._request("GET", url)).json() or {}
+            page = body.get("data", [])
+            items.extend(page)
+            after = body.get("last_id") or (page[-1].get("id") if page else None)
+            if not body.get("has_more") or not page or not after:
+                return items
 
     async def delete_vector_store_attachment(self, vector_store_id: str, file_id: str) -> bool:
         url = f"/v1/vector_stores/{vector_store_id}/files/{file_id}"
@@ -0,0 +1,47 @@
+"""Shared synchronous OpenAI client with a pooled keep-alive HTTP transport.
+
+Constructing `OpenAI()` per request builds a new httpx.Client every time, so each
+request paid a fresh TCP+TLS handshake to api.openai.com. The client is created
+lazily (so importing this module never requires OPENAI_API_KEY) and then reused.
+"""
+
+from typing import Optional
+import threading
+
+import httpx
+from openai import DefaultHttpxClient, OpenAI
+
+try:  # HTTP/2 multiplexing needs the optional `h2` package (httpx[http2])
+    import h2  # type: ignore  # noqa: F401
+    _HTTP2 = True
+except ImportError:  # pragma: no cover
+    _HTTP2 = False
+
+_openai_lock = threading.Lock()
+_openai_client: Optional[OpenAI] = None
+
+
+def _build_http_client() -> httpx.Client:
+    return DefaultHttpxClient(
+        timeout=httpx.Timeout(connect=5.0, read=60.0, write=60.0, pool=5.0),
+        transport=httpx.HTTPTransport(
+            retries=2,
+            http2=_HTTP2,
+            limits=httpx.Limits(max_keepalive_connections=64, max_connections=128, keepalive_expiry=60),
+        ),
+    )
+
+
+def get_openai_client(force_refresh: bool = False) -> OpenAI:
+    """Return the process-wide OpenAI client, creating it on first use.
+
+    force_refresh: rebuild the client (e.g. after rotating OPENAI_API_KEY).
+    """
+    global _openai_client
+    if _openai_client is not None and not force_refresh:
+        return _openai_client
+    with _openai_lock:
+        if _openai_client is not None and not force_refresh:
+            return _openai_client
+        _openai_client = OpenAI(http_client=_build_http_client())
+        return _openai_client
@@ -3,6 +3,7 @@ import asyncio
 import time
 import uuid
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -21,13 +22,25 @@ from app.api.v2 import research as research_v2_router
 from app.core.config import settings
 from app.core.logger import request_id_var, log_info
 from app.core.logging_config import setup_logging, set_request_id
+from app.core.openai_async_client import close_async_http_client, get_async_http_client
 
 # Initialize logging early (single call)
 setup_logging()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One keep-alive httpx.AsyncClient for OpenAI REST calls, shared by routes and background tasks
+    app.state.openai_http = get_async_http_client()
+    try:
+        yield
+    finally:
+        await close_async_http_client()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_PREFIX}/openapi.json"
+    openapi_url=f"{settings.API_PREFIX}/openapi.json",
+    lifespan=lifespan,
 )
 
 # CORS middleware
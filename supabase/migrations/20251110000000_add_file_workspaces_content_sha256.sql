@@ -0,0 +1,8 @@
+ALTER TABLE public.file_workspaces
+ADD COLUMN IF NOT EXISTS content_sha256 text;
+
+COMMENT ON COLUMN public.file_workspaces.content_sha256 IS 'SHA-256 of the uploaded bytes; lets /ingest/upload skip re-ingesting identical content.';
+
+CREATE INDEX IF NOT EXISTS file_workspaces_workspace_sha256_idx
+    ON public.file_workspaces USING btree (workspace_id, content_sha256)
+    WHERE deleted = false AND content_sha256 IS NOT NULL;
@@ -0,0 +1,14 @@
+CREATE TABLE IF NOT EXISTS public.ingest_jobs (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    workspace_id uuid NOT NULL,
+    status text NOT NULL DEFAULT 'queued',
+    files jsonb,
+    result jsonb,
+    error text,
+    created_at timestamp with time zone NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at timestamp with time zone
+);
+
+COMMENT ON TABLE public.ingest_jobs IS 'Background /vector-store/ingest/upload jobs (status: queued, running, completed, failed).';
+
+CREATE INDEX IF NOT EXISTS ingest_jobs_workspace_id_idx ON public.ingest_jobs USING btree (workspace_id);
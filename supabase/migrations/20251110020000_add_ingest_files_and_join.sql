@@ -0,0 +1,71 @@
+-- One round-trip, one transaction replacement for the REST files/file_workspaces writes
+-- done after /responses/vector-store/ingest/upload. p_rows is a JSON array of objects with
+-- name, normalized_name, openai_file_id, vs_file_id and optional metadata keys.
+-- file_workspaces.user_id is NOT NULL (and checked before ON CONFLICT resolves), so rows
+-- keep the live row's owner and new rows are attributed to the workspace owner.
+CREATE OR REPLACE FUNCTION public.ingest_files_and_join(p_workspace_id uuid, p_rows jsonb)
+RETURNS TABLE(file_name text, files_id uuid)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    r jsonb;
+    v_file_id uuid;
+    v_join_file_id uuid;
+    v_join_user_id uuid;
+    v_owner_id uuid;
+BEGIN
+    SELECT w.user_id INTO v_owner_id FROM public.workspaces w WHERE w.id = p_workspace_id;
+
+    FOR r IN SELECT * FROM jsonb_array_elements(p_rows) LOOP
+        -- Ensure a files row exists (lookup by exact name first)
+        v_file_id := NULL;
+        SELECT f.id INTO v_file_id FROM public.files f WHERE f.name = r->>'name' LIMIT 1;
+        IF v_file_id IS NULL THEN
+            INSERT INTO public.files (name) VALUES (r->>'name') RETURNING id INTO v_file_id;
+        END IF;
+
+        -- A live join row already holding this normalized_name is updated in place
+        v_join_file_id := NULL;
+        v_join_user_id := NULL;
+        SELECT fw.file_id, fw.user_id INTO v_join_file_id, v_join_user_id
+          FROM public.file_workspaces fw
+         WHERE fw.workspace_id = p_workspace_id
+           AND fw.normalized_name = r->>'normalized_name'
+           AND fw.deleted = false
+         LIMIT 1;
+
+        INSERT INTO public.file_workspaces AS fw (
+            user_id, workspace_id, file_id, normalized_name, ingested, deleted, deleted_at,
+            openai_file_id, vs_file_id, meeting_date, meeting_year, meeting_month, meeting_day,
+            doc_type, has_ocr, file_ext, meeting_body, ordinance_number, content_sha256
+        ) VALUES (
+            COALESCE(v_join_user_id, v_owner_id), p_workspace_id, COALESCE(v_join_file_id, v_file_id), r->>'normalized_name', true, false, NULL,
+            r->>'openai_file_id', r->>'vs_file_id', (r->>'meeting_date')::date,
+            (r->>'meeting_year')::smallint, (r->>'meeting_month')::smallint, (r->>'meeting_day')::smallint,
+            r->>'doc_type', (r->>'has_ocr')::boolean, r->>'file_ext', r->>'meeting_body',
+            r->>'ordinance_number', r->>'content_sha256'
+        )
+        ON CONFLICT (file_id, workspace_id) DO UPDATE SET
+            normalized_name = EXCLUDED.normalized_name,
+            ingested = true,
+            deleted = false,
+            deleted_at = NULL,
+            openai_file_id = EXCLUDED.openai_file_id,
+            vs_file_id = EXCLUDED.vs_file_id,
+            meeting_date = COALESCE(EXCLUDED.meeting_date, fw.meeting_date),
+            meeting_year = COALESCE(EXCLUDED.meeting_year, fw.meeting_year),
+            meeting_month = COALESCE(EXCLUDED.meeting_month, fw.meeting_month),
+            meeting_day = COALESCE(EXCLUDED.meeting_day, fw.meeting_day),
+            doc_type = COALESCE(EXCLUDED.doc_type, fw.doc_type),
+            has_ocr = COALESCE(EXCLUDED.has_ocr, fw.has_ocr),
+            file_ext = COALESCE(EXCLUDED.file_ext, fw.file_ext),
+            meeting_body = COALESCE(EXCLUDED.meeting_body, fw.meeting_body),
+            ordinance_number = COALESCE(EXCLUDED.ordinance_number, fw.ordinance_number),
+            content_sha256 = COALESCE(EXCLUDED.content_sha256, fw.content_sha256);
+
+        file_name := r->>'name';
+        files_id := v_file_id;
+        RETURN NEXT;
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,7 @@
+-- Pending-ingest scan used by the VS ingest worker (_get_eligible_files). Unlike
+-- idx_fw_pending_per_workspace this also excludes rows that exhausted their retries.
+-- (Plain CREATE INDEX: migrations run inside a transaction, where CONCURRENTLY is not allowed.)
+CREATE INDEX IF NOT EXISTS file_workspaces_workspace_pending_ingest_idx
+    ON public.file_workspaces USING btree (workspace_id)
+    WHERE ingested = false AND deleted = false AND ingest_failed = false;
+
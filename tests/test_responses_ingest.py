@@ -35,9 +35,24 @@ class FakeOpenAIVectorStoreFiles:
     del_ = delete  # additional alias name
 
 
+class FakeOpenAIFileBatches:
+    def __init__(self):
+        self.batches = []
+
+    def create_and_poll(self, vector_store_id: str, file_ids=None, **kwargs):
+        self.batches.append((vector_store_id, list(file_ids or [])))
+        counts = types.SimpleNamespace(completed=len(file_ids or []), failed=0)
+        return types.SimpleNamespace(id=f"vsfb_{len(self.batches)}", status="completed", file_counts=counts)
+
+    def list_files(self, batch_id: str, vector_store_id: str, **kwargs):
+        idx = int(batch_id.rsplit("_", 1)[1]) - 1
+        return [types.SimpleNamespace(id=fid, status="completed") for fid in self.batches[idx][1]]
+
+
 class FakeOpenAIVectorStores:
     def __init__(self):
         self.files = FakeOpenAIVectorStoreFiles()
+        self.file_batches = FakeOpenAIFileBatches()
         # add list method on files to align with router expectations
         def _list(vector_store_id: str):
             return types.SimpleNamespace(data=[{"id": "file_a"}, {"id": "file_b"}])
@@ -107,6 +122,10 @@ class FakeSupabaseTable:
         self._filters[col] = ("ilike", val)
         return self
 
+    def in_(self, col, vals):
+        self._filters[col] = ("in", list(vals))
+        return self
+
     def maybe_single(self):
         self._limit = 1
         return self
@@ -119,31 +138,73 @@ class FakeSupabaseTable:
         return self
 
     def insert(self, payload):
-        # Simulate insert into files and file_workspaces
+        # Simulate insert into files and file_workspaces (single row or list of rows)
+        rows = payload if isinstance(payload, list) else [payload]
         if self.name == "files":
-            new_id = f"file_db_{len(self.store['files'])+1}"
-            self.store["files"].append({"id": new_id, **payload})
-            result = types.SimpleNamespace(data=[{"id": new_id, **payload}])
+            inserted = []
+            for row in rows:
+                new_id = f"file_db_{len(self.store['files'])+1}"
+                self.store["files"].append({"id": new_id, **row})
+                inserted.append({"id": new_id, **row})
+            result = types.SimpleNamespace(data=inserted)
             return types.SimpleNamespace(execute=lambda: result)
         if self.name == "file_workspaces":
-            self.store["file_workspaces"].append(payload)
-            result = types.SimpleNamespace(data=[payload])
+            self.store["file_workspaces"].extend(rows)
+            result = types.SimpleNamespace(data=rows)
+            return types.SimpleNamespace(execute=lambda: result)
+        if self.name == "ingest_jobs":
+            jobs = self.store.setdefault("ingest_jobs", [])
+            inserted = [{"id": f"job_{len(jobs)+1}", **row} for row in rows]
+            jobs.extend(inserted)
+            result = types.SimpleNamespace(data=inserted)
             return types.SimpleNamespace(execute=lambda: result)
         return types.SimpleNamespace(data=[])
 
-    def update(self, payload):
+    def upsert(self, payload, on_conflict=None, **kwargs):
+        rows = payload if isinstance(payload, list) else [payload]
+        if self.name == "file_workspaces":
+            # user_id is NOT NULL, and Postgres checks it before resolving ON CONFLICT
+            if any(not row.get("user_id") for row in rows):
+                raise Exception('null value in column "user_id" violates not-null constraint')
+            keys = (on_conflict or "file_id,workspace_id").split(",")
+            for row in rows:
+                match = [r for r in self.store["file_workspaces"] if all(r.get(k) == row.get(k) for k in keys)]
+                if match:
+                    match[0].update(row)
+                else:
+                    self.store["file_workspaces"].append(dict(row))
+        result = types.SimpleNamespace(data=rows)
+        return types.SimpleNamespace(execute=lambda: result)
+
+    def update(self, payload, **kwargs):
         # For test, we just record the last update
         self.store.setdefault("updates", []).append({"table": self.name, "payload": payload, "filters": dict(self._filters)})
+        self._update = payload
         return self
 
     def execute(self):
         # Respond to select
+        if self.name == "ingest_jobs":
+            rows = [r for r in self.store.get("ingest_jobs", []) if r["id"] == self._filters.get("id")]
+            if getattr(self, "_update", None) is not None:
+                for r in rows:
+                    r.update(self._update)
+            return types.SimpleNamespace(data=rows[0] if rows else None)
         if self.name == "workspace_vector_stores":
             return types.SimpleNamespace(data={"vector_store_id": "vs_test_1"})
+        if self.name == "workspaces":
+            return types.SimpleNamespace(data={"user_id": "user_owner"})
         if self.name == "files":
             # maybe_single select by name -> return None to force insert
             return types.SimpleNamespace(data=None)
         if self.name == "file_workspaces":
+            if "content_sha256" in self._filters:
+                rows = [r for r in self.store["file_workspaces"] if r.get("content_sha256") == self._filters["content_sha256"]]
+                return types.SimpleNamespace(data=rows)
+            if isinstance(self._filters.get("normalized_name"), tuple):
+                names = self._filters["normalized_name"][1]
+                rows = [r for r in self.store["file_workspaces"] if r.get("normalized_name") in names and not r.get("deleted")]
+                return types.SimpleNamespace(data=rows)
             # maybe_single select by workspace + normalized_name -> return None
             return types.SimpleNamespace(data=None)
         return types.SimpleNamespace(data=None)
@@ -156,6 +217,10 @@ class FakeSupabaseClient:
     def table(self, name):
         return FakeSupabaseTable(name, self.store)
 
+    def rpc(self, fn, params):
+        # ingest_files_and_join is not deployed unless a test installs its own rpc
+        raise Exception(f"PGRST202: Could not find the function public.{fn}")
+
     class storage:
         @staticmethod
         def from_(bucket):
@@ -166,16 +231,45 @@ class FakeSupabaseClient:
             return B()
 
 
+class FakeAsyncOpenAIClient:
+    """Awaitable facade over FakeOpenAIClient for the AsyncOpenAI code paths."""
+
+    def __init__(self):
+        self._sync = FakeOpenAIClient()
+        batches = self._sync.vector_stores.file_batches
+
+        async def _create_and_poll(*args, **kwargs):
+            return batches.create_and_poll(*args, **kwargs)
+
+        async def _list_files(*args, **kwargs):
+            for it in batches.list_files(*args, **kwargs):
+                yield it
+
+        self.vector_stores = types.SimpleNamespace(
+            file_batches=types.SimpleNamespace(create_and_poll=_create_and_poll, list_files=_list_files)
+        )
+        self.beta = types.SimpleNamespace(vector_stores=self.vector_stores)
+
+
 def build_test_app(monkeypatch):
     from fastapi import FastAPI
     app = FastAPI()
     app.include_router(responses_router)
 
-    # Patch OpenAI client constructor used inside routes
-    monkeypatch.setattr(responses_module, "OpenAI", lambda: FakeOpenAIClient())
+    # Patch the shared OpenAI client used inside routes
+    monkeypatch.setattr(responses_module, "get_openai_client", lambda: FakeOpenAIClient())
+    monkeypatch.setattr(responses_module, "get_async_openai_client", lambda: FakeAsyncOpenAIClient())
+    uploaded = []
+
+    async def fake_create_file_http(name, content, mime, purpose="assistants"):
+        uploaded.append(name)
+        return f"file_http_{len(uploaded)}"
+
+    monkeypatch.setattr(responses_module, "_create_openai_file_http", fake_create_file_http)
     # Patch supabase client used inside routes
     fake_sb = FakeSupabaseClient()
     monkeypatch.setattr(responses_module, "supabase", fake_sb)
+    monkeypatch.setattr(responses_module, "_INGEST_RPC_AVAILABLE", True)
     # Patch vector store id lookup to return a stable id
     monkeypatch.setattr(responses_module, "_get_vector_store_id", lambda ws_id: "vs_test_1")
     # Avoid actual OCR invocation
@@ -213,6 +307,7 @@ def test_ingest_upload_upserts_metadata(monkeypatch):
         payload = fake_sb.store["file_workspaces"][-1]
     # Check soft-filter metadata presence
     assert payload.get("ingested") is True
+    assert payload.get("user_id") == "user_owner"
     assert payload.get("doc_type") in {"agenda", "minutes", "ordinance", "transcript", "report"}
     assert payload.get("meeting_year") in (2022, None)
     assert payload.get("meeting_month") in (1, None)
@@ -242,3 +337,505 @@ def test_purge_vector_store_resets_flags(monkeypatch):
     # Check that reset flag update was recorded
     updates = fake_sb.store.get("updates", [])
     assert any(u["table"] == "file_workspaces" and u["payload"].get("ingested") is False for u in updates)
+
+
+def test_ingest_upload_skips_ocr_for_text_pdf(monkeypatch):
+    app, fake_sb = build_test_app(monkeypatch)
+    ocr_calls = []
+    monkeypatch.setattr(responses_module, "_run_ocrmypdf", lambda path: ocr_calls.append(path))
+    monkeypatch.setattr(responses_module, "pdf_has_text_layer", lambda path: True)
+    client = TestClient(app)
+
+    files = {"files": ("Minutes_2022-01-12.pdf", b"%PDF-1.4...", "application/pdf")}
+    resp = client.post("/responses/vector-store/ingest/upload", data={"workspace_id": "ws_123"}, files=files)
+    assert resp.status_code == 200
+    assert ocr_calls == []
+
+
+def test_ingest_upload_multiple_files_preserves_order(monkeypatch):
+    app, fake_sb = build_test_app(monkeypatch)
+    client = TestClient(app)
+
+    files = [
+        ("files", ("Agenda_2022-01-12.pdf", b"%PDF-1.4 a", "application/pdf")),
+        ("files", ("Minutes_2022-02-09.pdf", b"%PDF-1.4 b", "application/pdf")),
+        ("files", ("Ordinance_2023-15.txt", b"text", "text/plain")),
+    ]
+    resp = client.post("/responses/vector-store/ingest/upload", data={"workspace_id": "ws_123"}, files=files)
+    assert resp.status_code == 200
+    j = resp.json()
+    assert "failed" not in j
+    primaries = [f["name"] for f in j["files"] if not f["name"].endswith(".context.txt")]
+    assert primaries == ["Agenda_2022-01-12.pdf", "Minutes_2022-02-09.pdf", "Ordinance_2023-15.txt"]
+    assert len(fake_sb.store["file_workspaces"]) == 3
+
+
+def test_upload_concurrent_files_preserves_order(monkeypatch):
+    app, fake_sb = build_test_app(monkeypatch)
+    client = TestClient(app)
+
+    names = [f"Doc_{i}.txt" for i in range(5)]
+    files = [("files", (n, b"text", "text/plain")) for n in names]
+    resp = client.post("/responses/upload", data={"workspace_id": "ws_123"}, files=files)
+    assert resp.status_code == 200
+    assert [f["name"] for f in resp.json()] == names
+
+
+def test_upload_attaches_successes_when_one_file_fails(monkeypatch):
+    app, fake_sb = build_test_app(monkeypatch)
+    attached = []
+
+    async def fake_create_file_http(name, content, mime, purpose="assistants"):
+        if name == "Doc_1.txt":
+            raise responses_module.HTTPException(status_code=502, detail="upload failed")
+        return f"file_{name}"
+
+    async def fake_attach(client, vector_store_id, file_ids):
+        attached.extend(file_ids)
+        return {fid: fid for fid in file_ids}
+
+    monkeypatch.setattr(responses_module, "_create_openai_file_http", fake_create_file_http)
+    monkeypatch.setattr(responses_module, "_attach_files_to_vector_store_async", fake_attach)
+    client = TestClient(app)
+
+    files = [("files", (f"Doc_{i}.txt", b"text", "text/plain")) for i in range(3)]
+    resp = client.post("/responses/upload", data={"workspace_id": "ws_123"}, files=files)
+    assert resp.status_code == 502
+    assert attached == ["file_Doc_0.txt", "file_Doc_2.txt"]
+
+
+def test_attach_files_maps_only_completed_files(monkeypatch):
+    import asyncio
+    monkeypatch.setattr(responses_module, "_invalidate_vs_files", lambda vs_id: None)
+    sync_client = FakeOpenAIClient()
+    batches = sync_client.vector_stores.file_batches
+    listed = batches.list_files
+    batches.list_files = lambda batch_id, **kw: [
+        types.SimpleNamespace(id=it.id, status="failed" if it.id == "file_b" else "completed")
+        for it in listed(batch_id, **kw)
+    ]
+    async_client = FakeAsyncOpenAIClient()
+    async_client._sync.vector_stores.file_batches.list_files = batches.list_files
+
+    expected = {"file_a": "file_a", "file_b": None}
+    assert responses_module._attach_files_to_vector_store(sync_client, "vs_1", ["file_a", "file_b"]) == expected
+    assert asyncio.run(responses_module._attach_files_to_vector_store_async(async_client, "vs_1", ["file_a", "file_b"])) == expected
+
+
+def test_ingest_upload_does_not_record_failed_attach(monkeypatch):
+    app, fake_sb = build_test_app(monkeypatch)
+    monkeypatch.setattr(responses_module, "_attach_files_to_vector_store", lambda client, vs_id, ids: {fid: None for fid in ids})
+    client = TestClient(app)
+
+    files = {"files": ("Agenda_2022-01-12.pdf", b"%PDF-1.4...", "application/pdf")}
+    body = client.post("/responses/vector-store/ingest/upload", data={"workspace_id": "ws_123"}, files=files).json()
+    assert body["files"] == []
+    assert {f["name"] for f in body["failed"]} >= {"Agenda_2022-01-12.pdf"}
+    assert fake_sb.store["file_workspaces"] == []
+
+
+def test_retry_retries_transient_errors_only(monkeypatch):
+    monkeypatch.setattr(responses_module.time, "sleep", lambda s: None)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise Exception("Rate limit reached for requests")
+        return "ok"
+
+    assert responses_module._retry(flaky) == "ok"
+    assert len(calls) == 3
+
+    def broken():
+        calls.append(1)
+        raise ValueError("bad request")
+
+    calls.clear()
+    try:
+        responses_module._retry(broken)
+    except ValueError:
+        pass
+    assert len(calls) == 1
+
+
+def test_ingest_upload_skips_empty_enrichment(monkeypatch):
+    app, fake_sb = build_test_app(monkeypatch)
+    monkeypatch.setattr(responses_module, "_safe_extract_text", lambda path, n: "")
+    client = TestClient(app)
+
+    files = {"files": ("notes.txt", b"text", "text/plain")}
+    resp = client.post("/responses/vector-store/ingest/upload", data={"workspace_id": "ws_123"}, files=files)
+    assert resp.status_code == 200
+    assert [f["name"] for f in resp.json()["files"]] == ["notes.txt"]
+
+
+def test_ingest_upload_keeps_short_enrichment_with_signal(monkeypatch):
+    app, fake_sb = build_test_app(monkeypatch)
+    monkeypatch.setattr(responses_module, "_safe_extract_text", lambda path, n: "")
+    client = TestClient(app)
+
+    # Only the filename year is known; the context file is short but still carries it
+    files = {"files": ("2023.txt", b"text", "text/plain")}
+    resp = client.post("/responses/vector-store/ingest/upload", data={"workspace_id": "ws_123"}, files=files)
+    assert resp.status_code == 200
+    assert [f["name"] for f in resp.json()["files"]] == ["2023.txt", "2023.txt.context.txt"]
+
+
+def test_ingest_upload_updates_live_row_in_place(monkeypatch):
+    app, fake_sb = build_test_app(monkeypatch)
+    fake_sb.store["file_workspaces"].append({
+        "file_id": "file_db_old", "workspace_id": "ws_123", "user_id": "user_alice",
+        "normalized_name": responses_module._normalize_name("Agenda_2022-01-12.pdf"),
+        "deleted": False, "openai_file_id": "file_stale", "vs_file_id": "vsf_stale",
+    })
+    client = TestClient(app)
+
+    files = {"files": ("Agenda_2022-01-12.pdf", b"%PDF-1.4 new", "application/pdf")}
+    resp = client.post("/responses/vector-store/ingest/upload", data={"workspace_id": "ws_123"}, files=files)
+    assert resp.status_code == 200
+
+    [row] = fake_sb.store["file_workspaces"]
+    assert row["user_id"] == "user_alice"
+    assert row["openai_file_id"] == resp.json()["files"][0]["id"] != "file_stale"
+
+
+def test_ingest_upload_reuses_identical_content(monkeypatch):
+    app, fake_sb = build_test_app(monkeypatch)
+    client = TestClient(app)
+
+    files = {"files": ("Agenda_2022-01-12.pdf", b"%PDF-1.4 same", "application/pdf")}
+    first = client.post("/responses/vector-store/ingest/upload", data={"workspace_id": "ws_123"}, files=files).json()
+    monkeypatch.setattr(responses_module, "_prepare_ingest_artifact", lambda *a, **k: (_ for _ in ()).throw(AssertionError("re-ingested")))
+    second = client.post("/responses/vector-store/ingest/upload", data={"workspace_id": "ws_123"}, files=files).json()
+
+    assert "failed" not in second
+    assert second["files"][0]["id"] == first["files"][0]["id"]
+    assert len(fake_sb.store["file_workspaces"]) == 1
+
+    # Same bytes under a new name reuse the OpenAI file but still get their own join row
+    renamed = {"files": ("Agenda_copy.pdf", b"%PDF-1.4 same", "application/pdf")}
+    third = client.post("/responses/vector-store/ingest/upload", data={"workspace_id": "ws_123"}, files=renamed).json()
+    assert third["files"][0]["id"] == first["files"][0]["id"]
+    assert len(fake_sb.store["file_workspaces"]) == 2
+    copy = fake_sb.store["file_workspaces"][-1]
+    assert copy["normalized_name"] == responses_module._normalize_name("Agenda_copy.pdf")
+    assert copy["openai_file_id"] == first["files"][0]["id"]
+    assert copy["vs_file_id"] == fake_sb.store["file_workspaces"][0]["vs_file_id"]
+    assert copy["content_sha256"] == fake_sb.store["file_workspaces"][0]["content_sha256"]
+
+
+def test_ingest_upload_background_job(monkeypatch):
+    app, fake_sb = build_test_app(monkeypatch)
+    client = TestClient(app)
+
+    files = {"files": ("Agenda_2022-01-12.pdf", b"%PDF-1.4...", "application/pdf")}
+    resp = client.post("/responses/vector-store/ingest/upload", data={"workspace_id": "ws_123", "background": "true"}, files=files)
+    assert resp.status_code == 202
+    job_id = resp.json()["job_id"]
+
+    # TestClient runs background tasks before returning, so the job has finished
+    job = client.get(f"/responses/vector-store/ingest/jobs/{job_id}").json()
+    assert job["status"] == "completed"
+    assert job["result"]["files"][0]["name"] == "Agenda_2022-01-12.pdf"
+    assert job["updated_at"]
+    assert client.get("/responses/vector-store/ingest/jobs/missing").status_code == 404
+
+
+def test_ingest_upload_uses_rpc_when_available(monkeypatch):
+    app, fake_sb = build_test_app(monkeypatch)
+    calls = []
+
+    def rpc(fn, params):
+        calls.append((fn, params))
+        data = [{"file_name": r["name"], "files_id": "file_db_rpc"} for r in params["p_rows"]]
+        return types.SimpleNamespace(execute=lambda: types.SimpleNamespace(data=data))
+
+    fake_sb.rpc = rpc
+    client = TestClient(app)
+    files = {"files": ("Agenda_2022-01-12.pdf", b"%PDF-1.4...", "application/pdf")}
+    resp = client.post("/responses/vector-store/ingest/upload", data={"workspace_id": "ws_123"}, files=files)
+    assert resp.status_code == 200
+    assert calls and calls[0][0] == "ingest_files_and_join"
+    assert calls[0][1]["p_rows"][0]["doc_type"] == "agenda"
+    assert fake_sb.store["file_workspaces"] == []
+
+
+def test_flush_file_rows_surfaces_rpc_errors(monkeypatch):
+    import pytest
+    fake_sb = FakeSupabaseClient()
+
+    def rpc(fn, params):
+        raise Exception('null value in column "user_id" violates not-null constraint')
+
+    fake_sb.rpc = rpc
+    monkeypatch.setattr(responses_module, "supabase", fake_sb)
+    monkeypatch.setattr(responses_module, "_INGEST_RPC_AVAILABLE", True)
+    row = responses_module._build_file_row(workspace_id="ws_123", filename="a.pdf", openai_file_id="file_1", vs_file_id=None)
+
+    # Only a missing function falls back to the REST path
+    with pytest.raises(RuntimeError):
+        responses_module._flush_file_rows([row], "ws_123")
+    assert responses_module._INGEST_RPC_AVAILABLE is True
+    assert fake_sb.store["files"] == []
+
+
+def test_file_row_buffer_coalesces_concurrent_submits(monkeypatch):
+    import asyncio
+    flushes = []
+
+    def fake_flush(rows, workspace_id):
+        flushes.append((workspace_id, [r["name"] for r in rows]))
+        return {r["name"]: f"id_{r['name']}" for r in rows}
+
+    monkeypatch.setattr(responses_module, "_flush_file_rows", fake_flush)
+    buf = responses_module._FileRowBuffer()
+
+    async def main():
+        return await asyncio.gather(
+            buf.submit("ws_1", [{"name": "a.pdf"}]),
+            buf.submit("ws_1", [{"name": "b.pdf"}]),
+        )
+
+    first, second = asyncio.run(main())
+    assert flushes == [("ws_1", ["a.pdf", "b.pdf"])]
+    assert first == {"a.pdf": "id_a.pdf"} and second == {"b.pdf": "id_b.pdf"}
+
+
+def test_get_vector_store_id_is_cached_until_invalidated(monkeypatch):
+    calls = []
+
+    class CountingSupabase(FakeSupabaseClient):
+        def table(self, name):
+            calls.append(name)
+            return super().table(name)
+
+    monkeypatch.setattr(responses_module, "supabase", CountingSupabase())
+    monkeypatch.setattr(responses_module.settings, "VECTOR_STORE_ID_CACHE_TTL", 300)
+    responses_module.invalidate_vector_store_id()
+
+    assert responses_module._get_vector_store_id("ws_cache") == "vs_test_1"
+    assert responses_module._get_vector_store_id("ws_cache") == "vs_test_1"
+    assert calls == ["workspace_vector_stores"]
+
+    responses_module.invalidate_vector_store_id("ws_cache")
+    responses_module._get_vector_store_id("ws_cache")
+    assert len(calls) == 2
+
+
+def test_progress_polls_share_one_vs_listing(monkeypatch):
+    app, _ = build_test_app(monkeypatch)
+    calls = []
+
+    async def fake_fetch(vector_store_id):
+        calls.append(vector_store_id)
+        return [{"id": "vsf_1", "file_id": "file_1", "status": "completed"}]
+
+    monkeypatch.setattr(responses_module, "_fetch_vs_files_http", fake_fetch)
+    monkeypatch.setattr(responses_module, "_vs_files_cache", {})
+    client = TestClient(app)
+
+    for _ in range(3):
+        resp = client.get("/responses/vector-store/progress", params={"workspace_id": "ws_123"})
+        assert resp.status_code == 200
+        assert resp.json()["total"] == 1
+    assert calls == ["vs_test_1"]
+
+
+def test_create_openai_file_http_streams_multipart(monkeypatch, tmp_path):
+    import asyncio
+    import httpx
+
+    seen = {}
+
+    def handler(request: httpx.Request):
+        body = request.read()
+        seen["length"] = int(request.headers["content-length"])
+        seen["body"] = body
+        seen["ctype"] = request.headers["content-type"]
+        return httpx.Response(200, json={"id": "file_streamed"})
+
+    src = tmp_path / "Minutes.pdf"
+    src.write_bytes(b"%PDF-" + b"x" * 3000)
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(responses_module, "get_async_http_client", lambda: http)
+    monkeypatch.setattr(responses_module, "_SPOOL_CHUNK", 1024)
+
+    fid = asyncio.run(responses_module._create_openai_file_http("Minutes.pdf", src, "application/pdf"))
+    assert fid == "file_streamed"
+    assert seen["length"] == len(seen["body"])
+    boundary = seen["ctype"].split("boundary=")[1]
+    assert seen["body"].endswith(f"--{boundary}--\r\n".encode())
+    assert b'filename="Minutes.pdf"' in seen["body"]
+    assert src.read_bytes() in seen["body"]
+
+
+def test_progress_returns_304_for_matching_etag(monkeypatch):
+    app, _ = build_test_app(monkeypatch)
+
+    async def fake_fetch(vector_store_id):
+        return [{"id": "vsf_1", "file_id": "file_1", "status": "in_progress"}]
+
+    monkeypatch.setattr(responses_module, "_fetch_vs_files_http", fake_fetch)
+    monkeypatch.setattr(responses_module, "_vs_files_cache", {})
+    client = TestClient(app)
+
+    first = client.get("/responses/vector-store/progress", params={"workspace_id": "ws_123"})
+    etag = first.headers["etag"]
+    again = client.get("/responses/vector-store/progress", params={"workspace_id": "ws_123"}, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    listed = client.get("/responses/vector-store/progress", params={"workspace_id": "ws_123"}, headers={"If-None-Match": f'"stale", W/{etag}'})
+    assert listed.status_code == 304
+    assert client.get("/responses/vector-store/progress", params={"workspace_id": "ws_123"}, headers={"If-None-Match": "*"}).status_code == 304
+    other = client.get("/responses/vector-store/progress", params={"workspace_id": "ws_123", "include_files": "true"}, headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+
+def test_fetch_vs_files_follows_pagination(monkeypatch):
+    import asyncio
+    import httpx
+
+    pages = {
+        None: {"data": [{"id": f"vsf_{i}"} for i in range(100)], "has_more": True, "last_id": "vsf_99"},
+        "vsf_99": {"data": [{"id": "vsf_100"}], "has_more": False, "last_id": "vsf_100"},
+    }
+
+    def handler(request: httpx.Request):
+        return httpx.Response(200, json=pages[request.url.params.get("after")])
+
+    http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(responses_module, "get_async_http_client", lambda: http)
+
+    data = asyncio.run(responses_module._fetch_vs_files_http("vs_big"))
+    assert len(data) == 101
+    assert data[-1]["id"] == "vsf_100"
+
+
+def test_worker_retry_call_honors_status_and_retry_after(monkeypatch):
+    worker = importlib.import_module("app.api.Responses.vs_ingest_worker")
+    sleeps = []
+    monkeypatch.setattr(worker.time, "sleep", sleeps.append)
+
+    class StatusError(Exception):
+        def __init__(self, status_code, retry_after=None):
+            super().__init__(f"status {status_code}")
+            self.status_code = status_code
+            self.response = types.SimpleNamespace(headers={"retry-after": retry_after} if retry_after else {})
+
+    calls = []
+
+    def throttled():
+        calls.append(1)
+        if len(calls) < 2:
+            raise StatusError(429, retry_after="7")
+        return "ok"
+
+    assert worker._retry_call(throttled) == "ok"
+    assert sleeps == [7.0]
+
+    def rejected():
+        calls.append(1)
+        raise StatusError(400)
+
+    calls.clear()
+    try:
+        worker._retry_call(rejected)
+    except StatusError:
+        pass
+    assert len(calls) == 1
+
+
+def test_ocr_output_is_cached_by_content_hash(monkeypatch, tmp_path):
+    stored = {}
+
+    class Bucket:
+        def download(self, key):
+            if key not in stored:
+                raise Exception("404 Object not found")
+            return stored[key]
+
+        def upload(self, key, fh, options=None):
+            stored[key] = fh.read()
+
+    monkeypatch.setattr(responses_module, "supabase", types.SimpleNamespace(storage=types.SimpleNamespace(from_=lambda b: Bucket())))
+    ocr_out = tmp_path / "ocr.pdf"
+    ocr_out.write_bytes(b"%PDF ocr")
+    ocr_calls = []
+    monkeypatch.setattr(responses_module, "_run_ocrmypdf", lambda p: ocr_calls.append(p) or str(ocr_out))
+
+    first = responses_module._run_ocrmypdf_cached("in.pdf", "abc123")
+    assert first == str(ocr_out) and stored == {"ocr_cache/abc123.pdf": b"%PDF ocr"}
+
+    second = responses_module._run_ocrmypdf_cached("in.pdf", "abc123")
+    try:
+        assert open(second, "rb").read() == b"%PDF ocr"
+    finally:
+        os.remove(second)
+    assert ocr_calls == ["in.pdf"]
+
+
+def test_worker_month_from_filename_keeps_pattern_priority():
+    worker = importlib.import_module("app.api.Responses.vs_ingest_worker")
+    month = lambda name: worker._filename_meta(name)[2]
+    assert month("2024-03 Minutes (January session).pdf") == 1
+    assert month("12-2024-05 agenda.pdf") == 5
+    assert month("202411 ordinance 04-2023.pdf") == 4
+    assert month("Minutes 032024.pdf") == 3
+    assert month("no-date.pdf") is None
+    assert worker._filename_meta("2024-03 Minutes.PDF") == (2024, "minutes", 3, "pdf")
+
+
+def test_worker_async_retry_awaits_backoff(monkeypatch):
+    import asyncio
+
+    worker = importlib.import_module("app.api.Responses.vs_ingest_worker")
+    sleeps = []
+
+    async def fake_sleep(s):
+        sleeps.append(s)
+
+    monkeypatch.setattr(worker.asyncio, "sleep", fake_sleep)
+    monkeypatch.setattr(worker.time, "sleep", lambda s: (_ for _ in ()).throw(AssertionError("blocking sleep")))
+    calls = []
+
+    class Unavailable(Exception):
+        status_code = 503
+
+    def attach():
+        calls.append(1)
+        if len(calls) < 3:
+            raise Unavailable("busy")
+        return {"f1": "vs_f1"}
+
+    assert asyncio.run(worker._aretry_call(asyncio.to_thread, attach, base_delay=1.0)) == {"f1": "vs_f1"}
+    assert len(calls) == 3 and len(sleeps) == 2
+    assert 0.5 <= sleeps[0] <= 1.5 and 1.0 <= sleeps[1] <= 3.0
+
+
+def test_async_http_client_closes_stale_loop_client():
+    import asyncio
+    import threading
+    import time
+    from app.core import openai_async_client as oac
+
+    other = asyncio.new_event_loop()
+    thread = threading.Thread(target=other.run_forever, daemon=True)
+    thread.start()
+    try:
+        async def get():
+            return oac.get_async_http_client()
+
+        stale = asyncio.run_coroutine_threadsafe(get(), other).result(timeout=5)
+        fresh = asyncio.run(get())
+        assert fresh is not stale
+        # The old client is closed on its own (still running) loop
+        for _ in range(50):
+            if stale.is_closed:
+                break
+            time.sleep(0.02)
+        assert stale.is_closed
+    finally:
+        other.call_soon_threadsafe(other.stop)
+        thread.join(timeout=5)
+        other.close()
+        oac._http_client, oac._http_client_loop, oac._async_openai = None, None, None